@@ -1,5 +1,14 @@
+import base64
+import json
+import operator
+from functools import reduce
+
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(pagination.PageNumberPagination):
@@ -10,3 +19,113 @@ class CustomPagination(pagination.PageNumberPagination):
             'total_pages': self.page.paginator.num_pages,
             'results': data,
         })
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Paginação por cursor (keyset) para históricos longos.
+
+    `ordering` é uma ordenação composta terminada numa coluna única (id), e
+    todas as colunas seguem a mesma direção. O cursor `next` guarda os valores
+    da última linha da página; a página seguinte é `WHERE (colunas) > cursor
+    ORDER BY colunas LIMIT n`, que o índice composto correspondente resolve sem
+    COUNT(*) nem OFFSET, então qualquer página custa o mesmo que a primeira.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _fields(self, model):
+        return [(name.lstrip('-'), name.startswith('-'), model._meta.get_field(name.lstrip('-')))
+                for name in self.ordering]
+
+    def decode_cursor(self, request, fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for (_, _, field), value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, fields) -> str:
+        values = [field.value_to_string(obj) for _, _, field in fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _after(fields, values) -> Q:
+        """Linhas depois de `values` na ordenação (comparação lexicográfica das colunas)."""
+        terms = []
+        for i, (name, descending, _) in enumerate(fields):
+            lookup = 'lt' if descending else 'gt'
+            equal = {prev_name: values[j] for j, (prev_name, _, _) in enumerate(fields[:i])}
+            terms.append(Q(**equal, **{f'{name}__{lookup}': values[i]}))
+        name, descending, _ = fields[0]
+        # the bound on the leading column lets the index seek straight to the cursor
+        return Q(**{f"{name}__{'lte' if descending else 'gte'}": values[0]}) & reduce(operator.or_, terms)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        fields = self._fields(queryset.model)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request, fields)
+        if cursor is not None:
+            queryset = queryset.filter(self._after(fields, cursor))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(rows[-1], fields) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'page_size': self.page_size,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class ChatMessagePagination(KeysetPagination):
+    # chronological, as the chat screen renders it
+    ordering = ('created_at', 'id')
+    page_size = 50
+
+
+class WorkoutLogPagination(KeysetPagination):
+    ordering = ('-finished_at', '-id')
+
+
+class MealPagination(KeysetPagination):
+    ordering = ('-date', '-time', '-id')
@@ -124,15 +124,109 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'app.pagination.CustomPagination',
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'PAGE_SIZE': 10,
+    # proxies confiáveis na frente da aplicação: o IP do cliente (limites por IP) vem do
+    # X-Forwarded-For só com NUM_PROXIES > 0; com 0 vale o REMOTE_ADDR
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT sem consulta ao usuário quando a view só precisa do id (ver ClaimsUser)
+        'core.authentication.ClaimsJWTAuthentication',
         'core.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
 
+# Tokens Passage já validados ficam em memória (por processo) até o exp, no máximo
+# PASSAGE_TOKEN_CACHE_TTL segundos (0 desliga); com PASSAGE_TOKEN_CACHE_USER o usuário
+# também vem da memória (os dados do perfil podem ficar defasados por até o TTL)
+PASSAGE_TOKEN_CACHE_TTL = int(os.getenv('PASSAGE_TOKEN_CACHE_TTL', '300'))
+PASSAGE_TOKEN_CACHE_SIZE = int(os.getenv('PASSAGE_TOKEN_CACHE_SIZE', '1024'))
+PASSAGE_TOKEN_CACHE_USER = os.getenv('PASSAGE_TOKEN_CACHE_USER', 'False') == 'True'
+
+# ClaimsJWTAuthentication confere se o usuário existe e está ativo no máximo uma vez
+# a cada CLAIMS_USER_CACHE_TTL segundos por usuário (0 = a cada requisição)
+CLAIMS_USER_CACHE_TTL = int(os.getenv('CLAIMS_USER_CACHE_TTL', '60'))
+
+# Busca de alimentos: índice em memória por worker (False = consulta direta no banco)
+FOOD_SEARCH_INDEX = os.getenv('FOOD_SEARCH_INDEX', 'True') == 'True'
+# segundos entre as leituras da versão do catálogo (FoodCatalogVersion) por worker: uma
+# alteração feita em outro processo aparece na busca em até esse tempo
+FOOD_INDEX_VERSION_TTL = float(os.getenv('FOOD_INDEX_VERSION_TTL', '5'))
+
 # HuggingFace
 HF_TOKEN = os.getenv('HF_TOKEN')
 HF_MODEL = os.getenv('HF_MODEL', "meta-llama/Llama-3.2-1B-Instruct")
 
+# Backend do chat: caminho da classe; 'core.services.chat_backend.LocalBackend' responde
+# localmente (determinístico, sem rede) para testes de carga
+CHAT_BACKEND = os.getenv('CHAT_BACKEND', 'core.services.chat_backend.HuggingFaceBackend')
+CHAT_LOCAL_LATENCY = float(os.getenv('CHAT_LOCAL_LATENCY', '0'))
+CHAT_LOCAL_CHUNK_SIZE = int(os.getenv('CHAT_LOCAL_CHUNK_SIZE', '16'))
+
+# Contexto das conversas: tokens (estimados) do histórico recente enviado ao modelo,
+# máximo de mensagens na janela e tokens do resumo das mensagens mais antigas
+CHAT_CONTEXT_TOKENS = int(os.getenv('CHAT_CONTEXT_TOKENS', '1200'))
+CHAT_CONTEXT_MAX_MESSAGES = int(os.getenv('CHAT_CONTEXT_MAX_MESSAGES', '20'))
+CHAT_SUMMARY_TOKENS = int(os.getenv('CHAT_SUMMARY_TOKENS', '400'))
+
+# Cache de respostas do chat (intenção + perfil + mensagem normalizada): TTL em segundos
+# (0 desliga) e no máximo CHAT_CACHE_MAX_ENTRIES respostas; as menos usadas saem primeiro
+CHAT_CACHE_TTL = int(os.getenv('CHAT_CACHE_TTL', '600'))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', '1000'))
+
+# Limites do chat (core.throttling): balde de fichas por IP (visitantes) e por usuário,
+# no formato 'N/periodo' (s, m, h, d); None desliga. O estado fica no cache 'throttle',
+# compartilhado entre os workers: Redis com REDIS_URL definido, senão (fora do DEBUG) uma
+# tabela do banco (python manage.py createcachetable)
+CHAT_THROTTLE_RATES = {
+    'chat_anon': os.getenv('CHAT_THROTTLE_ANON', '10/min') or None,
+    'chat_user': os.getenv('CHAT_THROTTLE_USER', '30/min') or None,
+}
+REDIS_URL = os.getenv('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'inmove',
+    } if REDIS_URL else {
+        # runserver is a single process; anything else shares the table between workers
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+    } if DEBUG else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'core_throttle_cache',
+    },
+    'chat': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chat-replies',
+        'TIMEOUT': CHAT_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': CHAT_CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': 10},
+    },
+}
+
+# Pool do modelo de chat (por processo): deadlines em segundos e vagas simultâneas;
+# sem vaga em CHAT_QUEUE_TIMEOUT segundos o chat responde 503
+CHAT_CONNECT_TIMEOUT = float(os.getenv('CHAT_CONNECT_TIMEOUT', '5'))
+CHAT_READ_TIMEOUT = float(os.getenv('CHAT_READ_TIMEOUT', '60'))
+CHAT_MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', '8'))
+CHAT_QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', '0.5'))
+# Chamadas simultâneas ao modelo somando todos os workers (contador no cache 'throttle', só com
+# REDIS_URL: o DatabaseCache não incrementa de forma atômica); 0 desliga
+CHAT_GLOBAL_CONCURRENCY = int(os.getenv('CHAT_GLOBAL_CONCURRENCY', '32'))
+# Chamadas idênticas simultâneas compartilham uma única chamada ao modelo
+CHAT_COALESCE = os.getenv('CHAT_COALESCE', 'True') == 'True'
+
+# Jobs de chat em segundo plano: threads por processo (0 = executa logo após o commit,
+# na própria requisição), espera máxima do long-polling, tentativas quando o pool está
+# cheio (a primeira repetição espera CHAT_JOB_RETRY_DELAY segundos, depois o dobro) e
+# segundos em 'running' até o job voltar para a fila (run_chat_jobs)
+CHAT_JOB_WORKERS = int(os.getenv('CHAT_JOB_WORKERS', '2'))
+CHAT_JOB_MAX_WAIT = float(os.getenv('CHAT_JOB_MAX_WAIT', '20'))
+CHAT_JOB_MAX_ATTEMPTS = int(os.getenv('CHAT_JOB_MAX_ATTEMPTS', '3'))
+CHAT_JOB_RETRY_DELAY = float(os.getenv('CHAT_JOB_RETRY_DELAY', '2'))
+CHAT_JOB_STALE_SECONDS = int(os.getenv('CHAT_JOB_STALE_SECONDS', '300'))
+
 print(f'{MODE = } \n{MEDIA_URL = } \n{DATABASES = }')
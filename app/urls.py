@@ -23,6 +23,11 @@ from core.views.treino_exercicio import TreinoExercicioViewSet
 # VIEWS DO CHAT COM HUGGINGFACE
 from core.views.chat import (
     ChatAPIView, 
+    ChatStreamAPIView,
+    AsyncChatView,
+    ChatBackendMetricsAPIView,
+    ChatJobListAPIView,
+    ChatJobDetailAPIView,
     ChatSessionListAPIView, 
     ChatSessionDetailAPIView,
     ChatSessionMessagesAPIView
@@ -68,6 +73,19 @@ urlpatterns = [
 
     # 🔥 ROTAS DO CHAT (HuggingFace)
     path('api/chat/', ChatAPIView.as_view(), name='chat-ai'),
+
+    # Mesma conversa em streaming (Server-Sent Events)
+    path('api/chat/stream/', ChatStreamAPIView.as_view(), name='chat-ai-stream'),
+
+    # Versão assíncrona (servir com ASGI: uvicorn app.asgi:application)
+    path('api/chat/async/', AsyncChatView.as_view(), name='chat-ai-async'),
+
+    # Chat em segundo plano: cria o job (202) e consulta/long-poll do resultado
+    path('api/chat/jobs/', ChatJobListAPIView.as_view(), name='chat-jobs'),
+    path('api/chat/jobs/<uuid:job_id>/', ChatJobDetailAPIView.as_view(), name='chat-job-detail'),
+
+    # Métricas do pool do modelo (admin)
+    path('api/chat/metrics/', ChatBackendMetricsAPIView.as_view(), name='chat-backend-metrics'),
     
     # Sessões (listar todas e criar nova)
     path('api/chat/sessions/', ChatSessionListAPIView.as_view(), name='chat-sessions'),
@@ -12,4 +12,7 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Aplica as migrações
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Tabela do cache 'throttle' quando não há REDIS_URL
+python manage.py createcachetable
\ No newline at end of file
@@ -34,3 +34,18 @@ class CoreConfig(AppConfig):
                     pass
         except Exception:
             pass
+
+        # Keep the in-process food search index in sync with FoodItem writes
+        # (admin, FoodItemViewSet, import_taco).
+        from django.db.models.signals import post_delete, post_save
+
+        from core.models.fooditem import FoodItem
+        from core.models.meal import Meal
+        from core.services import daily_totals, food_index
+
+        post_save.connect(food_index.invalidate_on_change, sender=FoodItem, dispatch_uid='food_index_post_save')
+        post_delete.connect(food_index.invalidate_on_change, sender=FoodItem, dispatch_uid='food_index_post_delete')
+
+        # Keep the per-day DailyNutritionTotals rollup in step with Meal writes.
+        post_save.connect(daily_totals.on_meal_saved, sender=Meal, dispatch_uid='daily_totals_post_save')
+        post_delete.connect(daily_totals.on_meal_deleted, sender=Meal, dispatch_uid='daily_totals_post_delete')
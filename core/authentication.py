@@ -1,5 +1,17 @@
+import base64
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
 from django.conf import settings
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
 from drf_spectacular.plumbing import build_bearer_security_scheme_object
 try:  # make this import optional so management commands don't fail when not using Passage
@@ -13,8 +25,13 @@ except Exception:  # pragma: no cover - environment dependent
 # from passageidentity.openapi_client.models import UserInfo
 from rest_framework import authentication
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from core.models import ClaimsUser, User
 
-from core.models import User
+logger = logging.getLogger(__name__)
 
 PASSAGE_APP_ID = getattr(settings, 'PASSAGE_APP_ID', None)
 PASSAGE_API_KEY = getattr(settings, 'PASSAGE_API_KEY', None)
@@ -40,6 +57,79 @@ class TokenAuthenticationScheme(OpenApiAuthenticationExtension):
         )
 
 
+class OptionalAuthenticationScheme(OpenApiAuthenticationExtension):
+    target_class = 'core.authentication.OptionalAuthentication'
+    name = 'optionalBearerAuth'
+
+    def get_security_definition(self, auto_schema):
+        return build_bearer_security_scheme_object(
+            header_name='Authorization',
+            token_prefix='Bearer',
+        )
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """`exp` do JWT (sem verificar a assinatura; só usado depois que o token já foi validado)."""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return None
+
+
+class _VerifiedTokenCache:
+    """
+    Tokens Passage já validados neste processo: hash do token -> (passage_id, usuário).
+
+    Cada entrada vale até o `exp` do token, limitado a PASSAGE_TOKEN_CACHE_TTL
+    segundos (um token revogado continua aceito no máximo por esse tempo), e só
+    as PASSAGE_TOKEN_CACHE_SIZE entradas mais recentes são mantidas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, token: str, psg_user_id: str, user: User):
+        ttl = getattr(settings, 'PASSAGE_TOKEN_CACHE_TTL', 300)
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        exp = _token_expiry(token)
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        max_entries = getattr(settings, 'PASSAGE_TOKEN_CACHE_SIZE', 1024)
+        with self._lock:
+            self._entries[self._key(token)] = (expires_at, psg_user_id, user)
+            self._entries.move_to_end(self._key(token))
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = _VerifiedTokenCache()
+
+
 class TokenAuthentication(authentication.BaseAuthentication):
     def authenticate(self, request) -> tuple[User, None]:
         if not request.headers.get('Authorization'):
@@ -49,8 +139,18 @@ class TokenAuthentication(authentication.BaseAuthentication):
         # If passage is not configured, we cannot authenticate via token
         if psg is None:
             return None
+
+        cached = verified_tokens.get(token)
+        if cached is not None:
+            # signature already checked for this token: skip validate_jwt (and the user lookup if allowed)
+            psg_user_id, user = cached
+            if getattr(settings, 'PASSAGE_TOKEN_CACHE_USER', False):
+                return (copy.copy(user), None)
+            return (self._get_or_create_user(psg_user_id), None)
+
         psg_user_id: str = self._get_user_id(token)
         user: User = self._get_or_create_user(psg_user_id)
+        verified_tokens.put(token, psg_user_id, user)
 
         return (user, None)
 
@@ -74,3 +174,142 @@ class TokenAuthentication(authentication.BaseAuthentication):
             raise AuthenticationFailed(e.message) from e
 
         return psg_user_id
+
+
+class _ActiveUserCache:
+    """
+    Ids de usuários conferidos há pouco (existem e estão ativos), por
+    CLAIMS_USER_CACHE_TTL segundos. Excluir ou desativar o usuário tira o id
+    do cache deste processo na hora; nos demais vale no máximo o TTL.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+
+    def __contains__(self, user_id) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(user_id)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._entries[user_id]
+                return False
+            return True
+
+    def add(self, user_id):
+        ttl = getattr(settings, 'CLAIMS_USER_CACHE_TTL', 60)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = time.time() + ttl
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+active_users = _ActiveUserCache()
+
+
+# request.user is a ClaimsUser, and a proxy model sends its own signals
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def _forget_inactive_user(sender, instance, **kwargs):
+    if not instance.is_active:
+        active_users.discard(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ClaimsUser)
+def _forget_deleted_user(sender, instance, **kwargs):
+    active_users.discard(instance.pk)
+
+
+def _claims_user(user_id):
+    # the model raises ClaimsUser.DoesNotExist if the row is gone when a field loads;
+    # serializers read that as a missing value (null), so it becomes a 401 right there
+    user = ClaimsUser.from_claims(user_id)
+    load = user.refresh_from_db
+
+    def refresh_from_db(*args, **kwargs):
+        try:
+            load(*args, **kwargs)
+        except ClaimsUser.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+    user.refresh_from_db = refresh_from_db
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication sem a consulta ao usuário a cada requisição.
+
+    A primeira requisição de um usuário (e a primeira depois de
+    CLAIMS_USER_CACHE_TTL) faz a consulta normal, que recusa usuários
+    inexistentes ou inativos, e guarda o id em `active_users`. As seguintes
+    recebem um ClaimsUser com o id das claims, e a linha só é lida se a view
+    usar outro campo. Com CHECK_REVOKE_TOKEN (SIMPLE_JWT) o usuário é sempre
+    consultado, como no JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if jwt_settings.CHECK_REVOKE_TOKEN or jwt_settings.USER_ID_FIELD != ClaimsUser._meta.pk.attname:
+            return super().get_user(validated_token)
+        try:
+            user_id = ClaimsUser._meta.pk.to_python(validated_token[jwt_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if user_id not in active_users:
+            # raises AuthenticationFailed for missing or inactive users
+            user = super().get_user(validated_token)
+            active_users.add(user.pk)
+            return user
+        return _claims_user(user_id)
+
+
+class OptionalAuthentication(authentication.BaseAuthentication):
+    """
+    Autenticação opcional para endpoints abertos a visitantes (chat).
+
+    Tenta o header Authorization uma única vez por requisição (JWT, depois
+    Passage). Sem header a requisição segue como visitante; com um header que
+    nenhum esquema aceita (token inválido, expirado ou malformado) a resposta é
+    401, para o cliente renovar o token em vez de virar visitante sem saber. O
+    DRF guarda o resultado em request.user, então a view não precisa
+    autenticar de novo.
+    """
+
+    def __init__(self):
+        self.backends = [ClaimsJWTAuthentication(), TokenAuthentication()]
+
+    def authenticate(self, request):
+        if not request.headers.get('Authorization'):
+            return None
+        error = None
+        for backend in self.backends:
+            try:
+                result = backend.authenticate(request)
+            except (AuthenticationFailed, IndexError) as e:
+                # invalid/expired or malformed for this scheme: try the next one
+                error = e
+                continue
+            if result:
+                logger.debug('Authenticated user via %s: %s', type(backend).__name__, getattr(result[0], 'email', None))
+                return result
+        if isinstance(error, AuthenticationFailed):
+            raise error
+        raise AuthenticationFailed('Token inválido ou expirado.')
+
+    def authenticate_header(self, request):
+        return 'Bearer'
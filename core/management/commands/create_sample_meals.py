@@ -4,6 +4,7 @@ from django.utils import timezone
 from core.models.fooditem import FoodItem
 from core.models import User
 from core.models.meal import Meal, IngredientEntry
+from core.services import taco_db
 
 
 class Command(BaseCommand):
@@ -43,7 +44,7 @@ class Command(BaseCommand):
             for j in range(4):
                 fi = fis[(i*4 + j) % len(fis)]
                 grams = 100.0
-                entry = IngredientEntry.objects.create(meal=meal, food_name=fi.name, weight_grams=grams, calories=fi.calories * grams/fi.weight_grams, protein=fi.protein * grams/fi.weight_grams, carbs=fi.carbs * grams/fi.weight_grams, fat=fi.fat * grams/fi.weight_grams)
+                entry = IngredientEntry.objects.create(meal=meal, food=fi, food_name=fi.name, **taco_db.per_gram(fi), weight_grams=grams, calories=fi.calories * grams/fi.weight_grams, protein=fi.protein * grams/fi.weight_grams, carbs=fi.carbs * grams/fi.weight_grams, fat=fi.fat * grams/fi.weight_grams)
                 total_cal += entry.calories
                 total_prot += entry.protein
                 total_carbs += entry.carbs
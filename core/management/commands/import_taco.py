@@ -1,14 +1,39 @@
 import csv
+import itertools
 import logging
 import os
+import time
 from decimal import Decimal
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
-from core.models.fooditem import FoodItem
+from core.models.fooditem import CONTENT_HASH_FIELDS, MICRONUTRIENTS, FoodItem, normalize_food_name
+from core.services import food_index
 
 logger = logging.getLogger(__name__)
 
+# fallback column positions (TACO layout) when the CSV has no header
+FALLBACK_COLUMNS = {'name': 1, 'energy': 3, 'protein': 5, 'fat': 6, 'carbs': 8, 'portion': None}
+
+# header substrings locating each MICRONUTRIENTS column
+MICRONUTRIENT_HEADERS = {
+    'moisture_pct': 'umidade', 'energy_kj': '(kj)', 'cholesterol_mg': 'colesterol', 'fiber_g': 'fibra',
+    'ash_g': 'cinzas', 'calcium_mg': 'cálcio', 'magnesium_mg': 'magnésio', 'manganese_mg': 'manganês',
+    'phosphorus_mg': 'fósforo', 'iron_mg': 'ferro', 'sodium_mg': 'sódio', 'potassium_mg': 'potássio',
+    'copper_mg': 'cobre', 'zinc_mg': 'zinco', 'retinol_mcg': 'retinol', 're_mcg': 're (mcg)', 'rae_mcg': 'rae (',
+    'thiamine_mg': 'tiamina', 'riboflavin_mg': 'riboflavina', 'pyridoxine_mg': 'piridoxina',
+    'niacin_mg': 'niacina', 'vitamin_c_mg': 'vitamina c',
+}
+
+HEADER_KEYWORDS = {
+    'alimento', 'descri', 'descrição', 'descricao', 'energia', 'kcal', 'proteína', 'proteina',
+    'lip', 'lipídeos', 'lipideos', 'gord', 'carbo', 'porção', 'porcao', 'por'
+}
+
+# fields rewritten on conflict (same normalized name) when --update is given
+UPDATE_FIELDS = [*CONTENT_HASH_FIELDS, 'content_hash']
+
 
 def _to_float(v: str) -> float:
     if v is None:
@@ -24,12 +49,173 @@ def _to_float(v: str) -> float:
         return 0.0
 
 
+def _to_optional_float(v: str):
+    """Like _to_float, but keeps 'not analysed' (NA / blank) as None; 'Tr' (trace) is 0."""
+    if v is None or not str(v).strip() or str(v).strip().upper() == 'NA':
+        return None
+    return _to_float(v)
+
+
+def _first_cell(row) -> str:
+    return row[0].strip() if row else ''
+
+
+def _is_blank(row) -> bool:
+    return not row or all((not c or c.strip() == '') for c in row)
+
+
+def _looks_like_number(s) -> bool:
+    if s is None:
+        return False
+    s = str(s).strip().replace(',', '.')
+    try:
+        float(s)
+        return True
+    except Exception:
+        return False
+
+
+def _is_group_row(row) -> bool:
+    """Food-group rows such as 'Cereais e derivados': text in the first cell only."""
+    first = _first_cell(row)
+    return bool(first) and not first.isdigit() and all(not c or not c.strip() for c in row[1:])
+
+
+def _aggregate_header(header_rows):
+    """Join a multi-line header column-wise (e.g. 'Carbo-' + 'idrato')."""
+    max_cols = max((len(r) for r in header_rows), default=0)
+    header = []
+    for col in range(max_cols):
+        parts = [str(hr[col]).strip() for hr in header_rows if col < len(hr) and hr[col] and str(hr[col]).strip()]
+        header.append(' '.join(parts).lower())
+    return header
+
+
+def _columns_from_header(header):
+    def index_of(*keys):
+        for k in keys:
+            for i, h in enumerate(header):
+                if h and k in h:
+                    return i
+        return None
+
+    name_i = index_of('descrição', 'alimento')
+    return {
+        # fallback use second column
+        'name': name_i if name_i is not None else 1,
+        'energy': index_of('energia', 'kcal'),
+        'protein': index_of('proteína'),
+        'fat': index_of('lip', 'lipídeos', 'lipideos', 'gord'),
+        'carbs': index_of('carbo'),
+        'portion': index_of('porção', 'porcao', 'por'),
+        **{key: index_of(label) for key, label in MICRONUTRIENT_HEADERS.items()},
+    }
+
+
+def _find_header_row(rows):
+    """Keyword heuristic for files whose records do not start with a numeric id."""
+    for i, row in enumerate(rows):
+        tokens = ' '.join(str(c).lower().strip() for c in row if c and str(c).strip())
+        # count how many keyword substrings appear
+        matches = sum(1 for k in HEADER_KEYWORDS if k in tokens)
+        if matches >= 2:
+            return i
+        # if row contains one keyword, check the next row: if the next row has numeric values in likely positions,
+        # assume this row is a header
+        if matches == 1 and i + 1 < len(rows):
+            if sum(1 for c in rows[i + 1] if _looks_like_number(c)) >= 2:
+                return i
+    return None
+
+
+def _numeric_records(rows, group=''):
+    """Yield (food_group, row) for records (numeric first cell), tracking group rows in between."""
+    for row in rows:
+        first = _first_cell(row)
+        if first.isdigit():
+            yield group, row
+        elif _is_group_row(row):
+            group = first
+
+
+def detect_layout(reader):
+    """Consume the header block of `reader` and return (columns, records, via_fallback).
+
+    Only the rows before the first record are buffered; `records` is a lazy
+    iterator of (food_group, row) over the rest of the file. Returns None when
+    no layout is found.
+    """
+    header_rows = []
+    group = ''
+    for row in reader:
+        if _first_cell(row).isdigit():
+            records = _numeric_records(itertools.chain([row], reader), group)
+            if not header_rows:
+                return FALLBACK_COLUMNS, records, True
+            return _columns_from_header(_aggregate_header(header_rows)), records, False
+        if _is_group_row(row):
+            group = _first_cell(row)
+        else:
+            header_rows.append(row)
+
+    # no numeric record ids at all: look for a single header row
+    header_i = _find_header_row(header_rows)
+    if header_i is None:
+        return None
+    header = [str(h).lower().strip() for h in header_rows[header_i]]
+    records = (('', r) for r in header_rows[header_i + 1:] if not _is_blank(r))
+    return _columns_from_header(header), records, False
+
+
+def parse_row(row, columns, food_group=''):
+    """Build an unsaved FoodItem from a CSV record (None for rows without a name)."""
+    if _is_blank(row):
+        return None
+
+    def cell(key):
+        i = columns.get(key)
+        return row[i] if i is not None and i < len(row) else None
+
+    name = (cell('name') or '').strip()
+    search_name = normalize_food_name(name)
+    if not search_name:
+        return None
+
+    portion = (cell('portion') or '').strip()
+    fi = FoodItem(
+        name=name,
+        search_name=search_name,
+        portion=portion or '100g',
+        # weight_grams - we default to 100g (TACO values are per 100g)
+        weight_grams=100.0,
+        calories=_to_float(cell('energy')),
+        protein=_to_float(cell('protein')),
+        fat=_to_float(cell('fat')),
+        carbs=_to_float(cell('carbs')),
+        food_group=food_group,
+        nutrient_values=[_to_optional_float(cell(key)) for key in MICRONUTRIENTS],
+        country='Brasil',
+        languages='pt',
+    )
+    fi.content_hash = fi.compute_content_hash()
+    return fi
+
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
+
+
 class Command(BaseCommand):
     help = 'Importa o arquivo core/data/taco.csv para a tabela core_fooditem'
 
     def add_arguments(self, parser):
         parser.add_argument('--path', type=str, help='Caminho para taco.csv (default core/data/taco.csv)')
-        parser.add_argument('--update', action='store_true', help='Atualizar registros existentes')
+        parser.add_argument('--update', action='store_true', help='Atualizar registros existentes que mudaram')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar o diff (novos, alterados e removidos) sem gravar nada')
+        parser.add_argument('--batch-size', type=int, default=500, help='Linhas por bulk upsert (default 500)')
         parser.add_argument('--quiet', action='store_true', help='Run quietly (suppress stdout/stderr prints)')
 
     def handle(self, *args, **options):
@@ -38,234 +224,88 @@ class Command(BaseCommand):
             self.stderr.write(self.style.ERROR(f'Arquivo não encontrado: {path}'))
             return
 
-        created = 0
-        updated = 0
+        started = time.perf_counter()
+        dry_run = options.get('dry_run')
+        stats = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        diff = {'new': [], 'changed': [], 'removed': []}
+        seen = set()
 
-        # Open with universal newline and use csv reader
+        # Open with universal newline and stream through the csv reader
         with open(path, newline='', encoding='utf-8') as fh:
-            reader = csv.reader(fh)
-            rows = list(reader)
-
-            # Determine header block (the TACO file uses a multi-line header in many cases).
-            # Find first data row (where first column looks numeric) and treat all prior rows as header rows.
-            header_row = None
-            header = []
-            header_rows = []
-            data_start_idx = None
-            for i, row in enumerate(rows):
-                first = row[0].strip() if len(row) > 0 else ''
-                if first.isdigit():
-                    data_start_idx = i
-                    break
-
-            if data_start_idx is not None and data_start_idx > 0:
-                header_rows = rows[:data_start_idx]
-                data_rows = rows[data_start_idx:]
-                # Build aggregated header columns by joining header_rows column-wise
-                max_cols = max((len(r) for r in header_rows), default=0)
-                agg_header = []
-                for col in range(max_cols):
-                    parts = []
-                    for hr in header_rows:
-                        if col < len(hr) and hr[col] and str(hr[col]).strip():
-                            parts.append(str(hr[col]).strip())
-                    agg_header.append(' '.join(parts).lower())
-                header = agg_header
-                # pick the first row of header_rows as representative for finding indexes later
-                header_row = header_rows[-1]
-            else:
-                header_rows = []
-                data_rows = rows
-            header_keywords = {
-                'alimento', 'descri', 'descrição', 'descricao', 'energia', 'kcal', 'proteína', 'proteina',
-                'lip', 'lipídeos', 'lipideos', 'gord', 'carbo', 'porção', 'porcao', 'por'
-            }
-
-            def row_tokens(r):
-                return [str(c).lower().strip() for c in r if c and str(c).strip()]
-
-            def looks_like_number(s):
-                if s is None:
-                    return False
-                s = str(s).strip().replace(',', '.')
-                try:
-                    float(s)
-                    return True
-                except Exception:
-                    return False
-
-            # If header_rows was not detected by numeric-first heuristic, try heuristics across any single row
-            if not header_rows:
-                for i, row in enumerate(rows):
-                    tokens = ' '.join(row_tokens(row))
-                    # count how many keyword substrings appear
-                    matches = sum(1 for k in header_keywords if k in tokens)
-                    if matches >= 2:
-                        header_row = row
-                        break
-
-                    # if row contains one keyword, check the next row: if the next row has numeric values in likely positions,
-                    # assume this row is a header
-                    if matches == 1 and i + 1 < len(rows):
-                        nxt = rows[i + 1]
-                        # check if there are at least two numeric-like cells in the next row
-                        num_count = sum(1 for c in nxt if looks_like_number(c))
-                        if num_count >= 2:
-                            header_row = row
-                            break
-
-            if not header_row:
-                # fallback parsing: attempt to detect data rows where first column is numeric (row id)
-                fh.seek(0)
-                # reload rows we already read above
-                # 'rows' variable already available
-                data_rows = []
-                for row in rows:
-                    if not row:
-                        continue
-                    first = row[0].strip() if len(row) > 0 else ''
-                    # detect rows that begin with a number (record entries)
-                    if first.isdigit():
-                        data_rows.append(row)
-
-                if not data_rows:
-                    if not options.get('quiet'):
-                        self.stderr.write(self.style.ERROR('Não foi possível localizar o header no CSV e nenhum data-row identificado'))
-                    return
-
-                # process rows using default column positions as fallback
-                name_i = 1
-                energy_i = 3
-                protein_i = 5
-                fat_i = 6
-                carbs_i = 8
-                portion_i = None
-
-                for row in data_rows:
-                    if not row or all((not c or c.strip() == '') for c in row):
-                        continue
-
-                    name = row[name_i].strip() if name_i < len(row) else ''
-                    if not name:
-                        continue
-
-                    kcal = _to_float(row[energy_i]) if energy_i < len(row) else 0.0
-                    protein = _to_float(row[protein_i]) if protein_i < len(row) else 0.0
-                    fat = _to_float(row[fat_i]) if fat_i < len(row) else 0.0
-                    carbs = _to_float(row[carbs_i]) if carbs_i < len(row) else 0.0
-
-                    portion = ''
-                    weight = 100.0
-
-                    fi_qs = FoodItem.objects.filter(name__iexact=name)
-                    if fi_qs.exists():
-                        fi = fi_qs.first()
-                        if options.get('update'):
-                            fi.portion = portion or fi.portion
-                            fi.weight_grams = weight
-                            fi.calories = kcal
-                            fi.protein = protein
-                            fi.carbs = carbs
-                            fi.fat = fat
-                            fi.save()
-                            updated += 1
-                    else:
-                        FoodItem.objects.create(
-                            name=name,
-                            portion=portion or '100g',
-                            weight_grams=weight,
-                            calories=kcal,
-                            protein=protein,
-                            carbs=carbs,
-                            fat=fat,
-                            country='Brasil',
-                            languages='pt',
-                        )
-                        created += 1
-
+            layout = detect_layout(csv.reader(fh))
+            if layout is None:
                 if not options.get('quiet'):
-                    self.stdout.write(self.style.SUCCESS(f'Import finished via fallback. Created={created} Updated={updated}'))
+                    self.stderr.write(self.style.ERROR('Não foi possível localizar o header no CSV e nenhum data-row identificado'))
                 return
+            columns, records, via_fallback = layout
+
+            items = (fi for fi in (parse_row(row, columns, group) for group, row in records) if fi is not None)
+            with transaction.atomic():
+                for batch in batched(items, max(1, options['batch_size'])):
+                    self._write_batch(batch, options.get('update') or dry_run, dry_run, stats, diff)
+                    seen.update(fi.search_name for fi in batch)
+
+        if dry_run:
+            existing = FoodItem.objects.order_by('search_name').values_list('search_name', 'name')
+            diff['removed'] = [name for key, name in existing if key not in seen]
+            if not options.get('quiet'):
+                self._print_diff(diff)
+            return
 
-            # Normalize header indexes (header variable may be aggregated or built from header_row)
-            if not header:
-                header = [h.lower().strip() for h in header_row]
-
-            def index_of(*keys):
-                for k in keys:
-                    for i, h in enumerate(header):
-                        if h and k in h:
-                            return i
-                return None
-
-            name_i = index_of('descrição', 'alimento')
-            energy_i = index_of('energia', 'kcal')
-            protein_i = index_of('proteína')
-            fat_i = index_of('lip', 'lipídeos', 'lipideos', 'gord')
-            carbs_i = index_of('carbo')
-            portion_i = index_of('porção', 'porcao', 'por')
-
-            # Now iterate remaining rows and parse
-            # If we built data_rows earlier, iterate those; otherwise iterate rows after header_row
-            if data_rows and len(data_rows) > 0:
-                iter_rows = data_rows
-            else:
-                iter_rows = rows[rows.index(header_row) + 1:]
-
-            for row in iter_rows:
-                if not row or all((not c or c.strip() == '') for c in row):
-                        continue
-
-                # Get name
-                name = ''
-                if name_i is not None and name_i < len(row):
-                    name = row[name_i].strip()
-                else:
-                    # fallback use second column
-                    if len(row) > 1:
-                        name = row[1].strip()
-
-                if not name:
-                    continue
-
-                kcal = _to_float(row[energy_i]) if energy_i is not None and energy_i < len(row) else 0.0
-                protein = _to_float(row[protein_i]) if protein_i is not None and protein_i < len(row) else 0.0
-                fat = _to_float(row[fat_i]) if fat_i is not None and fat_i < len(row) else 0.0
-                carbs = _to_float(row[carbs_i]) if carbs_i is not None and carbs_i < len(row) else 0.0
-
-                portion = ''
-                if portion_i is not None and portion_i < len(row):
-                    portion = row[portion_i].strip()
-
-                # weight_grams - we default to 100g (TACO values are per 100g)
-                weight = 100.0
-
-                # Create or update
-                fi_qs = FoodItem.objects.filter(name__iexact=name)
-                if fi_qs.exists():
-                    fi = fi_qs.first()
-                    if options.get('update'):
-                        fi.portion = portion or fi.portion
-                        fi.weight_grams = weight
-                        fi.calories = kcal
-                        fi.protein = protein
-                        fi.carbs = carbs
-                        fi.fat = fat
-                        fi.save()
-                        updated += 1
-                else:
-                    FoodItem.objects.create(
-                        name=name,
-                        portion=portion or '100g',
-                        weight_grams=weight,
-                        calories=kcal,
-                        protein=protein,
-                        carbs=carbs,
-                        fat=fat,
-                        country='Brasil',
-                        languages='pt',
-                    )
-                    created += 1
+        # only touch downstream caches when something was actually written
+        if stats['created'] or stats['updated']:
+            food_index.invalidate()
 
         if not options.get('quiet'):
-            self.stdout.write(self.style.SUCCESS(f'Import finished. Created={created} Updated={updated}'))
\ No newline at end of file
+            elapsed = time.perf_counter() - started
+            rate = stats['rows'] / elapsed if elapsed > 0 else 0.0
+            label = 'Import finished via fallback.' if via_fallback else 'Import finished.'
+            self.stdout.write(self.style.SUCCESS(
+                f"{label} Created={stats['created']} Updated={stats['updated']} Unchanged={stats['unchanged']} "
+                f"Skipped={stats['skipped']} ({stats['rows']} rows in {elapsed:.2f}s, {rate:.0f} rows/s)"
+            ))
+
+    def _write_batch(self, batch, update, dry_run, stats, diff):
+        """Upsert one batch: one SELECT to classify rows by content hash, one INSERT ... ON CONFLICT for the delta."""
+        by_key = {fi.search_name: fi for fi in batch}  # last occurrence wins inside a batch
+        existing = {
+            row['search_name']: row
+            for row in FoodItem.objects.filter(search_name__in=by_key).values('search_name', *UPDATE_FIELDS)
+        }
+
+        new = [fi for key, fi in by_key.items() if key not in existing]
+        differing = [fi for key, fi in by_key.items() if key in existing and existing[key]['content_hash'] != fi.content_hash]
+        changed = differing if update else []
+
+        if dry_run:
+            diff['new'].extend(fi.name for fi in new)
+            for fi in changed:
+                old = existing[fi.search_name]
+                fields = [f for f in CONTENT_HASH_FIELDS if old[f] != getattr(fi, f)]
+                diff['changed'].append((fi.name, [(f, old[f], getattr(fi, f)) for f in fields]))
+        elif new or changed:
+            FoodItem.objects.bulk_create(
+                new + changed,
+                update_conflicts=True,
+                unique_fields=['search_name'],
+                update_fields=UPDATE_FIELDS,
+            )
+
+        stats['rows'] += len(batch)
+        stats['created'] += len(new)
+        stats['updated'] += len(changed)
+        stats['skipped'] += len(differing) - len(changed)
+        stats['unchanged'] += len(by_key) - len(new) - len(differing)
+
+    def _print_diff(self, diff):
+        for name in diff['new']:
+            self.stdout.write(f'+ {name}')
+        for name, fields in diff['changed']:
+            changes = ', '.join(f'{field}: {old!r} -> {new!r}' for field, old, new in fields)
+            self.stdout.write(f'~ {name} ({changes})')
+        for name in diff['removed']:
+            self.stdout.write(f'- {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Dry run: New={len(diff['new'])} Changed={len(diff['changed'])} Removed={len(diff['removed'])} "
+            '(nothing written)'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.services import daily_totals
+
+
+class Command(BaseCommand):
+    help = 'Recria a tabela core_dailynutritiontotals a partir das refeições (core_meal)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='Limitar a um usuário (pode repetir)')
+
+    def handle(self, *args, **options):
+        created = daily_totals.rebuild(user_ids=options.get('user'))
+        self.stdout.write(self.style.SUCCESS(f'Rebuild finished. Rows={created}'))
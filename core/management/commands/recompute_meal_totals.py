@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.services import meal_totals
+
+
+class Command(BaseCommand):
+    help = 'Recalcula macros de ingredientes e totais de refeições a partir da tabela core_fooditem'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--food', type=int, action='append', help='Limitar a um FoodItem (pode repetir)')
+        parser.add_argument('--vectorized', action='store_true',
+                            help='Calcular com a matriz de nutrientes em memória em vez de UPDATEs com subqueries')
+
+    def handle(self, *args, **options):
+        recompute = meal_totals.recompute_vectorized if options.get('vectorized') else meal_totals.recompute_from_catalog
+        updated = recompute(options.get('food'))
+        self.stdout.write(self.style.SUCCESS(f'Recompute finished. Meals={updated}'))
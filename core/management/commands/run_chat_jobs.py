@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services import chat_jobs
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de jobs de chat (core_chatjob) fora do servidor web'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Esvaziar a fila uma vez e sair')
+        parser.add_argument('--interval', type=float, default=1.0, help='Segundos entre consultas à fila')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            requeued = chat_jobs.requeue_stale()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale job(s)')
+            total += chat_jobs.drain()
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Done. Jobs={total}'))
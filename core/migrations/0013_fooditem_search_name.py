@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+from core.models.fooditem import normalize_food_name
+
+
+def backfill_search_name(apps, schema_editor):
+    FoodItem = apps.get_model('core', 'FoodItem')
+    items = list(FoodItem.objects.only('id', 'name'))
+    for fi in items:
+        fi.search_name = normalize_food_name(fi.name)
+    FoodItem.objects.bulk_update(items, ['search_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_workoutlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=300),
+        ),
+        migrations.RunPython(backfill_search_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_fooditem_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingrediententry',
+            name='calories_per_gram',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingrediententry',
+            name='carbs_per_gram',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingrediententry',
+            name='fat_per_gram',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingrediententry',
+            name='food',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingredient_entries', to='core.fooditem'),
+        ),
+        migrations.AddField(
+            model_name='ingrediententry',
+            name='protein_per_gram',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_daily_totals(apps, schema_editor):
+    Meal = apps.get_model('core', 'Meal')
+    DailyNutritionTotals = apps.get_model('core', 'DailyNutritionTotals')
+    rows = Meal.objects.values('user_id', 'date').annotate(
+        calories=models.Sum('total_calories'),
+        protein=models.Sum('total_protein'),
+        carbs=models.Sum('total_carbs'),
+        fat=models.Sum('total_fat'),
+        meal_count=models.Count('id'),
+    ).order_by()
+    DailyNutritionTotals.objects.bulk_create(
+        [
+            DailyNutritionTotals(
+                user_id=row['user_id'],
+                date=row['date'],
+                calories=row['calories'] or 0,
+                protein=row['protein'] or 0,
+                carbs=row['carbs'] or 0,
+                fat=row['fat'] or 0,
+                meal_count=row['meal_count'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_ingrediententry_food'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutritionTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories', models.FloatField(default=0)),
+                ('protein', models.FloatField(default=0)),
+                ('carbs', models.FloatField(default=0)),
+                ('fat', models.FloatField(default=0)),
+                ('meal_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_nutrition_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='unique_daily_totals_per_user_date')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+def merge_duplicate_search_names(apps, schema_editor):
+    """Keep the oldest FoodItem per search_name, repointing ingredients to it."""
+    FoodItem = apps.get_model('core', 'FoodItem')
+    IngredientEntry = apps.get_model('core', 'IngredientEntry')
+    dupes = (
+        FoodItem.objects.values('search_name')
+        .annotate(n=models.Count('id'), keep=models.Min('id'))
+        .filter(n__gt=1)
+        .order_by()
+    )
+    for row in dupes:
+        others = FoodItem.objects.filter(search_name=row['search_name']).exclude(pk=row['keep'])
+        IngredientEntry.objects.filter(food__in=others).update(food_id=row['keep'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_dailynutritiontotals'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_search_names, migrations.RunPython.noop),
+    ]
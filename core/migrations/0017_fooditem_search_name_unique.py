@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_fooditem_merge_duplicate_search_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fooditem',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=300, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+from core.models.fooditem import food_content_hash
+
+# hashed fields as of this migration
+HASHED_FIELDS = ('name', 'portion', 'weight_grams', 'calories', 'protein', 'carbs', 'fat')
+
+
+def backfill_content_hash(apps, schema_editor):
+    FoodItem = apps.get_model('core', 'FoodItem')
+    items = list(FoodItem.objects.only('id', *HASHED_FIELDS))
+    for fi in items:
+        fi.content_hash = food_content_hash({field: getattr(fi, field) for field in HASHED_FIELDS}, HASHED_FIELDS)
+    FoodItem.objects.bulk_update(items, ['content_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_fooditem_search_name_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+from core.models.fooditem import food_content_hash
+
+# hashed fields as of this migration
+HASHED_FIELDS = (
+    'name', 'portion', 'weight_grams', 'calories', 'protein', 'carbs', 'fat', 'food_group', 'nutrient_values',
+)
+
+
+def refresh_content_hash(apps, schema_editor):
+    """The hash now covers food_group/nutrient_values; re-run `import_taco --update` to load them."""
+    FoodItem = apps.get_model('core', 'FoodItem')
+    items = list(FoodItem.objects.only('id', *HASHED_FIELDS))
+    for fi in items:
+        fi.content_hash = food_content_hash({field: getattr(fi, field) for field in HASHED_FIELDS}, HASHED_FIELDS)
+    FoodItem.objects.bulk_update(items, ['content_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_fooditem_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='food_group',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=120),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='nutrient_values',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(refresh_content_hash, migrations.RunPython.noop),
+    ]
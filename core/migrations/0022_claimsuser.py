@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:28
+
+import core.models.user
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_chatjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimsUser',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('core.user',),
+            managers=[
+                ('objects', core.models.user.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_chatmessage_session_created_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chatmessage',
+            name='chatmsg_session_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'created_at', 'id'], name='chatmsg_session_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'date', 'time', 'id'], name='meal_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutlog',
+            index=models.Index(fields=['user', 'finished_at', 'id'], name='workoutlog_user_finished_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='chatsession_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingestaoagua',
+            index=models.Index(fields=['usuario', 'data', 'horario'], name='ingestaoagua_usuario_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='relatorioprogresso',
+            index=models.Index(fields=['usuario', 'data'], name='relatorio_usuario_data_idx'),
+        ),
+    ]
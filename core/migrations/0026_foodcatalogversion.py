@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+def create_row(apps, schema_editor):
+    FoodCatalogVersion = apps.get_model('core', 'FoodCatalogVersion')
+    FoodCatalogVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_per_user_time_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodCatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_row, migrations.RunPython.noop),
+    ]
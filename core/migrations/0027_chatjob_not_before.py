@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_foodcatalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatjob',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from .user import User
+from .user import User, ClaimsUser
 from .workout_log import WorkoutLog
 from .dieta import Dieta
 from .exercicio import Exercicio
@@ -8,6 +8,7 @@ from .relatorio_progresso import RelatorioProgresso
 from .treino import Treino
 from .treino_exercicio import TreinoExercicio
 from .chat import ChatMessage
+from .daily_nutrition_totals import DailyNutritionTotals
 try:  # import meal models so Django discovers them when the package is imported
 	from .meal import Meal, IngredientEntry  # type: ignore
 except Exception:
@@ -1,6 +1,28 @@
+import uuid
+
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Substr
 from django.conf import settings
 
+# caracteres da prévia da última mensagem na lista de sessões
+LAST_MESSAGE_PREVIEW = 120
+
+
+class ChatSessionQuerySet(models.QuerySet):
+    def with_last_message(self):
+        """Anota id, papel, prévia e data da última mensagem de cada sessão na mesma consulta
+        (subconsultas correlacionadas pelo índice session + created_at + id)."""
+        last = ChatMessage.objects.filter(session=OuterRef('pk')).order_by('-created_at', '-id')
+        return self.annotate(
+            last_message_id=Subquery(last.values('id')[:1]),
+            last_message_role=Subquery(last.values('role')[:1]),
+            last_message_preview=Subquery(
+                last.annotate(preview=Substr('content', 1, LAST_MESSAGE_PREVIEW)).values('preview')[:1]
+            ),
+            last_message_at=Subquery(last.values('created_at')[:1]),
+        )
+
 
 class ChatSession(models.Model):
     user = models.ForeignKey(
@@ -13,6 +35,17 @@ class ChatSession(models.Model):
     title = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # resumo das mensagens que já saíram da janela de contexto (ver core.services.chat_context)
+    summary = models.TextField(blank=True, default='')
+    summary_until = models.BigIntegerField(default=0)  # id da última mensagem incluída no resumo
+
+    objects = ChatSessionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # the user's sessions, most recently active first
+            models.Index(fields=['user', 'updated_at', 'id'], name='chatsession_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Session {self.pk} - {self.title or 'Sem título'}"
@@ -36,7 +69,65 @@ class ChatMessage(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # most recent messages of a session (context window)
+            models.Index(fields=['session', 'id'], name='chatmessage_session_id_idx'),
+            # last message per session (session list) and the history's keyset cursor
+            # (app.pagination.ChatMessagePagination)
+            models.Index(fields=['session', 'created_at', 'id'], name='chatmsg_session_created_idx'),
+        ]
+
     def __str__(self):
         if self.user:
             return f"{self.user} - {self.role}"
         return f"Guest - {self.role}"
+
+
+class ChatJob(models.Model):
+    """Pedido de chat em segundo plano (fila no próprio banco, ver core.services.chat_jobs)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Na fila'),
+        (RUNNING, 'Em execução'),
+        (DONE, 'Concluído'),
+        (FAILED, 'Falhou'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='chat_jobs'
+    )
+    session = models.ForeignKey(ChatSession, on_delete=models.SET_NULL, null=True, blank=True)
+    # Idempotency-Key do cliente, prefixada pelo dono (usuário ou IP do visitante)
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # back in the queue after a saturated pool: not claimed before this moment
+    not_before = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='chatjob_status_created_idx'),
+        ]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    def __str__(self):
+        return f"ChatJob {self.pk} ({self.status})"
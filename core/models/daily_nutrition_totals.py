@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import models
+
+
+class DailyNutritionTotals(models.Model):
+    """Rollup diário das refeições de um usuário (mantido por core.services.daily_totals)."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_nutrition_totals')
+    date = models.DateField()
+
+    calories = models.FloatField(default=0)
+    protein = models.FloatField(default=0)
+    carbs = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    meal_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_totals_per_user_date'),
+        ]
+
+    def __str__(self) -> str:
+        return f"DailyNutritionTotals(user={self.user_id}, date={self.date}, calories={self.calories})"
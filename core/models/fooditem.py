@@ -1,19 +1,69 @@
+import hashlib
+import json
+import re
+import unicodedata
+
+from django.core.exceptions import ValidationError
 from django.db import models
 
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_food_name(text: str) -> str:
+    """Chave de busca: minúsculas, sem acentos e sem pontuação ("Feijão, carioca" -> "feijao carioca")."""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    folded = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM_RE.sub(' ', folded).strip()
+
+
+# fixed order of FoodItem.nutrient_values (TACO columns besides the main macros)
+MICRONUTRIENTS = (
+    'moisture_pct', 'energy_kj', 'cholesterol_mg', 'fiber_g', 'ash_g', 'calcium_mg', 'magnesium_mg',
+    'manganese_mg', 'phosphorus_mg', 'iron_mg', 'sodium_mg', 'potassium_mg', 'copper_mg', 'zinc_mg',
+    'retinol_mcg', 're_mcg', 'rae_mcg', 'thiamine_mg', 'riboflavin_mg', 'pyridoxine_mg', 'niacin_mg',
+    'vitamin_c_mg',
+)
+
+# fields covered by FoodItem.content_hash (what import_taco writes)
+CONTENT_HASH_FIELDS = (
+    'name', 'portion', 'weight_grams', 'calories', 'protein', 'carbs', 'fat', 'food_group', 'nutrient_values',
+)
+
+
+def food_content_hash(values: dict, fields=CONTENT_HASH_FIELDS) -> str:
+    """sha256 dos campos `fields` em `values` (números normalizados para float)."""
+    parts = []
+    for field in fields:
+        value = values.get(field)
+        if isinstance(value, (list, tuple)):
+            parts.append(json.dumps([None if v is None else float(v) for v in value]))
+        else:
+            parts.append(repr(float(value)) if isinstance(value, (int, float)) else str(value or ''))
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
 
 class FoodItem(models.Model):
     """Dados de alimento carregados a partir da TACO (banco local).
 
     Campos principais:
     - name: nome do alimento
+    - search_name: `name` normalizado (ver normalize_food_name), único e indexado para buscas
     - portion: descrição da porção (quando disponível)
     - weight_grams: peso da porção em gramas (padrão: 100g)
     - calories, protein, carbs, fat: macros por porção (peso especificado)
+    - food_group: grupo TACO (ex.: 'Cereais e derivados')
+    - nutrient_values: demais nutrientes por porção, lista na ordem de MICRONUTRIENTS
+      (None = não analisado); ver a property `micronutrients`
     - country: origem (TACO -> Brasil)
     - languages: idioma(s) (ex.: 'pt')
+    - content_hash: hash dos valores importados (ver food_content_hash), usado pelo import_taco
+      para pular linhas que não mudaram
     """
 
     name = models.CharField(max_length=300)
+    search_name = models.CharField(max_length=300, unique=True, editable=False, default='')
     portion = models.CharField(max_length=200, blank=True, default='100g')
     weight_grams = models.FloatField(default=100.0)
 
@@ -22,14 +72,63 @@ class FoodItem(models.Model):
     carbs = models.FloatField(default=0.0)
     fat = models.FloatField(default=0.0)
 
+    food_group = models.CharField(max_length=120, blank=True, default='', db_index=True)
+    nutrient_values = models.JSONField(default=list, blank=True)
+
     # meta info
     country = models.CharField(max_length=80, default='Brasil')
     languages = models.CharField(max_length=50, default='pt')
 
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['name']
 
+    @property
+    def micronutrients(self) -> dict:
+        """{nome: valor} a partir de nutrient_values (chaves ausentes = None)."""
+        values = list(self.nutrient_values or [])
+        values += [None] * (len(MICRONUTRIENTS) - len(values))
+        return dict(zip(MICRONUTRIENTS, values))
+
+    def clean(self):
+        # search_name is not editable, so ModelForm (admin) never validates its unique constraint
+        key = normalize_food_name(self.name)
+        if not key:
+            raise ValidationError({'name': 'name must contain letters or digits'})
+        if FoodItem.objects.filter(search_name=key).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': 'A food with an equivalent name already exists'})
+
+    def compute_content_hash(self) -> str:
+        return food_content_hash({field: getattr(self, field) for field in CONTENT_HASH_FIELDS})
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_food_name(self.name)
+        self.content_hash = self.compute_content_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = set()
+            if 'name' in update_fields:
+                derived.add('search_name')
+            if set(update_fields) & set(CONTENT_HASH_FIELDS):
+                derived.add('content_hash')
+            kwargs['update_fields'] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"FoodItem(id={self.id}, name={self.name!r})"
+
+
+class FoodCatalogVersion(models.Model):
+    """Contador (linha única) incrementado a cada alteração do catálogo FoodItem.
+
+    Fica no banco para ser visto por todos os workers (inclusive o import_taco
+    rodando em outro processo); ver core.services.food_index.
+    """
+
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"FoodCatalogVersion({self.version})"
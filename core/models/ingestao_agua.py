@@ -10,5 +10,10 @@ class IngestaoAgua(models.Model):
         User, on_delete=models.CASCADE, related_name="ingestoes_agua"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'data', 'horario'], name='ingestaoagua_usuario_data_idx'),
+        ]
+
     def __str__(self):
         return f"{self.quantidade_ml}ml - {self.data}"
\ No newline at end of file
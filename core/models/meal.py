@@ -18,6 +18,17 @@ class Meal(models.Model):
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            # per-user history and its keyset cursor (app.pagination.MealPagination)
+            models.Index(fields=['user', 'date', 'time', 'id'], name='meal_user_date_time_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so the daily rollup can refresh the previous day if `date` changes
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
 
     def __str__(self) -> str:
         return f"Meal(id={self.id}, title={self.title!r}, user={getattr(self.user, 'email', str(self.user))})"
@@ -25,9 +36,19 @@ class Meal(models.Model):
 
 class IngredientEntry(models.Model):
     meal = models.ForeignKey(Meal, on_delete=models.CASCADE, related_name='ingredients')
+    # FoodItem resolvido na criação (None quando o nome não foi encontrado no catálogo)
+    food = models.ForeignKey(
+        'core.FoodItem', on_delete=models.SET_NULL, null=True, blank=True, related_name='ingredient_entries'
+    )
     food_name = models.CharField(max_length=200)
     weight_grams = models.FloatField()
 
+    # macros por grama do FoodItem usado no cálculo (snapshot)
+    calories_per_gram = models.FloatField(null=True, blank=True)
+    protein_per_gram = models.FloatField(null=True, blank=True)
+    carbs_per_gram = models.FloatField(null=True, blank=True)
+    fat_per_gram = models.FloatField(null=True, blank=True)
+
     calories = models.FloatField(default=0)
     protein = models.FloatField(default=0)
     fat = models.FloatField(default=0)
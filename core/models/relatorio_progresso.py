@@ -8,6 +8,11 @@ class RelatorioProgresso(models.Model):
     percentual_gordura = models.DecimalField(max_digits=5, decimal_places=2)
     percentual_massa_magra = models.DecimalField(max_digits=5, decimal_places=2)
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='relatorios_progresso')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'data'], name='relatorio_usuario_data_idx'),
+        ]
     
     def __str__(self):
         return f"{self.usuario.username} - {self.data}"
\ No newline at end of file
@@ -107,3 +107,30 @@ class User(AbstractBaseUser, PermissionsMixin):
 
         verbose_name = "Usuário"
         verbose_name_plural = "Usuários"
+
+
+class ClaimsUser(User):
+    """
+    Usuário montado a partir das claims do JWT (core.authentication.ClaimsJWTAuthentication).
+
+    Só o id vem carregado; o primeiro acesso a qualquer outro campo carrega
+    todos de uma vez (uma consulta por requisição, em vez de uma por campo).
+    Endpoints que só filtram por request.user não consultam a tabela de usuários.
+    Se a linha sumiu nesse meio tempo, o acesso levanta ClaimsUser.DoesNotExist
+    (subclasse de User.DoesNotExist), que core.authentication traduz em 401.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id):
+        # the claim may be a string (simplejwt serializes the id)
+        return cls.from_db(None, [cls._meta.pk.attname], [cls._meta.pk.to_python(user_id)])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            # loading a deferred field: load the whole row (memoized on this instance)
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
@@ -16,6 +16,10 @@ class WorkoutLog(models.Model):
     class Meta:
         db_table = 'core_workoutlog'
         ordering = ['-finished_at']
+        indexes = [
+            # per-user history and its keyset cursor (app.pagination.WorkoutLogPagination)
+            models.Index(fields=['user', 'finished_at', 'id'], name='workoutlog_user_finished_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.workout_slug or 'unknown'} @ {self.finished_at}" 
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from core.models.chat import ChatMessage
+from core.models.chat import ChatJob, ChatMessage
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
@@ -7,3 +7,10 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         model = ChatMessage
         fields = ['id', 'role', 'content', 'created_at', 'session']
         read_only_fields = ['id', 'created_at']
+
+
+class ChatJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatJob
+        fields = ['id', 'status', 'result', 'error', 'session', 'created_at', 'finished_at']
+        read_only_fields = fields
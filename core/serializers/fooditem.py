@@ -1,9 +1,42 @@
 from rest_framework import serializers
 
-from core.models.fooditem import FoodItem
+from core.models.fooditem import FoodItem, normalize_food_name
 
 
 class FoodItemSerializer(serializers.ModelSerializer):
+    """Serializer de FoodItem com seleção de campos.
+
+    `fields` (kwarg ou ?fields=a,b no FoodItemViewSet) limita os campos retornados;
+    LIST_FIELDS é o conjunto enxuto usado por padrão nas listagens.
+    """
+
+    LIST_FIELDS = (
+        'id', 'name', 'portion', 'weight_grams', 'calories', 'protein', 'carbs', 'fat', 'food_group',
+        'country', 'languages',
+    )
+
+    micronutrients = serializers.DictField(child=serializers.FloatField(allow_null=True), read_only=True)
+
     class Meta:
         model = FoodItem
-        fields = ('id', 'name', 'portion', 'weight_grams', 'calories', 'protein', 'carbs', 'fat', 'country', 'languages')
+        fields = (
+            'id', 'name', 'portion', 'weight_grams', 'calories', 'protein', 'carbs', 'fat', 'food_group',
+            'micronutrients', 'country', 'languages',
+        )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def validate_name(self, value):
+        key = normalize_food_name(value)
+        if not key:
+            raise serializers.ValidationError('name must contain letters or digits')
+        qs = FoodItem.objects.filter(search_name=key)
+        if self.instance is not None:
+            qs = qs.exclude(pk=self.instance.pk)
+        if qs.exists():
+            raise serializers.ValidationError('A food with an equivalent name already exists')
+        return value
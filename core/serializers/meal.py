@@ -1,12 +1,15 @@
 from rest_framework import serializers
 
 from core.models.meal import Meal, IngredientEntry
+from core.services import meal_summary
 
 
 class IngredientEntrySerializer(serializers.ModelSerializer):
+    food_id = serializers.IntegerField(read_only=True, allow_null=True)
+
     class Meta:
         model = IngredientEntry
-        fields = ('id', 'food_name', 'weight_grams', 'calories', 'protein', 'fat', 'carbs')
+        fields = ('id', 'food_id', 'food_name', 'weight_grams', 'calories', 'protein', 'fat', 'carbs')
 
 
 class MealSerializer(serializers.ModelSerializer):
@@ -37,3 +40,18 @@ class MealCreateSerializer(serializers.Serializer):
     def validate(self, data):
         # Basic validation already covered by fields.
         return data
+
+
+class MealSummaryQuerySerializer(serializers.Serializer):
+    MAX_BUCKETS = 400
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+    bucket = serializers.ChoiceField(choices=meal_summary.BUCKETS, default='day')
+
+    def validate(self, data):
+        if data['end'] < data['start']:
+            raise serializers.ValidationError({'end': 'end must be on or after start'})
+        if meal_summary.bucket_count(data['start'], data['end'], data['bucket']) > self.MAX_BUCKETS:
+            raise serializers.ValidationError(f'Range too large: at most {self.MAX_BUCKETS} buckets per request')
+        return data
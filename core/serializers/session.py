@@ -1,10 +1,9 @@
 from rest_framework import serializers
-from core.models.chat import ChatSession, ChatMessage
-from core.serializers.chat import ChatMessageSerializer
+from core.models.chat import ChatSession
 
 
 class ChatSessionSerializer(serializers.ModelSerializer):
-    # include last message preview
+    # include last message: a preview on the list (annotation), the full message on the detail
     last_message = serializers.SerializerMethodField()
 
     class Meta:
@@ -12,7 +11,18 @@ class ChatSessionSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'created_at', 'updated_at', 'last_message']
 
     def get_last_message(self, obj):
-        last = obj.messages.order_by('-created_at').first()
+        if hasattr(obj, 'last_message_id'):
+            # annotated by ChatSession.objects.with_last_message(): no extra query
+            if obj.last_message_id is None:
+                return None
+            return {
+                'id': obj.last_message_id,
+                'role': obj.last_message_role,
+                'content': obj.last_message_preview,
+                'created_at': obj.last_message_at,
+            }
+
+        last = obj.messages.order_by('-created_at', '-id').first()
         if not last:
             return None
         return {
@@ -0,0 +1,173 @@
+"""
+Regras do chatbot (personal trainer / nutricionista) compartilhadas pelos
+endpoints de chat: detecção de intenção, montagem do prompt de sistema,
+interpretação da resposta do modelo e persistência da conversa.
+"""
+import json
+import re
+from typing import Dict, Optional, Sequence
+
+from core.models.chat import ChatMessage, ChatSession
+
+TREINO_KEYWORDS = ['treino', 'exercicio', 'exercício', 'musculação', 'academia', 'workout', 'malhar']
+DIETA_KEYWORDS = ['dieta', 'alimentação', 'alimentacao', 'comida', 'comer', 'refeição', 'refeicao', 'nutricao', 'nutrição', 'cardápio']
+
+def user_profile(user) -> Dict[str, str]:
+    """Dados do perfil incluídos no prompt (vazio para visitantes)."""
+    if not user:
+        return {}
+    return {
+        "Nome": getattr(user, "name", "Não informado"),
+        "Peso": getattr(user, "peso_kg", "Não informado"),
+        "Altura": getattr(user, "altura_cm", "Não informado"),
+        "Objetivo": getattr(user, "objetivo", "Não informado"),
+        "Meta_peso": getattr(user, "meta_peso", "Não informado"),
+        "Dias_treino": getattr(user, "dias_treino", "Não informado"),
+        "Grupo_foco": getattr(user, "grupo_foco", "Não informado"),
+    }
+
+
+def detect_intent(message: str) -> str:
+    """'treino', 'dieta', 'ambos' ou 'conversa', pelas palavras-chave da mensagem."""
+    message_lower = message.lower()
+    solicita_treino = any(keyword in message_lower for keyword in TREINO_KEYWORDS)
+    solicita_dieta = any(keyword in message_lower for keyword in DIETA_KEYWORDS)
+    if solicita_treino and solicita_dieta:
+        return 'ambos'
+    if solicita_treino:
+        return 'treino'
+    if solicita_dieta:
+        return 'dieta'
+    return 'conversa'
+
+
+def user_data_str(user) -> str:
+    return ", ".join(f"{k}: {v}" for k, v in user_profile(user).items() if v and v != "Não informado")
+
+
+def build_system_prompt(intent: str, user) -> str:
+    profile = user_data_str(user)
+
+    if intent == 'treino':
+        return f"""Você é personal trainer. Crie um plano de treino em português brasileiro.
+
+Dados: {profile}
+
+Responda apenas no formato JSON:
+{{"treino": "seu plano de treino aqui", "dieta": ""}}
+
+Plano de treino:
+- Segunda: Liste exercícios com séries e repetições
+- Quarta: Liste exercícios com séries e repetições
+- Sexta: Liste exercícios com séries e repetições
+
+Seja motivador e use os dados fornecidos."""
+
+    if intent == 'dieta':
+        return f"""Você é nutricionista. Crie um plano alimentar em português brasileiro.
+
+Dados: {profile}
+
+Responda apenas no formato JSON:
+{{"treino": "", "dieta": "seu plano alimentar aqui"}}
+
+Plano alimentar:
+- Café da manhã: alimentos e calorias
+- Almoço: alimentos e calorias
+- Jantar: alimentos e calorias
+- Lanches: alimentos e calorias
+
+Seja motivador e use os dados fornecidos."""
+
+    if intent == 'ambos':
+        return f"""Você é personal trainer e nutricionista. Crie treino E dieta em português brasileiro.
+
+Dados: {profile}
+
+Responda apenas no formato JSON:
+{{"treino": "plano de treino", "dieta": "plano alimentar"}}
+
+Seja breve, motivador e use os dados fornecidos."""
+
+    return f"""Você é FitAI, assistente fitness amigável.
+
+Dados do usuário: {profile if profile else "Sem dados"}
+
+Responda brevemente e com simpatia em português brasileiro.
+
+Formato JSON:
+{{"treino": "", "dieta": "sua resposta amigável aqui"}}
+
+Seja simpática e pergunte como pode ajudar."""
+
+
+def build_messages(user_message: str, user, context: Sequence[Dict] = ()):
+    """Prompt de sistema, contexto da sessão (ver core.services.chat_context) e a mensagem nova."""
+    system_prompt = build_system_prompt(detect_intent(user_message), user)
+    return [
+        {"role": "system", "content": system_prompt},
+        *context,
+        {"role": "user", "content": user_message},
+    ]
+
+
+def parse_reply(reply_text: str) -> Dict:
+    """Converte a resposta do modelo em {treino, dieta}; usa o texto como dieta quando não há JSON."""
+    candidates = [reply_text]
+    # Tenta extrair JSON
+    json_match = re.search(r'\{.*?\}', reply_text, re.DOTALL)
+    if json_match:
+        candidates.append(json_match.group(0))
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    # Fallback
+    return {"treino": "", "dieta": reply_text}
+
+
+def find_session(user, session_id) -> Optional[ChatSession]:
+    if not user or not session_id:
+        return None
+    try:
+        return ChatSession.objects.get(pk=session_id, user=user)
+    except (ChatSession.DoesNotExist, ValueError):
+        return None
+
+
+async def afind_session(user, session_id) -> Optional[ChatSession]:
+    if not user or not session_id:
+        return None
+    try:
+        return await ChatSession.objects.aget(pk=session_id, user=user)
+    except (ChatSession.DoesNotExist, ValueError):
+        return None
+
+
+def save_exchange(user, session: Optional[ChatSession], user_message: str, reply_text: str) -> Optional[ChatSession]:
+    """Grava a mensagem do usuário e a resposta (só para usuários logados); cria a sessão se preciso."""
+    if not user:
+        return None
+    if session is None:
+        title = (user_message[:60] + '...') if len(user_message) > 60 else user_message
+        session = ChatSession.objects.create(user=user, title=title)
+
+    ChatMessage.objects.create(user=user, role="user", content=user_message, session=session)
+    ChatMessage.objects.create(user=user, role="assistant", content=reply_text, session=session)
+    return session
+
+
+async def asave_exchange(user, session: Optional[ChatSession], user_message: str, reply_text: str) -> Optional[ChatSession]:
+    """Versão assíncrona de save_exchange (ORM assíncrono)."""
+    if not user:
+        return None
+    if session is None:
+        title = (user_message[:60] + '...') if len(user_message) > 60 else user_message
+        session = await ChatSession.objects.acreate(user=user, title=title)
+
+    await ChatMessage.objects.acreate(user=user, role="user", content=user_message, session=session)
+    await ChatMessage.objects.acreate(user=user, role="assistant", content=reply_text, session=session)
+    return session
@@ -0,0 +1,592 @@
+"""
+Backend do modelo de chat, escolhido em settings.CHAT_BACKEND (caminho da classe).
+
+Implementações:
+
+- HuggingFaceBackend (padrão): um InferenceClient de longa duração por
+  processo (a sessão HTTP do huggingface_hub reaproveita as conexões
+  keep-alive) e um AsyncInferenceClient por event loop, com deadlines de
+  conexão e leitura (CHAT_CONNECT_TIMEOUT / CHAT_READ_TIMEOUT). Os clientes
+  vêm de fábricas recebidas no construtor (padrão: huggingface_hub);
+- LocalBackend: respostas {treino, dieta} determinísticas, sem rede, com
+  latência configurável (CHAT_LOCAL_LATENCY) e streaming opcional, para testes
+  e testes de carga do pipeline de chat.
+
+As funções do módulo (complete, stream, acomplete) valem para qualquer backend:
+toda chamada passa por um semáforo de CHAT_MAX_CONCURRENCY vagas (sem vaga em
+CHAT_QUEUE_TIMEOUT segundos levanta BackendSaturated, e a view responde 503) e
+alimenta as métricas de latência e fila expostas por metrics().
+
+complete() e acomplete() também agrupam chamadas idênticas simultâneas
+(single-flight, CHAT_COALESCE): enquanto uma conversa está em andamento, as
+requisições com as mesmas mensagens esperam por ela em vez de chamar o modelo
+de novo, sem ocupar vagas do pool. O streaming não é agrupado.
+
+Além do semáforo do processo, CHAT_GLOBAL_CONCURRENCY limita as chamadas
+simultâneas ao modelo somando todos os workers: um contador no cache
+'throttle', incrementado ao ocupar a vaga e decrementado ao liberá-la. Acima
+do limite a chamada também levanta BackendSaturated. O limite só vale quando
+esse cache tem incr/decr atômicos (Redis; o locmem do runserver conta só o
+próprio processo): no DatabaseCache eles são get()+set(), perderiam
+atualizações e o contador subiria até recusar tudo, então ali o limite fica
+desligado e vale só CHAT_MAX_CONCURRENCY por processo. O contador nasce com
+validade de GLOBAL_COUNTER_TTL segundos, que incr/decr não renovam: vagas
+perdidas por um worker que morreu no meio de uma chamada somem quando ele
+expira e é recriado do zero.
+"""
+import abc
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Iterable, Iterator, List
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.utils.module_loading import import_string
+
+try:
+    from huggingface_hub import AsyncInferenceClient, InferenceClient
+except ImportError:  # pragma: no cover - environment dependent
+    AsyncInferenceClient = InferenceClient = None
+try:
+    import httpx
+    TIMEOUT_ERRORS = (httpx.TimeoutException, TimeoutError)
+except ImportError:  # pragma: no cover - environment dependent
+    httpx = None
+    TIMEOUT_ERRORS = (TimeoutError,)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'core.services.chat_backend.HuggingFaceBackend'
+
+MAX_TOKENS = 1500  # Reduzido para evitar bugs
+TEMPERATURE = 0.4  # Bem conservador
+TOP_P = 0.7
+
+GLOBAL_CACHE_ALIAS = 'throttle'
+GLOBAL_COUNTER_KEY = 'chat:upstream:in_flight'
+GLOBAL_COUNTER_TTL = 600
+# cache backends whose incr()/decr() are atomic and keep the key's expiry
+ATOMIC_COUNTER_BACKENDS = (RedisCache, LocMemCache)
+
+
+class BackendUnavailable(Exception):
+    """Cliente do modelo não instalado/configurado."""
+
+
+class BackendSaturated(Exception):
+    """Nenhuma vaga livre no pool dentro de CHAT_QUEUE_TIMEOUT."""
+
+
+class BackendTimeout(Exception):
+    """O modelo não respondeu dentro dos deadlines configurados."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _Metrics:
+    """Contadores em memória do processo (latência, fila, rejeições)."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self.counts = {'requests': 0, 'errors': 0, 'timeouts': 0, 'rejected': 0, 'coalesced': 0}
+            self.in_flight = 0
+            self.waiting = 0
+            self.peak_waiting = 0
+            self.peak_in_flight = 0
+
+    def incr(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def queued(self, delta: int):
+        with self._lock:
+            self.waiting += delta
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.counts['requests'] += 1
+
+    def finished(self, seconds: float):
+        with self._lock:
+            self.in_flight -= 1
+            self._latencies.append(seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self.counts)
+            state = {
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'peak_in_flight': self.peak_in_flight,
+                'peak_waiting': self.peak_waiting,
+            }
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+        return {
+            **counts,
+            **state,
+            'max_concurrency': _setting('CHAT_MAX_CONCURRENCY', 8),
+            'latency_ms': {'p50': pct(0.5), 'p95': pct(0.95), 'max': pct(1.0), 'samples': len(latencies)},
+        }
+
+
+_metrics = _Metrics()
+
+
+def metrics() -> Dict:
+    return {
+        **_metrics.snapshot(),
+        'global_in_flight': global_in_flight(),
+        'global_max_concurrency': _setting('CHAT_GLOBAL_CONCURRENCY', 0),
+    }
+
+
+def _timeout():
+    read = float(_setting('CHAT_READ_TIMEOUT', 60))
+    connect = float(_setting('CHAT_CONNECT_TIMEOUT', 5))
+    return httpx.Timeout(read, connect=connect) if httpx is not None else read
+
+
+def _params(messages: List[Dict]) -> Dict:
+    return {'messages': messages, 'max_tokens': MAX_TOKENS, 'temperature': TEMPERATURE, 'top_p': TOP_P}
+
+
+class ChatBackend(abc.ABC):
+    """Interface dos backends: resposta completa, trechos em stream e versão assíncrona."""
+
+    @abc.abstractmethod
+    def complete(self, messages: List[Dict]) -> str:
+        """Resposta completa do modelo para `messages`."""
+
+    def stream(self, messages: List[Dict]) -> Iterable[str]:
+        """Sem suporte a streaming: um único trecho com a resposta inteira."""
+        return iter([self.complete(messages)])
+
+    async def acomplete(self, messages: List[Dict]) -> str:
+        return await sync_to_async(self.complete, thread_sensitive=False)(messages)
+
+
+def inference_client():
+    """InferenceClient do huggingface_hub com o modelo, o token e os deadlines das settings."""
+    if InferenceClient is None:
+        raise BackendUnavailable('Hugging Face client não disponível.')
+    return InferenceClient(model=settings.HF_MODEL, token=settings.HF_TOKEN, timeout=_timeout())
+
+
+def async_inference_client():
+    """Versão assíncrona de inference_client()."""
+    if AsyncInferenceClient is None:
+        raise BackendUnavailable('Hugging Face client não disponível.')
+    return AsyncInferenceClient(model=settings.HF_MODEL, token=settings.HF_TOKEN, timeout=_timeout())
+
+
+class HuggingFaceBackend(ChatBackend):
+    """Chat pelo Hugging Face Inference; `client_factory`/`async_client_factory` criam os clientes."""
+
+    def __init__(self, client_factory=inference_client, async_client_factory=async_inference_client):
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncInferenceClient
+
+    def _sync_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = self._async_client_factory()
+        return client
+
+    def complete(self, messages: List[Dict]) -> str:
+        resposta = self._sync_client().chat_completion(**_params(messages))
+        return resposta.choices[0].message["content"]
+
+    def stream(self, messages: List[Dict]) -> Iterator[str]:
+        chunks = self._sync_client().chat_completion(**_params(messages), stream=True)
+        return (
+            chunk.choices[0].delta.content
+            for chunk in chunks
+            if chunk.choices and chunk.choices[0].delta.content
+        )
+
+    async def acomplete(self, messages: List[Dict]) -> str:
+        resposta = await self._async_client().chat_completion(**_params(messages))
+        return resposta.choices[0].message["content"]
+
+
+class LocalBackend(ChatBackend):
+    """Respostas {treino, dieta} determinísticas (mesma conversa, mesma resposta), sem rede.
+
+    CHAT_LOCAL_LATENCY: segundos de espera por resposta (distribuídos entre os
+    trechos no streaming); CHAT_LOCAL_CHUNK_SIZE: caracteres por trecho.
+    """
+
+    def reply(self, messages: List[Dict]) -> str:
+        from core.services.chat import detect_intent  # pylint: disable=import-outside-toplevel
+
+        user_message = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+        digest = hashlib.sha1(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+        intent = detect_intent(user_message)
+        treino = f'Plano de treino local #{digest}: segunda, quarta e sexta, 3x12 de cada exercício.'
+        dieta = f'Plano alimentar local #{digest}: café, almoço, lanche e jantar equilibrados.'
+        if intent == 'treino':
+            dieta = ''
+        elif intent == 'dieta':
+            treino = ''
+        elif intent == 'conversa':
+            treino, dieta = '', f'Olá! Sou o FitAI (resposta local #{digest}). Como posso ajudar?'
+        return json.dumps({'treino': treino, 'dieta': dieta}, ensure_ascii=False)
+
+    def _chunks(self, text: str) -> List[str]:
+        size = max(1, int(_setting('CHAT_LOCAL_CHUNK_SIZE', 16)))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def complete(self, messages: List[Dict]) -> str:
+        time.sleep(float(_setting('CHAT_LOCAL_LATENCY', 0)))
+        return self.reply(messages)
+
+    def stream(self, messages: List[Dict]) -> Iterator[str]:
+        chunks = self._chunks(self.reply(messages))
+        pause = float(_setting('CHAT_LOCAL_LATENCY', 0)) / len(chunks)
+        for chunk in chunks:
+            time.sleep(pause)
+            yield chunk
+
+    async def acomplete(self, messages: List[Dict]) -> str:
+        await asyncio.sleep(float(_setting('CHAT_LOCAL_LATENCY', 0)))
+        return self.reply(messages)
+
+
+_lock = threading.Lock()
+_backend = None
+_backend_path = None
+_semaphore = None
+_loop_semaphores = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+
+
+def get_backend() -> ChatBackend:
+    """Instância do backend configurado (uma por processo, recriada se CHAT_BACKEND mudar)."""
+    global _backend, _backend_path  # pylint: disable=global-statement
+    path = _setting('CHAT_BACKEND', DEFAULT_BACKEND)
+    if _backend is None or _backend_path != path:
+        with _lock:
+            if _backend is None or _backend_path != path:
+                _backend = import_string(path)()
+                _backend_path = path
+    return _backend
+
+
+def _sync_semaphore() -> threading.BoundedSemaphore:
+    global _semaphore  # pylint: disable=global-statement
+    if _semaphore is None:
+        with _lock:
+            if _semaphore is None:
+                _semaphore = threading.BoundedSemaphore(int(_setting('CHAT_MAX_CONCURRENCY', 8)))
+    return _semaphore
+
+
+def _async_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _loop_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _loop_semaphores[loop] = asyncio.Semaphore(int(_setting('CHAT_MAX_CONCURRENCY', 8)))
+    return semaphore
+
+
+def reset():
+    """Descarta backend, clientes e semáforos e zera as métricas (novas settings passam a valer)."""
+    global _backend, _backend_path, _semaphore  # pylint: disable=global-statement
+    with _lock:
+        _backend = _backend_path = _semaphore = None
+    _loop_semaphores.clear()
+    _loop_flights.clear()
+    _metrics.reset()
+
+
+def _global_acquire() -> bool:
+    """Ocupa uma das CHAT_GLOBAL_CONCURRENCY vagas de todos os workers (False se o limite está desligado)."""
+    limit = int(_setting('CHAT_GLOBAL_CONCURRENCY', 0))
+    cache = caches[GLOBAL_CACHE_ALIAS]
+    if limit <= 0 or not isinstance(cache, ATOMIC_COUNTER_BACKENDS):
+        return False
+    cache.add(GLOBAL_COUNTER_KEY, 0, timeout=GLOBAL_COUNTER_TTL)
+    try:
+        current = cache.incr(GLOBAL_COUNTER_KEY)
+    except ValueError:  # expired between add() and incr()
+        cache.add(GLOBAL_COUNTER_KEY, 1, timeout=GLOBAL_COUNTER_TTL)
+        current = 1
+    if current > limit:
+        _global_release()
+        _metrics.incr('rejected')
+        raise BackendSaturated('Chat sobrecarregado, tente novamente em instantes.')
+    return True
+
+
+def _global_release():
+    try:
+        caches[GLOBAL_CACHE_ALIAS].decr(GLOBAL_COUNTER_KEY)
+    except ValueError:  # the counter expired meanwhile
+        pass
+
+
+def global_in_flight() -> int:
+    return caches[GLOBAL_CACHE_ALIAS].get(GLOBAL_COUNTER_KEY, 0)
+
+
+@contextmanager
+def _slot(semaphore: threading.BoundedSemaphore):
+    _metrics.queued(1)
+    queue_timeout = float(_setting('CHAT_QUEUE_TIMEOUT', 0.5))
+    try:
+        acquired = semaphore.acquire(timeout=queue_timeout) if queue_timeout > 0 else semaphore.acquire(blocking=False)
+    finally:
+        _metrics.queued(-1)
+    if not acquired:
+        _metrics.incr('rejected')
+        raise BackendSaturated('Chat sobrecarregado, tente novamente em instantes.')
+    try:
+        counted = _global_acquire()
+        try:
+            with _tracked():
+                yield
+        finally:
+            if counted:
+                _global_release()
+    finally:
+        semaphore.release()
+
+
+@asynccontextmanager
+async def _aslot(semaphore: asyncio.Semaphore):
+    _metrics.queued(1)
+    queue_timeout = float(_setting('CHAT_QUEUE_TIMEOUT', 0.5))
+    try:
+        if semaphore.locked() and queue_timeout <= 0:
+            raise asyncio.TimeoutError
+        await asyncio.wait_for(semaphore.acquire(), timeout=queue_timeout or None)
+    except asyncio.TimeoutError:
+        _metrics.incr('rejected')
+        raise BackendSaturated('Chat sobrecarregado, tente novamente em instantes.') from None
+    finally:
+        _metrics.queued(-1)
+    try:
+        counted = await sync_to_async(_global_acquire, thread_sensitive=False)()
+        try:
+            with _tracked():
+                yield
+        finally:
+            if counted:
+                await sync_to_async(_global_release, thread_sensitive=False)()
+    finally:
+        semaphore.release()
+
+
+@contextmanager
+def _tracked():
+    started = time.perf_counter()
+    _metrics.started()
+    try:
+        yield
+    except TIMEOUT_ERRORS as exc:
+        _metrics.incr('timeouts')
+        raise BackendTimeout('O modelo não respondeu a tempo.') from exc
+    except Exception:
+        _metrics.incr('errors')
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _metrics.finished(elapsed)
+        logger.debug('Chat completion finished in %.3fs', elapsed)
+
+
+def _flight_key(messages: List[Dict]) -> str:
+    payload = json.dumps([_setting('CHAT_BACKEND', DEFAULT_BACKEND), messages], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _coalesce() -> bool:
+    return _setting('CHAT_COALESCE', True)
+
+
+class _Flight:
+    """Chamada em andamento; os seguidores esperam pelo resultado (ou pela exceção) do líder."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _AsyncFlight:
+    """Versão assíncrona de _Flight: a task da chamada e quantos ainda esperam por ela."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+_flights_lock = threading.Lock()
+_flights: Dict[str, _Flight] = {}
+_loop_flights = weakref.WeakKeyDictionary()  # event loop -> {key: _AsyncFlight}
+
+
+def _complete(messages: List[Dict]) -> str:
+    backend = get_backend()
+    with _slot(_sync_semaphore()):
+        return backend.complete(messages)
+
+
+def complete(messages: List[Dict]) -> str:
+    """Resposta completa do modelo (texto)."""
+    if not _coalesce():
+        return _complete(messages)
+
+    key = _flight_key(messages)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        _metrics.incr('coalesced')
+        deadline = float(_setting('CHAT_QUEUE_TIMEOUT', 0.5)) + float(_setting('CHAT_READ_TIMEOUT', 60))
+        if not flight.done.wait(timeout=deadline):
+            raise BackendTimeout('O modelo não respondeu a tempo.')
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _complete(messages)
+        return flight.result
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+class TokenStream:
+    """Iterador de trechos da resposta; segura a vaga do pool até terminar ou ser fechado."""
+
+    def __init__(self, tokens, slot):
+        self._tokens = iter(tokens)
+        self._slot = slot
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._tokens)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception:
+            slot, self._slot = self._slot, None
+            # the slot converts upstream timeouts into BackendTimeout
+            if slot is None or not slot.__exit__(*sys.exc_info()):
+                raise
+
+    def close(self):
+        slot, self._slot = self._slot, None
+        if slot is not None:
+            slot.__exit__(None, None, None)
+
+
+def stream(messages: List[Dict]) -> TokenStream:
+    """Trechos da resposta à medida que chegam.
+
+    A vaga do pool é reservada já na chamada (BackendSaturated sai antes de
+    qualquer byte ser enviado) e liberada quando o stream termina ou é fechado.
+    """
+    backend = get_backend()
+    slot = _slot(_sync_semaphore())
+    slot.__enter__()
+    try:
+        tokens = backend.stream(messages)
+    except BaseException:
+        if not slot.__exit__(*sys.exc_info()):
+            raise
+    return TokenStream(tokens, slot)
+
+
+async def _acomplete(messages: List[Dict]) -> str:
+    backend = get_backend()
+    async with _aslot(_async_semaphore()):
+        return await backend.acomplete(messages)
+
+
+async def acomplete(messages: List[Dict]) -> str:
+    """Versão assíncrona de complete() (o agrupamento vale dentro do mesmo event loop).
+
+    A chamada ao modelo roda numa task própria que todos os interessados
+    aguardam; cancelar um deles só o desliga da espera. A task é cancelada
+    apenas quando o último interessado desiste.
+    """
+    if not _coalesce():
+        return await _acomplete(messages)
+
+    key = _flight_key(messages)
+    loop = asyncio.get_running_loop()
+    flights = _loop_flights.setdefault(loop, {})
+    flight = flights.get(key)
+    if flight is None:
+        flight = flights[key] = _AsyncFlight(loop.create_task(_acomplete(messages)))
+        flight.task.add_done_callback(functools.partial(_land, flights, key, flight))
+    else:
+        _metrics.incr('coalesced')
+
+    flight.waiters += 1
+    try:
+        # shield: a cancelled waiter must not cancel the shared call
+        return await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if flight.waiters == 1:
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+
+
+def _land(flights: Dict, key: str, flight: _AsyncFlight, task: asyncio.Task):
+    if flights.get(key) is flight:
+        del flights[key]
+    if not task.cancelled():
+        task.exception()  # mark as retrieved when nobody is waiting anymore
@@ -0,0 +1,179 @@
+"""
+Cache de respostas do chat.
+
+Boa parte das mensagens é quase idêntica ("monte um treino", "me passa uma
+dieta") e vem de usuários com os mesmos dados de perfil. A resposta do modelo
+fica no cache 'chat' (settings.CACHES) sob a chave (intenção detectada, hash
+dos dados do perfil, hash da mensagem normalizada), com TTL CHAT_CACHE_TTL e
+no máximo CHAT_CACHE_MAX_ENTRIES respostas. Um acerto devolve o texto sem
+chamar o modelo; quem chama continua gravando a troca na ChatSession.
+"""
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.services import chat_backend
+from core.services.chat import detect_intent, user_data_str
+
+CACHE_ALIAS = 'chat'
+KEY_PREFIX = 'chat:reply'
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+_stats = _Stats()
+
+
+def stats() -> Dict:
+    hits, misses = _stats.hits, _stats.misses
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 3) if total else None}
+
+
+def enabled() -> bool:
+    return getattr(settings, 'CHAT_CACHE_TTL', 0) > 0
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def clear():
+    """Esvazia o cache e zera os contadores."""
+    _cache().clear()
+    _stats.reset()
+
+
+def normalize_message(text: str) -> str:
+    """Minúsculas, sem acentos nem pontuação e com espaços colapsados."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def key_for(user_message: str, user, context: Sequence[Dict] = ()) -> str:
+    """Chave do cache; com histórico de conversa, o contexto também entra na chave."""
+    parts = [
+        KEY_PREFIX,
+        detect_intent(user_message),
+        _digest(user_data_str(user)),
+        _digest(normalize_message(user_message)),
+    ]
+    if context:
+        parts.append(_digest(json.dumps(list(context), sort_keys=True, ensure_ascii=False)))
+    return ':'.join(parts)
+
+
+def lookup(key: str) -> Optional[str]:
+    if not enabled():
+        return None
+    reply = _cache().get(key)
+    _stats.record(reply is not None)
+    return reply
+
+
+def store(key: str, reply_text: str):
+    if enabled() and reply_text:
+        _cache().set(key, reply_text, timeout=settings.CHAT_CACHE_TTL)
+
+
+async def alookup(key: str) -> Optional[str]:
+    if not enabled():
+        return None
+    reply = await _cache().aget(key)
+    _stats.record(reply is not None)
+    return reply
+
+
+async def astore(key: str, reply_text: str):
+    if enabled() and reply_text:
+        await _cache().aset(key, reply_text, timeout=settings.CHAT_CACHE_TTL)
+
+
+def complete(key: str, messages: List[Dict]) -> str:
+    """Resposta do cache ou, na falta, do backend (que então é guardada)."""
+    reply_text = lookup(key)
+    if reply_text is None:
+        reply_text = chat_backend.complete(messages)
+        store(key, reply_text)
+    return reply_text
+
+
+async def acomplete(key: str, messages: List[Dict]) -> str:
+    reply_text = await alookup(key)
+    if reply_text is None:
+        reply_text = await chat_backend.acomplete(messages)
+        await astore(key, reply_text)
+    return reply_text
+
+
+class _CachedStream:
+    """Stream de um acerto: a resposta inteira como um único trecho."""
+
+    def __init__(self, reply_text: str):
+        self._tokens = iter([reply_text])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._tokens)
+
+    def close(self):
+        pass
+
+
+class _RecordingStream:
+    """Repassa os trechos do backend e guarda a resposta no cache quando o stream termina."""
+
+    def __init__(self, key: str, tokens):
+        self._key = key
+        self._tokens = tokens
+        self._parts = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            token = next(self._tokens)
+        except StopIteration:
+            store(self._key, ''.join(self._parts))
+            raise
+        self._parts.append(token)
+        return token
+
+    def close(self):
+        self._tokens.close()
+
+
+def stream(key: str, messages: List[Dict]):
+    reply_text = lookup(key)
+    if reply_text is not None:
+        return _CachedStream(reply_text)
+    return _RecordingStream(key, chat_backend.stream(messages))
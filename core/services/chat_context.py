@@ -0,0 +1,113 @@
+"""
+Janela de contexto das conversas do chat.
+
+Cada requisição leva ao modelo, além do prompt de sistema e da mensagem nova,
+as mensagens mais recentes da sessão que cabem em CHAT_CONTEXT_TOKENS. As que
+saem da janela são resumidas (uma linha curta por mensagem) em
+ChatSession.summary, que também tem limite (CHAT_SUMMARY_TOKENS, descartando
+as linhas mais antigas). Assim o prompt não cresce com a conversa e cada
+requisição faz uma única consulta (índice session + id) pelas mensagens
+posteriores a ChatSession.summary_until.
+
+Tokens são estimados pelo tamanho do texto (~4 caracteres por token), sem
+depender do tokenizador do modelo.
+"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from core.models.chat import ChatMessage, ChatSession
+from core.services import chat as chat_service
+from core.services import chat_cache
+
+CHARS_PER_TOKEN = 4
+SUMMARY_LINE_CHARS = 160
+ROLE_LABELS = {'user': 'Usuário', 'assistant': 'FitAI'}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+
+def _summary_line(message: ChatMessage) -> str:
+    content = message.content
+    if message.role == 'assistant':
+        # replies are usually {"treino": ..., "dieta": ...}; keep just the text
+        try:
+            data = json.loads(content)
+            if isinstance(data, dict):
+                content = ' / '.join(str(v) for v in data.values() if v)
+        except ValueError:
+            pass
+    content = ' '.join(content.split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS - 3].rstrip() + '...'
+    return f"{ROLE_LABELS.get(message.role, message.role)}: {content}"
+
+
+def _trim_summary(lines: List[str]) -> str:
+    budget = int(_setting('CHAT_SUMMARY_TOKENS', 400))
+    kept = []
+    for line in reversed(lines):
+        budget -= estimate_tokens(line)
+        if budget < 0:
+            break
+        kept.append(line)
+    return '\n'.join(reversed(kept))
+
+
+def build(session: Optional[ChatSession]) -> List[Dict]:
+    """Mensagens de contexto (resumo + histórico recente) para `session`, mais antigas primeiro.
+
+    As mensagens que não couberem no orçamento entram no resumo da sessão, que
+    é gravado (um UPDATE) quando muda.
+    """
+    if session is None:
+        return []
+
+    max_messages = int(_setting('CHAT_CONTEXT_MAX_MESSAGES', 20))
+    # bounded read: in steady state only the window plus the last exchange is unsummarized;
+    # older unsummarized messages (sessions from before summaries existed) are skipped
+    recent = list(
+        ChatMessage.objects.filter(session=session, id__gt=session.summary_until)
+        .only('id', 'role', 'content')
+        .order_by('-id')[:max_messages * 2]
+    )
+
+    budget = int(_setting('CHAT_CONTEXT_TOKENS', 1200))
+    window = []
+    for message in recent:
+        cost = estimate_tokens(message.content)
+        if len(window) >= max_messages or cost > budget:
+            break
+        budget -= cost
+        window.append(message)
+    overflow = recent[len(window):]
+
+    if overflow:
+        lines = session.summary.splitlines() if session.summary else []
+        lines += [_summary_line(m) for m in reversed(overflow)]
+        session.summary = _trim_summary(lines)
+        session.summary_until = overflow[0].id
+        # update() keeps updated_at (the session's last activity) untouched
+        ChatSession.objects.filter(pk=session.pk).update(summary=session.summary, summary_until=session.summary_until)
+
+    context = []
+    if session.summary:
+        context.append({"role": "system", "content": f"Resumo da conversa até aqui:\n{session.summary}"})
+    context += [{"role": m.role, "content": m.content} for m in reversed(window)]
+    return context
+
+
+def prompt(user_message: str, user, session: Optional[ChatSession]) -> Tuple[str, List[Dict]]:
+    """(chave do cache, mensagens para o modelo), com o contexto da sessão quando houver."""
+    context = build(session)
+    return (
+        chat_cache.key_for(user_message, user, context),
+        chat_service.build_messages(user_message, user, context),
+    )
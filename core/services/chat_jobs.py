@@ -0,0 +1,203 @@
+"""
+Chat em segundo plano (jobs).
+
+POST /api/chat/jobs/ grava um ChatJob 'queued' e responde na hora com o id do
+job; o cliente consulta GET /api/chat/jobs/<id>/ (com ?wait=N para
+long-polling) até o job terminar. A fila é a própria tabela de jobs: cada
+worker reivindica o job mais antigo com um UPDATE condicional
+(status='queued'), então várias threads e processos dividem a mesma fila sem
+broker externo.
+
+Os workers são um pool de threads do próprio processo (CHAT_JOB_WORKERS;
+0 executa o job logo após o commit, na própria requisição). O comando
+run_chat_jobs consome a mesma fila fora do servidor web e devolve para a fila
+os jobs presos em 'running' por um processo que morreu.
+
+Com o pool do modelo cheio (BackendSaturated) o job volta para a fila com
+`not_before` CHAT_JOB_RETRY_DELAY segundos à frente (o dobro a cada nova
+tentativa), em vez de ser reivindicado de novo na hora e gastar as tentativas
+enquanto o pool ainda está cheio.
+
+A mesma Idempotency-Key (por usuário, ou por IP para visitantes) devolve o job
+já existente, então o retry de um cliente com rede instável nunca gera outra
+chamada ao modelo.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models.chat import ChatJob
+from core.services import chat as chat_service
+from core.services import chat_backend, chat_cache, chat_context
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 200
+# long-poll waiters re-read the job at least this often (jobs finished by other processes)
+POLL_INTERVAL = 0.5
+
+
+class IdempotencyConflict(Exception):
+    """A Idempotency-Key já foi usada com outra mensagem."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def scoped_key(key: Optional[str], user, client_ip: Optional[str]) -> Optional[str]:
+    """Idempotency-Key prefixada pelo dono, para que clientes diferentes não colidam."""
+    if not key:
+        return None
+    owner = f"user:{user.pk}" if user else f"anon:{client_ip or '-'}"
+    return f"{owner}:{key}"
+
+
+def enqueue(user, message: str, session_id=None, idempotency_key: Optional[str] = None) -> Tuple[ChatJob, bool]:
+    """(job, criado). Com `idempotency_key` já usada devolve o job existente."""
+    if idempotency_key:
+        existing = ChatJob.objects.filter(idempotency_key=idempotency_key).first()
+        if existing:
+            return _replayed(existing, message), False
+
+    session = chat_service.find_session(user, session_id)
+    try:
+        with transaction.atomic():
+            job = ChatJob.objects.create(user=user, session=session, message=message,
+                                         idempotency_key=idempotency_key)
+    except IntegrityError:
+        # a concurrent retry with the same key won the race
+        return _replayed(ChatJob.objects.get(idempotency_key=idempotency_key), message), False
+
+    transaction.on_commit(_kick)
+    return job, True
+
+
+def _replayed(job: ChatJob, message: str) -> ChatJob:
+    if job.message != message:
+        raise IdempotencyConflict('Idempotency-Key já usada com outra mensagem')
+    return job
+
+
+def claim_next() -> Optional[ChatJob]:
+    """Reivindica o job mais antigo da fila que já pode rodar (None se não há nenhum)."""
+    while True:
+        due = Q(not_before__isnull=True) | Q(not_before__lte=timezone.now())
+        job_id = (ChatJob.objects.filter(due, status=ChatJob.QUEUED)
+                  .order_by('created_at').values_list('id', flat=True).first())
+        if job_id is None:
+            return None
+        claimed = ChatJob.objects.filter(pk=job_id, status=ChatJob.QUEUED).update(
+            status=ChatJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ChatJob.objects.select_related('user', 'session').get(pk=job_id)
+        # another worker took it first; try the next one
+
+
+def run(job: ChatJob):
+    """Executa um job reivindicado e grava o resultado (ou o erro)."""
+    try:
+        reply_text = chat_cache.complete(*chat_context.prompt(job.message, job.user, job.session))
+        session = chat_service.save_exchange(job.user, job.session, job.message, reply_text)
+
+        data = chat_service.parse_reply(reply_text)
+        if session:
+            data['session_id'] = session.id
+        fields = {'status': ChatJob.DONE, 'result': data, 'session': session, 'error': ''}
+    except chat_backend.BackendSaturated as e:
+        # nothing was sent upstream: put it back in the queue, later, while attempts last
+        if job.attempts < int(_setting('CHAT_JOB_MAX_ATTEMPTS', 3)):
+            delay = float(_setting('CHAT_JOB_RETRY_DELAY', 2)) * 2 ** (job.attempts - 1)
+            ChatJob.objects.filter(pk=job.pk).update(
+                status=ChatJob.QUEUED, started_at=None, not_before=timezone.now() + timedelta(seconds=delay),
+            )
+            _kick_later(delay)
+            return
+        fields = {'status': ChatJob.FAILED, 'error': str(e)}
+    except Exception as e:
+        logger.error(f"Error in chat job {job.pk}: {str(e)}")
+        fields = {'status': ChatJob.FAILED, 'error': str(e)}
+
+    ChatJob.objects.filter(pk=job.pk).update(finished_at=timezone.now(), **fields)
+    with _finished:
+        _finished.notify_all()
+
+
+def drain() -> int:
+    """Executa jobs da fila até ela esvaziar; devolve quantos foram processados."""
+    processed = 0
+    while True:
+        job = claim_next()
+        if job is None:
+            return processed
+        run(job)
+        processed += 1
+
+
+def requeue_stale() -> int:
+    """Devolve para a fila os jobs 'running' há mais de CHAT_JOB_STALE_SECONDS."""
+    cutoff = timezone.now() - timedelta(seconds=_setting('CHAT_JOB_STALE_SECONDS', 300))
+    return ChatJob.objects.filter(status=ChatJob.RUNNING, started_at__lt=cutoff).update(
+        status=ChatJob.QUEUED, started_at=None,
+    )
+
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_finished = threading.Condition()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(_setting('CHAT_JOB_WORKERS', 2)),
+                                           thread_name_prefix='chat-job')
+        return _executor
+
+
+def _worker():
+    try:
+        drain()
+    except Exception:
+        logger.exception('Chat job worker failed')
+    finally:
+        # worker threads outlive the request: don't leak their DB connections
+        connections.close_all()
+
+
+def _kick():
+    if int(_setting('CHAT_JOB_WORKERS', 2)) <= 0:
+        drain()
+    else:
+        _pool().submit(_worker)
+
+
+def _kick_later(delay: float):
+    # with inline jobs (CHAT_JOB_WORKERS=0) the retry waits for the next enqueue or run_chat_jobs
+    if int(_setting('CHAT_JOB_WORKERS', 2)) > 0:
+        timer = threading.Timer(delay, _pool().submit, args=(_worker,))
+        timer.daemon = True
+        timer.start()
+
+
+def wait(job: ChatJob, timeout: float) -> ChatJob:
+    """Espera até `timeout` segundos o job terminar (long-polling); devolve o job atualizado."""
+    deadline = time.monotonic() + min(timeout, _setting('CHAT_JOB_MAX_WAIT', 20))
+    while not job.finished:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        with _finished:
+            _finished.wait(min(remaining, POLL_INTERVAL))
+        job.refresh_from_db()
+    return job
@@ -0,0 +1,85 @@
+"""
+Manutenção do rollup DailyNutritionTotals (um registro por usuário e dia).
+
+Cada escrita de Meal (signals post_save/post_delete, dentro da mesma transação
+da view) reagrega apenas o dia afetado, então refeição e rollup são gravados
+(ou desfeitos) juntos; `rebuild()` recalcula tudo (ou um subconjunto de
+refeições) em lote, para backfills.
+
+Duas escritas simultâneas no mesmo dia não se perdem: a reagregação trava a
+linha do rollup (select_for_update) antes de somar as refeições, então a
+segunda transação espera o commit da primeira e soma já vendo as refeições
+das duas.
+"""
+from typing import Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, QuerySet, Sum
+
+from core.models.daily_nutrition_totals import DailyNutritionTotals
+from core.models.meal import Meal
+
+MACROS = ('calories', 'protein', 'carbs', 'fat')
+
+_AGGREGATES = {**{m: Sum(f'total_{m}') for m in MACROS}, 'meal_count': Count('id')}
+
+
+def _defaults(row) -> dict:
+    return {**{m: float(row[m] or 0.0) for m in MACROS}, 'meal_count': row['meal_count']}
+
+
+def refresh_day(user_id: int, day) -> None:
+    """Reagrega as refeições de `user_id` em `day` e grava (ou remove) o rollup."""
+    with transaction.atomic():
+        totals, _ = DailyNutritionTotals.objects.select_for_update().get_or_create(user_id=user_id, date=day)
+        # aggregated only once the row is locked, so a concurrent refresh cannot write an older sum over ours
+        row = Meal.objects.filter(user_id=user_id, date=day).aggregate(**_AGGREGATES)
+        if not row['meal_count']:
+            totals.delete()
+            return
+        for field, value in _defaults(row).items():
+            setattr(totals, field, value)
+        totals.save()
+
+
+def refresh_days(keys: Iterable[Tuple[int, object]]) -> None:
+    for user_id, day in set(keys):
+        refresh_day(user_id, day)
+
+
+def rebuild(user_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+    """Recalcula o rollup a partir das refeições (de todos os usuários quando `user_ids` é None).
+
+    Remove os registros existentes e recria um por (usuário, dia) com um único
+    GROUP BY. `user_ids` aceita uma lista ou um queryset de ids. Retorna o
+    número de registros criados.
+    """
+    meals = Meal.objects.all()
+    stale = DailyNutritionTotals.objects.all()
+    if user_ids is not None:
+        if not isinstance(user_ids, QuerySet):
+            user_ids = list(user_ids)
+        meals = meals.filter(user_id__in=user_ids)
+        stale = stale.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        stale.delete()
+        rows = meals.values('user_id', 'date').annotate(**_AGGREGATES).order_by()
+        objs = [DailyNutritionTotals(user_id=row['user_id'], date=row['date'], **_defaults(row)) for row in rows]
+        DailyNutritionTotals.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
+
+
+def on_meal_saved(sender, instance, **kwargs):
+    """Receiver de post_save de Meal."""
+    previous = getattr(instance, '_loaded_date', None)
+    keys = [(instance.user_id, instance.date)]
+    if previous is not None and previous != instance.date:
+        keys.append((instance.user_id, previous))
+    refresh_days(keys)
+    instance._loaded_date = instance.date
+
+
+def on_meal_deleted(sender, instance, **kwargs):
+    """Receiver de post_delete de Meal."""
+    refresh_day(instance.user_id, instance.date)
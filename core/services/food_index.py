@@ -0,0 +1,202 @@
+"""
+Índice de busca em memória sobre o catálogo FoodItem (TACO).
+
+O índice é construído uma vez por processo (worker) na primeira busca e
+responde consultas por prefixo/substring sem acessar o banco. Alterações em
+FoodItem (admin, FoodItemViewSet, import_taco) chamam `invalidate()`, que após o
+commit incrementa FoodCatalogVersion no banco; cada worker relê essa versão no
+máximo a cada FOOD_INDEX_VERSION_TTL segundos e reconstrói o índice quando ela
+muda.
+"""
+import bisect
+import copy
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from core.models.fooditem import FoodCatalogVersion, FoodItem, normalize_food_name
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens da chave normalizada, a mesma gravada em FoodItem.search_name."""
+    return normalize_food_name(text).split()
+
+
+def _is_brazil(country: str) -> bool:
+    return country.strip().lower() in ('br', 'bra', 'brazil', 'brasil')
+
+
+class _Entry:
+    __slots__ = ('id', 'folded', 'tokens', 'country', 'languages', 'item')
+
+    def __init__(self, fi, item: Dict):
+        self.id = fi.id
+        self.folded = fi.search_name or normalize_food_name(fi.name)
+        self.tokens = self.folded.split()
+        self.country = (fi.country or '').lower()
+        self.languages = (fi.languages or '').lower()
+        self.item = item
+
+    def accepts(self, country: Optional[str], lang: Optional[str]) -> bool:
+        is_pt = self.languages.startswith('pt')
+        if country and _is_brazil(country):
+            # accept if product country indicates Brazil OR if language is Portuguese
+            country_ok = any(x in self.country for x in ('br', 'brazil', 'brasil'))
+            if not (country_ok or is_pt):
+                return False
+        if lang and lang.strip().lower().startswith('pt') and not is_pt:
+            return False
+        return True
+
+
+class FoodSearchIndex:
+    """Índice invertido token -> ids, com vocabulário ordenado para busca por prefixo."""
+
+    def __init__(self, entries: Iterable[_Entry]):
+        self.entries: Dict[int, _Entry] = {}
+        postings: Dict[str, set] = {}
+        for entry in entries:
+            self.entries[entry.id] = entry
+            for tok in entry.tokens:
+                postings.setdefault(tok, set()).add(entry.id)
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+    def _prefix_ids(self, prefix: str) -> set:
+        ids = set()
+        i = bisect.bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            ids |= self.postings[self.vocabulary[i]]
+            i += 1
+        return ids
+
+    def token_prefix_ids(self, query: str) -> set:
+        """Ids cujos nomes têm, para cada token da consulta, um token com esse prefixo."""
+        candidates = None
+        for tok in tokenize(query):
+            ids = self._prefix_ids(tok)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                break
+        return set(candidates or ())
+
+    def best_match(self, query: str) -> Optional[int]:
+        """Id do primeiro nome (ordem de search_name, depois id) em token_prefix_ids(query)."""
+        ids = self.token_prefix_ids(query)
+        if not ids:
+            return None
+        return min(ids, key=lambda i: (self.entries[i].folded, i))
+
+    def _score(self, entry: _Entry, folded_query: str, q_tokens: List[str]) -> tuple:
+        if entry.folded == folded_query:
+            rank = 0
+        elif entry.folded.startswith(folded_query):
+            rank = 1
+        elif entry.tokens and entry.tokens[0].startswith(q_tokens[0]):
+            rank = 2
+        elif folded_query in entry.folded:
+            rank = 3
+        else:
+            rank = 4
+        return (rank, len(entry.folded), entry.folded, entry.id)
+
+    def search(self, query: str, country: Optional[str] = None, lang: Optional[str] = None,
+               limit: int = 10) -> List[Dict]:
+        q_tokens = tokenize(query)
+        if not q_tokens:
+            return []
+        folded_query = ' '.join(q_tokens)
+
+        # every query token must prefix-match some token of the name
+        candidates = self.token_prefix_ids(folded_query)
+
+        # substring fallback (e.g. "rroz"), only scanned when prefixes were not enough
+        if len(candidates) < limit:
+            candidates.update(e.id for e in self.entries.values() if folded_query in e.folded)
+
+        matches = [self.entries[i] for i in candidates]
+        matches = [e for e in matches if e.accepts(country, lang)]
+        matches.sort(key=lambda e: self._score(e, folded_query, q_tokens))
+        return [copy.deepcopy(e.item) for e in matches[:limit]]
+
+
+_lock = threading.Lock()
+_index: Optional[FoodSearchIndex] = None
+_index_version = None
+# last version read from the database and when (time.monotonic()); reset() bumps the epoch
+_version = None
+_version_checked = 0.0
+_epoch = 0
+
+
+def catalog_version():
+    """Versão atual do catálogo FoodItem (muda a cada invalidate() confirmado ou reset())."""
+    global _version, _version_checked  # pylint: disable=global-statement
+    now = time.monotonic()
+    if _version is None or now - _version_checked >= getattr(settings, 'FOOD_INDEX_VERSION_TTL', 5):
+        _version = FoodCatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+        _version_checked = now
+    return _epoch, _version
+
+
+def build() -> FoodSearchIndex:
+    from core.services.taco_db import _as_item  # pylint: disable=import-outside-toplevel
+
+    entries = [_Entry(fi, _as_item(fi)) for fi in FoodItem.objects.all().iterator()]
+    logger.debug('Food search index built with %d items', len(entries))
+    return FoodSearchIndex(entries)
+
+
+def get_index() -> FoodSearchIndex:
+    """Retorna o índice do processo, reconstruindo-o se a versão mudou."""
+    global _index, _index_version  # pylint: disable=global-statement
+    version = catalog_version()
+    index = _index
+    if index is not None and _index_version == version:
+        return index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = build()
+            _index_version = version
+        return _index
+
+
+def reset() -> None:
+    """Esquece o índice e a versão lidos por este processo (e a matriz de nutrientes)."""
+    global _index, _version, _epoch  # pylint: disable=global-statement
+    with _lock:
+        _index = None
+        _version = None
+        _epoch += 1
+
+
+def _bump() -> None:
+    if not FoodCatalogVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        FoodCatalogVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+    reset()
+
+
+def invalidate() -> None:
+    """Incrementa a versão do catálogo quando a transação atual confirmar.
+
+    Enquanto a transação não confirma, os outros workers nem enxergam a mudança;
+    incrementar antes faria algum deles reconstruir o índice com os dados antigos
+    sob a versão nova.
+    """
+    transaction.on_commit(_bump)
+
+
+def invalidate_on_change(sender, **kwargs):
+    """Receiver para post_save/post_delete de FoodItem."""
+    invalidate()
+
+
+def search(query: str, country: Optional[str] = None, lang: Optional[str] = None, limit: int = 10) -> List[Dict]:
+    return get_index().search(query, country=country, lang=lang, limit=limit)
@@ -0,0 +1,87 @@
+"""
+Totais de macros por período (dia, semana ou mês), agregados no banco.
+
+Lê o rollup DailyNutritionTotals (no máximo um registro por dia do intervalo)
+com um único GROUP BY (Trunc + Sum); os buckets sem refeições são preenchidos
+com zeros em Python.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+
+from core.models.daily_nutrition_totals import DailyNutritionTotals
+
+BUCKETS = ('day', 'week', 'month')
+MACROS = ('calories', 'protein', 'carbs', 'fat')
+
+
+def bucket_start(d: date, bucket: str) -> date:
+    """Início do bucket que contém `d` (semanas começam na segunda-feira)."""
+    if bucket == 'week':
+        return d - timedelta(days=d.weekday())
+    if bucket == 'month':
+        return d.replace(day=1)
+    return d
+
+
+def next_bucket(d: date, bucket: str) -> Optional[date]:
+    """Início do bucket seguinte; None quando passaria de date.max."""
+    try:
+        if bucket == 'week':
+            return d + timedelta(days=7)
+        if bucket == 'month':
+            return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return d + timedelta(days=1)
+    except OverflowError:
+        return None
+
+
+def bucket_count(start: date, end: date, bucket: str) -> int:
+    """Quantos buckets o intervalo tem, sem montá-los (para validar o tamanho antes)."""
+    first = bucket_start(start, bucket)
+    if bucket == 'week':
+        return (end - first).days // 7 + 1
+    if bucket == 'month':
+        return (end.year - first.year) * 12 + end.month - first.month + 1
+    return (end - first).days + 1
+
+
+def bucket_starts(start: date, end: date, bucket: str) -> List[date]:
+    starts = []
+    current = bucket_start(start, bucket)
+    while current is not None and current <= end:
+        starts.append(current)
+        current = next_bucket(current, bucket)
+    return starts
+
+
+def _zero() -> Dict[str, float]:
+    return dict.fromkeys(MACROS, 0.0)
+
+
+def summarize(user, start: date, end: date, bucket: str = 'day') -> Dict:
+    """Totais de `user` entre `start` e `end` (inclusive), agrupados por `bucket`.
+
+    Retorna {'buckets': {iso_date: {macro: total}}, 'totals': {macro: total}}, com
+    todos os buckets do intervalo presentes (zerados quando não há refeições).
+    """
+    rows = (
+        DailyNutritionTotals.objects.filter(user=user, date__range=(start, end))
+        .annotate(bucket=Trunc('date', bucket, output_field=DateField()))
+        .values('bucket')
+        .annotate(**{m: Sum(m) for m in MACROS})
+        .order_by('bucket')
+    )
+
+    buckets = {d.isoformat(): _zero() for d in bucket_starts(start, end, bucket)}
+    totals = _zero()
+    for row in rows:
+        entry = buckets.setdefault(row['bucket'].isoformat(), _zero())
+        for m in MACROS:
+            value = float(row[m] or 0.0)
+            entry[m] += value
+            totals[m] += value
+
+    return {'buckets': buckets, 'totals': totals}
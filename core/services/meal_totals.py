@@ -0,0 +1,106 @@
+"""
+Recalcula macros de refeições a partir do catálogo FoodItem, direto no banco.
+
+Cada IngredientEntry guarda o FoodItem resolvido na criação e o snapshot de
+macros por grama; após uma atualização do catálogo, o recálculo é um
+join-and-multiply em SQL (UPDATE ... = weight_grams * subquery), sem nenhuma
+busca textual por nome.
+
+recompute_vectorized faz o mesmo cálculo em Python com a matriz de nutrientes
+(core.services.nutrient_matrix): os ingredientes são lidos em blocos e cada
+bloco vira um produto matricial e um bulk_update, útil quando o UPDATE com
+subqueries correlacionadas é lento no banco em uso.
+"""
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.models.fooditem import FoodItem
+from core.models.meal import IngredientEntry, Meal
+from core.services import daily_totals, nutrient_matrix
+
+MACROS = ('calories', 'protein', 'carbs', 'fat')
+
+
+def _per_gram_subquery(macro: str) -> Subquery:
+    foods = FoodItem.objects.filter(pk=OuterRef('food_id'), weight_grams__gt=0)
+    return Subquery(foods.annotate(v=F(macro) / F('weight_grams')).values('v')[:1], output_field=FloatField())
+
+
+def _meal_total_subquery(macro: str) -> Coalesce:
+    totals = (
+        IngredientEntry.objects.filter(meal=OuterRef('pk'))
+        .values('meal')
+        .annotate(total=Sum(macro))
+        .values('total')
+    )
+    return Coalesce(Subquery(totals, output_field=FloatField()), Value(0.0))
+
+
+def _retotal_meals(meal_ids) -> int:
+    meals = Meal.objects.filter(pk__in=meal_ids)
+    updated = meals.update(**{f'total_{m}': _meal_total_subquery(m) for m in MACROS})
+    # queryset.update() skips the Meal signals, so refresh the daily rollup in bulk
+    if updated:
+        daily_totals.rebuild(user_ids=meals.values('user_id'))
+    return updated
+
+
+def recompute_from_catalog(food_ids: Optional[Iterable[int]] = None) -> int:
+    """Atualiza os fatores por grama, os macros dos ingredientes, os totais das refeições
+    e o rollup DailyNutritionTotals dos usuários afetados.
+
+    `food_ids` limita o recálculo aos ingredientes desses FoodItems (todos os
+    ingredientes vinculados quando None). Retorna o número de refeições atualizadas.
+    """
+    entries = IngredientEntry.objects.filter(food__isnull=False)
+    if food_ids is not None:
+        entries = entries.filter(food_id__in=list(food_ids))
+
+    with transaction.atomic():
+        entries.update(**{f'{m}_per_gram': _per_gram_subquery(m) for m in MACROS})
+        entries.update(**{m: Coalesce(F('weight_grams') * F(f'{m}_per_gram'), Value(0.0)) for m in MACROS})
+
+        return _retotal_meals(entries.values('meal_id'))
+
+
+def recompute_vectorized(food_ids: Optional[Iterable[int]] = None, chunk_size: int = 5000) -> int:
+    """Mesmo resultado de recompute_from_catalog, calculado com a matriz de nutrientes do catálogo."""
+    matrix = nutrient_matrix.get_matrix()
+    entries = IngredientEntry.objects.filter(food__isnull=False)
+    if food_ids is not None:
+        entries = entries.filter(food_id__in=list(food_ids))
+
+    per_gram_fields = [f'{m}_per_gram' for m in MACROS]
+    # materialized up front: SQLite does not like writes to a table with an open cursor on it
+    rows = list(entries.order_by('pk').values_list('pk', 'food_id', 'weight_grams'))
+    with transaction.atomic():
+        for chunk in _chunks(rows, chunk_size):
+            ids = [pk for pk, _, _ in chunk]
+            known = [food_id in matrix for _, food_id, _ in chunk]
+            amounts = nutrient_matrix.as_dicts(matrix.per_item([(food_id, grams) for _, food_id, grams in chunk]))
+            factors = nutrient_matrix.as_dicts(matrix.per_item([(food_id, 1.0) for _, food_id, _ in chunk]),
+                                               ndigits=12)
+            objs = []
+            for pk, ok, amount, factor in zip(ids, known, amounts, factors):
+                entry = IngredientEntry(pk=pk, **amount)
+                for m in MACROS:
+                    # foods missing from the matrix get no factor and zero macros, as in the SQL path
+                    setattr(entry, f'{m}_per_gram', factor[m] if ok else None)
+                objs.append(entry)
+            IngredientEntry.objects.bulk_update(objs, [*MACROS, *per_gram_fields], batch_size=1000)
+
+        return _retotal_meals(entries.values('meal_id'))
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,114 @@
+"""
+Matriz de nutrientes (alimentos x nutrientes, valores por grama) para cálculo em lote.
+
+Totais para uma lista de pares (food_id, gramas) viram um único produto
+matriz-vetor em NumPy, em vez de multiplicar e arredondar alimento por
+alimento em Python. A matriz do catálogo inteiro é construída uma vez por
+processo e reconstruída quando a versão do catálogo muda (mesma versão usada
+pelo índice de busca, ver core.services.food_index).
+
+Alimentos sem peso de porção (weight_grams <= 0) ficam fora da matriz, como
+no caminho SQL de core.services.meal_totals: sem fator por grama e com macros
+zerados.
+
+NumPy é opcional: sem ele, a mesma API funciona com listas (mais lenta).
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - environment dependent
+    np = None
+
+from core.models.fooditem import MICRONUTRIENTS, FoodItem
+from core.services import food_index
+
+logger = logging.getLogger(__name__)
+
+MACROS = ('calories', 'protein', 'carbs', 'fat')
+NUTRIENTS = MACROS + MICRONUTRIENTS
+
+
+def _per_gram_row(fi: FoodItem) -> List[float]:
+    weight = float(fi.weight_grams)
+    values = [getattr(fi, m) for m in MACROS] + list(fi.micronutrients.values())
+    return [float(v or 0.0) / weight for v in values]
+
+
+class NutrientMatrix:
+    """`rows[food_id]` indexa a linha de `values` (nutrientes por grama, na ordem de NUTRIENTS)."""
+
+    def __init__(self, foods: Iterable[FoodItem]):
+        self.rows: Dict[int, int] = {}
+        data = []
+        for fi in foods:
+            if fi.pk in self.rows or not fi.weight_grams or fi.weight_grams <= 0:
+                continue
+            self.rows[fi.pk] = len(data)
+            data.append(_per_gram_row(fi))
+        if np is not None:
+            self.values = np.array(data, dtype=np.float64).reshape(len(data), len(NUTRIENTS))
+        else:
+            self.values = data
+
+    def __contains__(self, food_id) -> bool:
+        return food_id in self.rows
+
+    def _weights(self, pairs: Sequence[Tuple[int, float]]):
+        idx = [self.rows.get(food_id, -1) for food_id, _ in pairs]
+        grams = [float(g) if i >= 0 else 0.0 for i, (_, g) in zip(idx, pairs)]
+        return [max(i, 0) for i in idx], grams
+
+    def per_item(self, pairs: Sequence[Tuple[int, float]]):
+        """Matriz len(pairs) x nutrientes; alimentos desconhecidos dão linha zerada."""
+        idx, grams = self._weights(pairs)
+        if np is not None:
+            if not idx or not self.rows:
+                return np.zeros((len(pairs), len(NUTRIENTS)))
+            return self.values[np.asarray(idx)] * np.asarray(grams)[:, None]
+        if not self.rows:
+            return [[0.0] * len(NUTRIENTS) for _ in pairs]
+        return [[v * g for v in self.values[i]] for i, g in zip(idx, grams)]
+
+    def totals(self, pairs: Sequence[Tuple[int, float]]):
+        """Soma de todos os pares: vetor de gramas por alimento @ matriz."""
+        idx, grams = self._weights(pairs)
+        if np is not None:
+            weights = np.zeros(len(self.rows))
+            if idx and self.rows:
+                np.add.at(weights, np.asarray(idx), np.asarray(grams))
+            return weights @ self.values
+        out = [0.0] * len(NUTRIENTS)
+        for row in self.per_item(pairs):
+            out = [a + b for a, b in zip(out, row)]
+        return out
+
+
+def as_dicts(values, keys: Sequence[str] = MACROS, ndigits: int = 4) -> List[Dict[str, float]]:
+    """Linhas da matriz -> [{nutriente: valor arredondado}] (só `keys`)."""
+    cols = [NUTRIENTS.index(k) for k in keys]
+    if np is not None:
+        values = np.round(np.asarray(values)[:, cols], ndigits).tolist()
+        return [dict(zip(keys, row)) for row in values]
+    return [{k: round(row[c], ndigits) for k, c in zip(keys, cols)} for row in values]
+
+
+_lock = threading.Lock()
+_matrix: Optional[NutrientMatrix] = None
+_matrix_version = None
+
+
+def get_matrix() -> NutrientMatrix:
+    """Matriz do catálogo inteiro, reconstruída quando o catálogo muda."""
+    global _matrix, _matrix_version  # pylint: disable=global-statement
+    version = food_index.catalog_version()
+    if _matrix is not None and _matrix_version == version:
+        return _matrix
+    with _lock:
+        if _matrix is None or _matrix_version != version:
+            _matrix = NutrientMatrix(FoodItem.objects.all().iterator())
+            _matrix_version = version
+            logger.debug('Nutrient matrix built with %d foods', len(_matrix.rows))
+        return _matrix
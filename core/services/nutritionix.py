@@ -5,7 +5,7 @@ mas delegar para o serviço local TACO (base interna core.models.FoodItem).
 Isto mantém a assinatura pública usada pelas views enquanto usa dados locais
 para pesquisa e cálculo de nutrientes.
 """
-from typing import List, Dict
+from typing import Dict, Iterable, List, Tuple
 from . import taco_db
 
 
@@ -21,3 +21,8 @@ def get_nutrients_for_grams(food_id_or_text: str, grams: float) -> Dict[str, flo
     tentará resolver por id e, em seguida, por nome.
     """
     return taco_db.get_nutrients_for_grams(food_id_or_text, grams)
+
+
+def get_nutrients_for_many(items: Iterable[Tuple[str, float]]) -> List[Dict]:
+    """Delegar o cálculo em lote (uma ou duas consultas para todos os itens)."""
+    return taco_db.get_nutrients_for_many(items)
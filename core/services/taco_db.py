@@ -1,7 +1,12 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 import logging
 
-from core.models.fooditem import FoodItem
+from django.conf import settings
+from django.db.models import Q
+
+from core.models.fooditem import FoodItem, normalize_food_name
+from core.services import food_index
+from core.services.nutrient_matrix import NutrientMatrix, as_dicts
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +29,66 @@ def _as_item(fi: FoodItem) -> Dict:
     }
 
 
+def _prefix_range(key: str) -> Dict[str, str]:
+    """Filtro de prefixo como intervalo (>= key, < key+U+FFFF), que usa o índice de search_name
+    tanto no SQLite quanto no Postgres (LIKE 'x%' nem sempre usa)."""
+    return {'search_name__gte': key, 'search_name__lt': key + '\uffff'}
+
+
+def _token_match_ids(keys: Iterable[str]) -> Dict[str, int]:
+    """{key: id} pelo prefixo de cada token do nome ("carioca" -> "feijao carioca cozido").
+
+    Resolvido no índice em memória (core.services.food_index); com
+    FOOD_SEARCH_INDEX = False o mesmo critério vai ao banco numa única
+    consulta (LIKE '%x%', que percorre a tabela inteira), com o mesmo resultado.
+    """
+    keys = {key for key in keys if key}
+    if getattr(settings, 'FOOD_SEARCH_INDEX', True):
+        index = food_index.get_index()
+        matches = {key: index.best_match(key) for key in keys}
+        return {key: food_id for key, food_id in matches.items() if food_id is not None}
+
+    cond = Q()
+    for key in keys:
+        key_cond = Q()
+        for tok in key.split():
+            key_cond &= Q(search_name__startswith=tok) | Q(search_name__contains=' ' + tok)
+        cond |= key_cond
+    if not cond:
+        return {}
+    matches = {}
+    for food_id, search_name in FoodItem.objects.filter(cond).order_by('search_name', 'id') \
+            .values_list('id', 'search_name'):
+        name_tokens = search_name.split()
+        for key in keys - matches.keys():
+            if all(any(t.startswith(tok) for t in name_tokens) for tok in key.split()):
+                matches[key] = food_id
+    return matches
+
+
+def find_by_name(text: str) -> Optional[FoodItem]:
+    """Resolve um FoodItem pelo nome normalizado: exato, depois prefixo, depois prefixo de cada palavra."""
+    key = normalize_food_name(text)
+    if not key:
+        return None
+    qs = FoodItem.objects.all()
+    fi = (
+        qs.filter(search_name=key).first()
+        or qs.filter(**_prefix_range(key)).order_by('search_name', 'id').first()
+    )
+    if fi is None:
+        food_id = _token_match_ids([key]).get(key)
+        fi = qs.filter(pk=food_id).first() if food_id is not None else None
+    return fi
+
+
 def search_foods(query: str, country: Optional[str] = None, lang: Optional[str] = None) -> List[Dict]:
-    """Busca local na tabela FoodItem usando icontains.
+    """Busca local no catálogo FoodItem.
 
+    Usa o índice em memória (core.services.food_index) por padrão; com
+    FOOD_SEARCH_INDEX = False consulta a coluna indexada search_name por
+    prefixo e, só quando faltam resultados, por substring (último recurso: o
+    LIKE '%x%' percorre a tabela inteira).
     Retorna até 10 resultados, filtrando por country/lang quando possível.
     """
     if not query or not query.strip():
@@ -35,9 +97,17 @@ def search_foods(query: str, country: Optional[str] = None, lang: Optional[str]
     # Default country behavior: if not provided, assume BR (Brasil)
     country = country or 'BR'
 
-    qs = FoodItem.objects.all()
-    q = query.strip()
-    qs = qs.filter(name__icontains=q)[:10]
+    if getattr(settings, 'FOOD_SEARCH_INDEX', True):
+        return food_index.search(query, country=country, lang=lang, limit=10)
+
+    key = normalize_food_name(query)
+    if not key:
+        return []
+    qs = list(FoodItem.objects.filter(**_prefix_range(key)).order_by('search_name', 'id')[:10])
+    if len(qs) < 10:
+        seen = [fi.pk for fi in qs]
+        qs += FoodItem.objects.filter(search_name__contains=key).exclude(pk__in=seen) \
+            .order_by('search_name', 'id')[:10 - len(qs)]
 
     results = []
     for fi in qs:
@@ -78,8 +148,13 @@ def get_nutrients_for_grams(food_id_or_text: str, grams: float) -> Dict[str, flo
 
     if fi is None:
         # fallback to name search
-        fi = FoodItem.objects.filter(name__icontains=food_id_or_text).first()
+        fi = find_by_name(food_id_or_text)
+
+    return nutrients_for(fi, grams)
+
 
+def nutrients_for(fi: Optional[FoodItem], grams: float) -> Dict[str, float]:
+    """Macros de `fi` proporcionais a `grams` (zeros se fi for None)."""
     if not fi:
         return {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0}
 
@@ -90,3 +165,85 @@ def get_nutrients_for_grams(food_id_or_text: str, grams: float) -> Dict[str, flo
         'carbs': round(fi.carbs * factor, 4),
         'fat': round(fi.fat * factor, 4),
     }
+
+
+def resolve_foods(refs: Iterable[str]) -> Dict[str, Optional[FoodItem]]:
+    """Resolve vários ids/nomes de uma vez, com a mesma precedência de get_nutrients_for_grams.
+
+    1ª consulta: pk (para refs numéricas) ou search_name exato.
+    2ª consulta (só se sobrar algo): prefixo de search_name, todos os nomes
+    restantes combinados em um único OR.
+    3ª consulta (só se ainda sobrar algo): alimentos achados pelo prefixo de cada
+    palavra, no índice em memória ou no banco (ver _token_match_ids).
+    Retorna {ref: FoodItem ou None}.
+    """
+    refs = {str(r) for r in refs if r}
+    keys = {ref: normalize_food_name(ref) for ref in refs}
+    ids = {int(ref) for ref in refs if ref.isdigit()}
+    resolved: Dict[str, Optional[FoodItem]] = dict.fromkeys(refs)
+    if not refs:
+        return resolved
+
+    exact_keys = {k for k in keys.values() if k}
+    by_pk, by_key = {}, {}
+    for fi in FoodItem.objects.filter(Q(pk__in=ids) | Q(search_name__in=exact_keys)).order_by('id'):
+        by_pk[fi.pk] = fi
+        by_key.setdefault(fi.search_name, fi)
+
+    pending = {}
+    for ref in refs:
+        fi = by_pk.get(int(ref)) if ref.isdigit() else None
+        fi = fi or by_key.get(keys[ref])
+        if fi is not None:
+            resolved[ref] = fi
+        elif keys[ref]:
+            pending[ref] = keys[ref]
+
+    if pending:
+        cond = Q()
+        for key in set(pending.values()):
+            cond |= Q(**_prefix_range(key))
+        candidates = list(FoodItem.objects.filter(cond).order_by('search_name', 'id'))
+        for ref, key in list(pending.items()):
+            resolved[ref] = next((fi for fi in candidates if fi.search_name.startswith(key)), None)
+            if resolved[ref] is not None:
+                del pending[ref]
+
+    if pending:
+        ids = _token_match_ids(set(pending.values()))
+        foods = FoodItem.objects.in_bulk(set(ids.values())) if ids else {}
+        for ref, key in pending.items():
+            resolved[ref] = foods.get(ids.get(key))
+
+    return resolved
+
+
+def per_gram(fi: FoodItem) -> Dict[str, Optional[float]]:
+    """Macros por grama de `fi` (snapshot gravado em IngredientEntry)."""
+    weight = float(fi.weight_grams) if fi.weight_grams else 0.0
+    return {
+        f'{macro}_per_gram': (float(getattr(fi, macro)) / weight if weight else None)
+        for macro in ('calories', 'protein', 'carbs', 'fat')
+    }
+
+
+def get_nutrients_for_many(items: Iterable[Tuple[str, float]]) -> List[Dict]:
+    """Versão em lote de get_nutrients_for_grams: [(food_id_or_text, grams), ...] -> [macros, ...].
+
+    Além dos macros, cada dict traz `food_id` e os fatores `<macro>_per_gram` do
+    FoodItem resolvido (None quando não encontrado). Os macros saem de um único
+    cálculo matricial (core.services.nutrient_matrix) sobre os alimentos resolvidos.
+    """
+    items = list(items)
+    foods = resolve_foods(ref for ref, _ in items)
+    resolved = [foods.get(str(ref)) if ref else None for ref, _ in items]
+    matrix = NutrientMatrix(fi for fi in resolved if fi)
+    pairs = [(fi.pk if fi else None, grams) for fi, (_, grams) in zip(resolved, items)]
+
+    results = []
+    for fi, nutrients in zip(resolved, as_dicts(matrix.per_item(pairs))):
+        nutrients['food_id'] = fi.pk if fi else None
+        nutrients.update(per_gram(fi) if fi else dict.fromkeys(
+            ('calories_per_gram', 'protein_per_gram', 'carbs_per_gram', 'fat_per_gram')))
+        results.append(nutrients)
+    return results
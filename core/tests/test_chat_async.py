@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.services import chat_backend, chat_cache
+from core import throttling
+from core.models.chat import ChatSession
+
+
+class FakeAsyncClient:
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def chat_completion(self, messages=None, **kwargs):
+        FakeAsyncClient.calls.append(messages)
+        return SimpleNamespace(choices=[SimpleNamespace(message={'content': 'Claro! {"treino": "", "dieta": "ok"}'})])
+
+
+class AsyncChatTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        self.addCleanup(chat_backend.reset)
+        chat_cache.clear()
+        throttling.reset()
+        self.email = 'asyncuser@example.com'
+        self.password = 'AsyncPass123!'
+        self.user = User.objects.create_user(email=self.email, password=self.password)
+        FakeAsyncClient.calls = []
+
+    def _login(self):
+        token_resp = self.client.post('/api/token/', {'email': self.email, 'password': self.password}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token_resp.data['access']}")
+
+    def test_async_chat_persists_exchange_for_logged_user(self):
+        self._login()
+        session = ChatSession.objects.create(user=self.user, title='Existente')
+
+        with patch('core.services.chat_backend.AsyncInferenceClient', new=FakeAsyncClient):
+            resp = self.client.post('/api/chat/async/', {'message': 'Oi', 'session_id': session.id}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), {'treino': '', 'dieta': 'ok', 'session_id': session.id})
+        self.assertEqual(list(session.messages.order_by('id').values_list('role', flat=True)), ['user', 'assistant'])
+        self.assertEqual(FakeAsyncClient.calls[0][1], {'role': 'user', 'content': 'Oi'})
+
+    def test_async_chat_guest_is_not_persisted(self):
+        with patch('core.services.chat_backend.AsyncInferenceClient', new=FakeAsyncClient):
+            resp = self.client.post('/api/chat/async/', {'message': 'Oi'}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotIn('session_id', resp.json())
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_async_chat_rejects_empty_message(self):
+        resp = self.client.post('/api/chat/async/', {'message': ''}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_session_cookie_without_csrf_token_is_rejected(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_login(self.user)
+
+        with patch('core.services.chat_backend.AsyncInferenceClient', new=FakeAsyncClient):
+            resp = client.post('/api/chat/async/', {'message': 'Oi'}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(FakeAsyncClient.calls, [])
+        self.assertFalse(ChatMessage.objects.exists())
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import User, ChatMessage
+from core.services import chat_backend, chat_cache
+from core import throttling
+
+
+@override_settings(CHAT_BACKEND='core.services.chat_backend.LocalBackend')
+class ChatOptionalAuthTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        chat_cache.clear()
+        throttling.reset()
+        self.addCleanup(chat_backend.reset)
+        self.user = User.objects.create_user(email='chatauth@example.com', password='pass1234')
+
+    def _count_decodes(self):
+        original = JWTAuthentication.get_validated_token
+        return patch.object(JWTAuthentication, 'get_validated_token', autospec=True, side_effect=original)
+
+    def test_jwt_is_validated_once_per_request(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+
+        with self._count_decodes() as decode:
+            resp = self.client.post('/api/chat/', {'message': 'Oi'}, format='json',
+                                    HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(decode.call_count, 1)
+        self.assertTrue(ChatMessage.objects.filter(user=self.user, session_id=resp.data['session_id']).exists())
+
+    def test_guest_without_header_does_no_token_work(self):
+        with self._count_decodes() as decode:
+            resp = self.client.post('/api/chat/', {'message': 'Oi'}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(decode.call_count, 0)
+        self.assertNotIn('session_id', resp.data)
+
+    def test_invalid_token_is_a_401_not_a_guest(self):
+        with self._count_decodes() as decode:
+            resp = self.client.post('/api/chat/', {'message': 'Oi'}, format='json',
+                                    HTTP_AUTHORIZATION='Bearer not-a-token')
+
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(resp['WWW-Authenticate'], 'Bearer')
+        self.assertEqual(decode.call_count, 1)
+        self.assertFalse(ChatMessage.objects.exists())
+
+        resp = self.client.post('/api/chat/async/', {'message': 'Oi'}, format='json',
+                                HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.services import chat_backend, chat_cache
+from core import throttling
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - environment dependent
+    httpx = None
+
+
+def _reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message={'content': content})])
+
+
+class FakeClient:
+    instances = 0
+    timeout = None
+    raise_exc = None
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        FakeClient.instances += 1
+        FakeClient.timeout = timeout
+
+    def chat_completion(self, messages=None, stream=False, **kwargs):
+        if FakeClient.raise_exc:
+            raise FakeClient.raise_exc
+        if stream:
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content='{}'))])])
+        return _reply('{"treino": "", "dieta": "ok"}')
+
+
+@override_settings(CHAT_MAX_CONCURRENCY=1, CHAT_QUEUE_TIMEOUT=0, CHAT_CONNECT_TIMEOUT=2, CHAT_READ_TIMEOUT=7)
+class ChatBackendTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        chat_cache.clear()
+        throttling.reset()
+        FakeClient.instances = 0
+        FakeClient.raise_exc = None
+        patcher = patch('core.services.chat_backend.InferenceClient', new=FakeClient)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(chat_backend.reset)
+
+    def test_client_is_reused_with_deadlines(self):
+        for i in range(3):
+            resp = self.client.post('/api/chat/', {'message': f'Oi {i}'}, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(FakeClient.instances, 1)
+        if httpx is not None:
+            self.assertEqual((FakeClient.timeout.connect, FakeClient.timeout.read), (2, 7))
+        metrics = chat_backend.metrics()
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['latency_ms']['samples'], 3)
+
+    def test_client_comes_from_the_injected_factory(self):
+        clients = []
+        backend = chat_backend.HuggingFaceBackend(client_factory=lambda: clients.append(FakeClient()) or clients[-1])
+
+        backend.complete([{'role': 'user', 'content': 'Oi'}])
+        backend.complete([{'role': 'user', 'content': 'Oi'}])
+
+        self.assertEqual(len(clients), 1)
+        with self.assertRaises(TypeError):
+            chat_backend.ChatBackend()  # complete() is abstract
+
+    def test_saturated_pool_fails_fast_with_503(self):
+        held = chat_backend.stream([{'role': 'user', 'content': 'Oi'}])  # keeps the only slot
+        try:
+            resp = self.client.post('/api/chat/', {'message': 'Oi'}, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(resp['Retry-After'], '1')
+
+            resp = self.client.post('/api/chat/stream/', {'message': 'Oi'}, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        finally:
+            held.close()
+
+        self.assertEqual(chat_backend.metrics()['rejected'], 2)
+        resp = self.client.post('/api/chat/', {'message': 'Oi'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_upstream_timeout_returns_504(self):
+        FakeClient.raise_exc = TimeoutError('read timed out')
+
+        resp = self.client.post('/api/chat/', {'message': 'Oi'}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertEqual(chat_backend.metrics()['timeouts'], 1)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        user = User.objects.create_user(email='metrics@example.com', password='pass1234')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get('/api/chat/metrics/').status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        resp = self.client.get('/api/chat/metrics/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('peak_waiting', resp.data)
+
+
+@override_settings(CHAT_BACKEND='core.services.chat_backend.LocalBackend', CHAT_LOCAL_CHUNK_SIZE=8)
+class LocalChatBackendTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        chat_cache.clear()
+        throttling.reset()
+        self.addCleanup(chat_backend.reset)
+        self.user = User.objects.create_user(email='local@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+
+    def test_local_backend_is_deterministic_and_follows_intent(self):
+        first = self.client.post('/api/chat/', {'message': 'Quero um treino'}, format='json')
+        second = self.client.post('/api/chat/', {'message': 'Quero um treino'}, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertTrue(first.data['treino'])
+        self.assertEqual(first.data['dieta'], '')
+        self.assertEqual(first.data['treino'], second.data['treino'])
+        self.assertEqual(ChatMessage.objects.filter(session_id=second.data['session_id']).count(), 2)
+
+    def test_local_backend_streams_the_same_reply_in_chunks(self):
+        messages = [{'role': 'user', 'content': 'dieta'}]
+        backend = chat_backend.get_backend()
+        tokens = list(chat_backend.stream(messages))
+
+        self.assertGreater(len(tokens), 1)
+        self.assertTrue(all(len(t) <= 8 for t in tokens))
+        self.assertEqual(''.join(tokens), backend.complete(messages))
+        self.assertEqual(async_to_sync(chat_backend.acomplete)(messages), backend.complete(messages))
+
+
+@override_settings(CHAT_BACKEND='core.services.chat_backend.LocalBackend', CHAT_LOCAL_LATENCY=0.3)
+class ChatCoalescingTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        self.addCleanup(chat_backend.reset)
+        self.messages = [{'role': 'system', 'content': 'FitAI'}, {'role': 'user', 'content': 'treino'}]
+
+    def test_concurrent_identical_calls_share_one_upstream_call(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(chat_backend.complete(self.messages)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(set(results)), 1)
+        metrics = chat_backend.metrics()
+        self.assertEqual((metrics['requests'], metrics['coalesced']), (1, 3))
+
+    def test_async_waiters_share_one_call(self):
+        async def burst():
+            other = [{'role': 'user', 'content': 'dieta'}]
+            return await asyncio.gather(*(chat_backend.acomplete(m) for m in [self.messages] * 3 + [other]))
+
+        results = async_to_sync(burst)()
+
+        self.assertEqual(len(set(results[:3])), 1)
+        self.assertNotEqual(results[0], results[3])
+        metrics = chat_backend.metrics()
+        self.assertEqual((metrics['requests'], metrics['coalesced']), (2, 2))
+
+    def test_cancelled_leader_does_not_cancel_the_followers(self):
+        async def burst():
+            leader = asyncio.ensure_future(chat_backend.acomplete(self.messages))
+            await asyncio.sleep(0.05)
+            followers = [asyncio.ensure_future(chat_backend.acomplete(self.messages)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            leader.cancel()
+            results = await asyncio.gather(*followers)
+            return leader.cancelled(), results
+
+        leader_cancelled, results = async_to_sync(burst)()
+
+        self.assertTrue(leader_cancelled)
+        self.assertEqual(results, [chat_backend.LocalBackend().reply(self.messages)] * 2)
+        self.assertEqual(chat_backend.metrics()['requests'], 1)
+
+    def test_call_is_cancelled_when_every_waiter_gives_up(self):
+        async def burst():
+            waiters = [asyncio.ensure_future(chat_backend.acomplete(self.messages)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            flight = chat_backend._loop_flights[asyncio.get_running_loop()][chat_backend._flight_key(self.messages)]
+            waiters[0].cancel()
+            await asyncio.sleep(0)
+            still_running = not flight.task.done()
+            waiters[1].cancel()
+            await asyncio.gather(*waiters, flight.task, return_exceptions=True)
+            return still_running, flight.task.cancelled()
+
+        self.assertEqual(async_to_sync(burst)(), (True, True))
+
+    @override_settings(CHAT_COALESCE=False)
+    def test_coalescing_can_be_disabled(self):
+        threads = [threading.Thread(target=chat_backend.complete, args=(self.messages,)) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(chat_backend.metrics()['requests'], 2)
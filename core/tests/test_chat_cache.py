@@ -0,0 +1,53 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.services import chat_backend, chat_cache
+from core import throttling
+
+
+@override_settings(CHAT_BACKEND='core.services.chat_backend.LocalBackend')
+class ChatCacheTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        chat_cache.clear()
+        throttling.reset()
+        self.addCleanup(chat_backend.reset)
+        self.user = User.objects.create_user(email='cache@example.com', password='pass1234', objetivo='hipertrofia')
+        self.client.force_authenticate(user=self.user)
+
+    def test_normalized_repeat_is_served_from_cache_and_still_persisted(self):
+        first = self.client.post('/api/chat/', {'message': 'Monte um treino!'}, format='json')
+        second = self.client.post('/api/chat/', {'message': '  monte um TREINO '}, format='json')
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['treino'], second.data['treino'])
+        self.assertEqual(chat_backend.metrics()['requests'], 1)
+        self.assertEqual(chat_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+        cached_reply = ChatMessage.objects.get(session_id=first.data['session_id'], role='assistant').content
+        saved = ChatMessage.objects.filter(session_id=second.data['session_id']).order_by('id')
+        self.assertEqual([m.content for m in saved], ['monte um TREINO', cached_reply])
+
+    def test_key_depends_on_intent_and_profile(self):
+        other = User.objects.create_user(email='cache2@example.com', password='pass1234', objetivo='emagrecimento')
+
+        self.assertEqual(chat_cache.key_for('Monte um treino', self.user), chat_cache.key_for('monte  um treino?', self.user))
+        self.assertNotEqual(chat_cache.key_for('Monte um treino', self.user), chat_cache.key_for('Monte um treino', other))
+        self.assertNotEqual(chat_cache.key_for('Monte um treino', self.user), chat_cache.key_for('Monte uma dieta', self.user))
+
+    def test_streamed_reply_is_cached(self):
+        first = self.client.post('/api/chat/stream/', {'message': 'Quero uma dieta'}, format='json')
+        b''.join(first.streaming_content)  # the reply is cached once the stream completes
+        resp = self.client.post('/api/chat/stream/', {'message': 'Quero uma dieta'}, format='json')
+        body = b''.join(resp.streaming_content).decode('utf-8')
+
+        self.assertIn('event: done', body)
+        self.assertEqual(chat_backend.metrics()['requests'], 1)
+
+    @override_settings(CHAT_CACHE_TTL=0)
+    def test_ttl_zero_disables_cache(self):
+        for _ in range(2):
+            self.client.post('/api/chat/', {'message': 'Oi'}, format='json')
+
+        self.assertEqual(chat_backend.metrics()['requests'], 2)
+        self.assertEqual(chat_cache.stats()['hits'], 0)
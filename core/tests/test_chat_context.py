@@ -0,0 +1,80 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.models.chat import ChatSession
+from core.services import chat_backend, chat_cache, chat_context
+from core import throttling
+from core.services.chat_backend import LocalBackend
+
+
+class RecordingBackend(LocalBackend):
+    calls = []
+
+    def complete(self, messages):
+        RecordingBackend.calls.append(messages)
+        return super().complete(messages)
+
+
+def _fill(session, turns, size=200):
+    for i in range(turns):
+        ChatMessage.objects.create(user=session.user, session=session, role='user', content=f'pergunta {i} ' + 'x' * size)
+        ChatMessage.objects.create(user=session.user, session=session, role='assistant',
+                                   content='{"treino": "resposta %d", "dieta": ""}' % i)
+
+
+@override_settings(CHAT_CONTEXT_TOKENS=200, CHAT_CONTEXT_MAX_MESSAGES=6, CHAT_SUMMARY_TOKENS=60)
+class ChatContextTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='context@example.com', password='pass1234')
+        self.session = ChatSession.objects.create(user=self.user, title='Longa')
+
+    def test_window_fits_budget_and_older_turns_are_summarized(self):
+        _fill(self.session, 10)
+
+        with self.assertNumQueries(2):  # recent messages + summary update
+            context = chat_context.build(self.session)
+
+        history = [m for m in context if m['role'] != 'system']
+        self.assertLessEqual(sum(chat_context.estimate_tokens(m['content']) for m in history), 200)
+        self.assertEqual(history[-1]['content'], '{"treino": "resposta 9", "dieta": ""}')
+        self.assertTrue(context[0]['content'].startswith('Resumo da conversa até aqui:'))
+
+        self.session.refresh_from_db()
+        self.assertIn('FitAI: resposta 6', self.session.summary)
+        self.assertNotIn('resposta 7', self.session.summary)
+        self.assertLessEqual(chat_context.estimate_tokens(self.session.summary), 60 + 5)
+        self.assertGreater(self.session.summary_until, 0)
+
+    def test_prompt_size_stays_flat_as_the_conversation_grows(self):
+        sizes = []
+        for _ in range(3):
+            _fill(self.session, 10)
+            context = chat_context.build(self.session)
+            sizes.append(sum(len(m['content']) for m in context))
+
+        self.assertLessEqual(max(sizes) - min(sizes), 100)
+
+    def test_no_session_means_no_context(self):
+        self.assertEqual(chat_context.build(None), [])
+
+
+@override_settings(CHAT_BACKEND='core.tests.test_chat_context.RecordingBackend')
+class ChatContextViewTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        chat_cache.clear()
+        throttling.reset()
+        self.addCleanup(chat_backend.reset)
+        RecordingBackend.calls = []
+        self.user = User.objects.create_user(email='contextview@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+
+    def test_follow_up_message_carries_session_history(self):
+        first = self.client.post('/api/chat/', {'message': 'Oi'}, format='json')
+        second = self.client.post('/api/chat/', {'message': 'Oi', 'session_id': first.data['session_id']}, format='json')
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(RecordingBackend.calls), 2)  # same text, different context: not a cache hit
+        roles = [m['role'] for m in RecordingBackend.calls[1]]
+        self.assertEqual(roles, ['system', 'user', 'assistant', 'user'])
@@ -1,11 +1,15 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from core.models import User, ChatMessage
+from core.services import chat_backend
 from unittest.mock import patch
 
 
 class ChatHistoryTests(APITestCase):
     def setUp(self):
+        # the patched InferenceClient is only picked up by a fresh backend
+        chat_backend.reset()
+        self.addCleanup(chat_backend.reset)
         self.email = 'historyuser@example.com'
         self.password = 'HistoryPass123!'
         self.user = User.objects.create_user(email=self.email, password=self.password,
@@ -30,7 +34,7 @@ class ChatHistoryTests(APITestCase):
                 # return predictable JSON
                 return FakeResp('{"treino": "ok", "dieta": "ok"}')
 
-        with patch('core.views.chat.InferenceClient', new=FakeClient):
+        with patch('core.services.chat_backend.InferenceClient', new=FakeClient):
             resp = self.client.post('/api/chat/', {'message': 'Teste historico'}, format='json')
             self.assertEqual(resp.status_code, status.HTTP_200_OK)
             session_id = resp.data.get('session_id')
@@ -78,7 +82,7 @@ class ChatHistoryTests(APITestCase):
                         self.choices = [type('C', (), {'message': {'content': content}})]
                 return FakeResp('{"treino": "ok", "dieta": "ok"}')
 
-        with patch('core.views.chat.InferenceClient', new=FakeClient):
+        with patch('core.services.chat_backend.InferenceClient', new=FakeClient):
             self.client.post('/api/chat/', {'message': 'Minha conversa'}, format='json')
 
         # Now login as the other user and check history
@@ -0,0 +1,117 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.models.chat import ChatJob
+from core.services import chat_backend, chat_cache, chat_jobs
+from core import throttling
+
+
+@override_settings(CHAT_BACKEND='core.services.chat_backend.LocalBackend', CHAT_JOB_WORKERS=0)
+class ChatJobTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        chat_cache.clear()
+        throttling.reset()
+        self.addCleanup(chat_backend.reset)
+        self.user = User.objects.create_user(email='jobs@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+
+    def _post(self, message, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/chat/jobs/', {'message': message}, format='json', **headers)
+
+    def test_post_returns_job_id_and_result_is_polled(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            resp = self.client.post('/api/chat/jobs/', {'message': 'Quero um treino'}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.data['status'], 'queued')
+        self.assertTrue(resp['Location'].endswith(f"/api/chat/jobs/{resp.data['id']}/"))
+        self.assertEqual(chat_backend.metrics()['requests'], 0)  # the model is not called in the request
+
+        for callback in callbacks:
+            callback()
+        job = self.client.get(resp['Location'])
+
+        self.assertEqual(job.data['status'], 'done')
+        self.assertTrue(job.data['result']['treino'])
+        session_id = job.data['result']['session_id']
+        self.assertEqual(ChatMessage.objects.filter(session_id=session_id).count(), 2)
+
+    def test_idempotency_key_replays_the_same_job(self):
+        first = self._post('Monte uma dieta', key='retry-1')
+        second = self._post('Monte uma dieta', key='retry-1')
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(second.data['status'], 'done')
+        self.assertEqual(ChatJob.objects.count(), 1)
+        self.assertEqual(chat_backend.metrics()['requests'], 1)
+
+        conflict = self._post('Outra coisa', key='retry-1')
+        self.assertEqual(conflict.status_code, 422)
+
+    def test_keys_are_scoped_per_user(self):
+        self._post('Oi', key='same')
+        other = User.objects.create_user(email='jobs2@example.com', password='pass1234')
+        self.client.force_authenticate(user=other)
+
+        resp = self._post('Oi', key='same')
+
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(ChatJob.objects.count(), 2)
+
+    def test_guest_keys_are_scoped_per_client_behind_a_proxy(self):
+        self.client.force_authenticate(user=None)
+        rest_framework = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+        with override_settings(REST_FRAMEWORK=rest_framework), self.captureOnCommitCallbacks(execute=True):
+            # same proxy address, different clients
+            first = self.client.post('/api/chat/jobs/', {'message': 'Oi'}, format='json', REMOTE_ADDR='10.0.0.1',
+                                     HTTP_X_FORWARDED_FOR='1.1.1.1', HTTP_IDEMPOTENCY_KEY='same')
+            second = self.client.post('/api/chat/jobs/', {'message': 'Oi'}, format='json', REMOTE_ADDR='10.0.0.1',
+                                      HTTP_X_FORWARDED_FOR='2.2.2.2', HTTP_IDEMPOTENCY_KEY='same')
+
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotEqual(first.data['id'], second.data['id'])
+
+    def test_jobs_are_private_to_their_owner(self):
+        job_id = self._post('Oi').data['id']
+        other = User.objects.create_user(email='jobs3@example.com', password='pass1234')
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.client.get(f'/api/chat/jobs/{job_id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_long_poll_returns_when_wait_expires(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self.client.post('/api/chat/jobs/', {'message': 'Oi'}, format='json').data['id']
+
+        resp = self.client.get(f'/api/chat/jobs/{job_id}/', {'wait': '0.2'})
+
+        self.assertEqual(resp.data['status'], 'queued')
+
+    def test_saturated_pool_requeues_with_backoff_then_fails(self):
+        start = timezone.now()
+        with patch('core.services.chat_backend.complete', side_effect=chat_backend.BackendSaturated('cheio')):
+            job_id = self._post('Oi').data['id']
+            job = ChatJob.objects.get(pk=job_id)
+            self.assertEqual((job.status, job.attempts), (ChatJob.QUEUED, 1))
+            self.assertGreaterEqual(job.not_before, start + timedelta(seconds=2))
+            self.assertEqual(chat_jobs.drain(), 0)  # not due yet
+
+            with patch('core.services.chat_jobs.timezone.now', return_value=start + timedelta(seconds=3)):
+                self.assertEqual(chat_jobs.drain(), 1)
+                self.assertEqual(chat_jobs.drain(), 0)  # the second retry waits twice as long
+            with patch('core.services.chat_jobs.timezone.now', return_value=start + timedelta(seconds=10)):
+                self.assertEqual(chat_jobs.drain(), 1)
+
+        job = ChatJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.attempts), (ChatJob.FAILED, 3))
+        self.assertEqual(chat_jobs.drain(), 0)
@@ -0,0 +1,44 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.models.chat import ChatSession, LAST_MESSAGE_PREVIEW
+
+
+class ChatSessionListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='sessions@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+
+    def _sessions(self, count):
+        for i in range(count):
+            session = ChatSession.objects.create(user=self.user, title=f'Conversa {i}')
+            ChatMessage.objects.create(user=self.user, session=session, role='user', content=f'pergunta {i}')
+            ChatMessage.objects.create(user=self.user, session=session, role='assistant', content='x' * 500)
+
+    def test_query_count_does_not_grow_with_sessions(self):
+        self._sessions(3)
+        with self.assertNumQueries(2):  # count + page with the last message annotated
+            self.client.get('/api/chat/sessions/')
+
+        self._sessions(30)
+        with self.assertNumQueries(2):
+            resp = self.client.get('/api/chat/sessions/')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['total_pages'], 4)
+        self.assertEqual(len(resp.data['results']), 10)
+
+    def test_last_message_is_a_preview_on_the_list_only(self):
+        self._sessions(1)
+        empty = ChatSession.objects.create(user=self.user, title='Vazia')
+
+        results = self.client.get('/api/chat/sessions/').data['results']
+
+        self.assertEqual(results[0]['id'], empty.id)
+        self.assertIsNone(results[0]['last_message'])
+        last = results[1]['last_message']
+        self.assertEqual(last['role'], 'assistant')
+        self.assertEqual(last['content'], 'x' * LAST_MESSAGE_PREVIEW)
+
+        detail = self.client.get(f"/api/chat/sessions/{results[1]['id']}/").data
+        self.assertEqual(detail['last_message'], {**last, 'content': 'x' * 500})
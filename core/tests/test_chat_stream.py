@@ -0,0 +1,85 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.services import chat_backend, chat_cache
+from core import throttling
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+def _events(resp):
+    body = b''.join(resp.streaming_content).decode('utf-8')
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class ChatStreamTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        self.addCleanup(chat_backend.reset)
+        chat_cache.clear()
+        throttling.reset()
+        self.user = User.objects.create_user(email='streamuser@example.com', password='StreamPass123!')
+
+    def _fake_client(self, pieces, fail_after=None):
+        captured = {}
+
+        class FakeClient:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def chat_completion(self, messages=None, stream=False, **kwargs):
+                captured['stream'] = stream
+                for i, piece in enumerate(pieces):
+                    if fail_after is not None and i == fail_after:
+                        raise RuntimeError('model went away')
+                    yield _chunk(piece)
+
+        return FakeClient, captured
+
+    def test_stream_relays_tokens_then_done_and_persists(self):
+        self.client.force_authenticate(user=self.user)
+        FakeClient, captured = self._fake_client(['{"treino": "agach', 'amento", ', '"dieta": ""}'])
+
+        with patch('core.services.chat_backend.InferenceClient', new=FakeClient):
+            resp = self.client.post('/api/chat/stream/', {'message': 'Monte um treino'}, format='json',
+                                    HTTP_ACCEPT='text/event-stream')
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(resp['Content-Type'], 'text/event-stream')
+            # nothing is written before the stream is consumed
+            self.assertEqual(ChatMessage.objects.count(), 0)
+            events = _events(resp)
+
+        self.assertTrue(captured['stream'])
+        self.assertEqual([e for e, _ in events], ['token', 'token', 'token', 'done'])
+        done = events[-1][1]
+        self.assertEqual(done['treino'], 'agachamento')
+        self.assertIsNotNone(done['session_id'])
+
+        saved = ChatMessage.objects.filter(user=self.user, session_id=done['session_id']).order_by('id')
+        self.assertEqual([m.role for m in saved], ['user', 'assistant'])
+        self.assertEqual(saved[1].content, '{"treino": "agachamento", "dieta": ""}')
+
+    def test_stream_error_emits_error_event_and_saves_nothing(self):
+        self.client.force_authenticate(user=self.user)
+        FakeClient, _ = self._fake_client(['{"treino"', ': "x"}'], fail_after=1)
+
+        with patch('core.services.chat_backend.InferenceClient', new=FakeClient):
+            resp = self.client.post('/api/chat/stream/', {'message': 'Oi'}, format='json')
+            events = _events(resp)
+
+        self.assertEqual([e for e, _ in events], ['token', 'error'])
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_stream_rejects_empty_message(self):
+        resp = self.client.post('/api/chat/stream/', {'message': '  '}, format='json', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
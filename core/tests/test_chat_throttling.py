@@ -0,0 +1,101 @@
+from unittest.mock import patch
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User
+from core.services import chat_backend, chat_cache
+from core import throttling
+
+
+@override_settings(CHAT_BACKEND='core.services.chat_backend.LocalBackend',
+                   CHAT_THROTTLE_RATES={'chat_anon': '2/min', 'chat_user': '3/min'})
+class ChatThrottlingTests(APITestCase):
+    def setUp(self):
+        chat_backend.reset()
+        chat_cache.clear()
+        throttling.reset()
+        self.addCleanup(chat_backend.reset)
+
+    def _post(self, path='/api/chat/', **extra):
+        return self.client.post(path, {'message': 'Oi'}, format='json', **extra)
+
+    def test_anonymous_budget_is_per_ip_with_retry_after(self):
+        self.assertEqual(self._post().status_code, status.HTTP_200_OK)
+        self.assertEqual(self._post().status_code, status.HTTP_200_OK)
+
+        resp = self._post()
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(resp['Retry-After']), 30)  # one token every 30s at 2/min
+
+        other_ip = self._post(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other_ip.status_code, status.HTTP_200_OK)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        self._post(HTTP_X_FORWARDED_FOR='1.1.1.1')
+        self._post(HTTP_X_FORWARDED_FOR='2.2.2.2')
+
+        spoofed = self._post(HTTP_X_FORWARDED_FOR='3.3.3.3')
+        self.assertEqual(spoofed.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_tokens_refill_over_time(self):
+        with patch.object(throttling.TokenBucketThrottle, 'timer', return_value=1000.0):
+            self._post()
+            self._post()
+            self.assertEqual(self._post().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        with patch.object(throttling.TokenBucketThrottle, 'timer', return_value=1030.0):
+            self.assertEqual(self._post().status_code, status.HTTP_200_OK)
+            self.assertEqual(self._post().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_authenticated_users_have_their_own_budget(self):
+        self._post()
+        self._post()
+        user = User.objects.create_user(email='throttle@example.com', password='pass1234')
+        self.client.force_authenticate(user=user)
+
+        codes = [self._post().status_code for _ in range(4)]
+
+        self.assertEqual(codes, [200, 200, 200, 429])
+
+    def test_async_view_shares_the_budget(self):
+        self._post()
+        self._post()
+
+        resp = self._post('/api/chat/async/')
+
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', resp)
+
+    def test_polling_a_job_is_not_throttled(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self._post('/api/chat/jobs/').data['id']
+        self._post()
+
+        codes = {self.client.get(f'/api/chat/jobs/{job_id}/').status_code for _ in range(3)}
+
+        self.assertEqual(codes, {status.HTTP_200_OK})
+
+    @override_settings(CHAT_GLOBAL_CONCURRENCY=1, CHAT_MAX_CONCURRENCY=4)
+    def test_global_cap_counts_calls_from_every_worker(self):
+        held = chat_backend.stream([{'role': 'user', 'content': 'Oi'}])
+        try:
+            self.assertEqual(chat_backend.metrics()['global_in_flight'], 1)
+            resp = self._post()
+            self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(resp['Retry-After'], '1')
+        finally:
+            held.close()
+
+        self.assertEqual(chat_backend.metrics()['global_in_flight'], 0)
+        self.assertEqual(self._post().status_code, status.HTTP_200_OK)
+
+    @override_settings(CHAT_GLOBAL_CONCURRENCY=1, CHAT_MAX_CONCURRENCY=4)
+    def test_global_cap_is_off_without_an_atomic_counter(self):
+        # e.g. DatabaseCache, whose incr() is a get() + set()
+        with patch.object(chat_backend, 'ATOMIC_COUNTER_BACKENDS', ()):
+            held = chat_backend.stream([{'role': 'user', 'content': 'Oi'}])
+            try:
+                self.assertEqual(chat_backend.metrics()['global_in_flight'], 0)
+                self.assertEqual(self._post().status_code, status.HTTP_200_OK)
+            finally:
+                held.close()
@@ -1,11 +1,15 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from core.models import User
+from core.services import chat_backend
 from unittest.mock import patch
 
 
 class ChatUserFieldsTests(APITestCase):
     def setUp(self):
+        # the patched InferenceClient is only picked up by a fresh backend
+        chat_backend.reset()
+        self.addCleanup(chat_backend.reset)
         self.email = 'chatuser@example.com'
         self.password = 'ChatPass123!'
         self.user = User.objects.create_user(email=self.email, password=self.password,
@@ -45,7 +49,7 @@ class ChatUserFieldsTests(APITestCase):
             def chat_completion(self, messages=None, max_tokens=None):
                 return fake_chat_completion(self, messages=messages, max_tokens=max_tokens)
 
-        with patch('core.views.chat.InferenceClient', new=FakeClient):
+        with patch('core.services.chat_backend.InferenceClient', new=FakeClient):
             resp = self.client.post('/api/chat/', {'message': 'Teste'}, format='json')
             self.assertEqual(resp.status_code, status.HTTP_200_OK)
             self.assertIn('Objetivo', messages_captured['system'])
@@ -0,0 +1,119 @@
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, RequestFactory
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from core import authentication
+from core.authentication import ClaimsJWTAuthentication
+from core.models import ClaimsUser, User
+from core.models.chat import ChatSession
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication.active_users.clear()
+        self.addCleanup(authentication.active_users.clear)
+        self.user = User.objects.create_user(email='claims@example.com', password='pass1234', name='Claims')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def _authenticate(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return ClaimsJWTAuthentication().authenticate(request)
+
+    def test_user_comes_from_claims_and_loads_once_on_demand(self):
+        with self.assertNumQueries(1):  # first request checks the row
+            self._authenticate()
+
+        with self.assertNumQueries(0):
+            user, _ = self._authenticate()
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertTrue(user.is_authenticated)
+
+        with self.assertNumQueries(1):
+            self.assertEqual((user.email, user.name, user.peso_kg), ('claims@example.com', 'Claims', 70))
+            self.assertFalse(user.is_staff)
+
+        self.assertEqual(user, self.user)
+
+    def test_row_deleted_after_the_check_is_a_401_on_load(self):
+        self._authenticate()
+        user, _ = self._authenticate()
+        User.objects.filter(pk=self.user.pk).delete()  # queryset delete still sends post_delete
+
+        with self.assertRaises(authentication.AuthenticationFailed):
+            user.email
+
+    def test_claims_user_model_raises_does_not_exist_on_load(self):
+        user = ClaimsUser.from_claims(str(self.user.pk))
+        self.user.delete()
+
+        with self.assertRaises(User.DoesNotExist):
+            user.email
+
+    def test_saving_the_claims_user_forgets_it_when_inactive(self):
+        self._authenticate()
+        user, _ = self._authenticate()
+        self.assertNotEqual(type(user), User)
+
+        user.is_active = False
+        user.save()
+
+        self.assertNotIn(self.user.pk, authentication.active_users)
+
+
+class ClaimsJWTEndpointTests(APITestCase):
+    def setUp(self):
+        authentication.active_users.clear()
+        self.addCleanup(authentication.active_users.clear)
+        self.user = User.objects.create_user(email='claimsapi@example.com', password='pass1234')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_id_only_endpoint_skips_the_user_query(self):
+        self.client.get('/api/chat/sessions/')
+        with self.assertNumQueries(1):  # the sessions count (empty page)
+            resp = self.client.get('/api/chat/sessions/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_writes_and_filters_use_the_claims_user(self):
+        self.client.get('/api/chat/sessions/')
+        resp = self.client.post('/api/chat/sessions/', {'title': 'Nova'}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ChatSession.objects.get().user_id, self.user.pk)
+        self.assertEqual(len(self.client.get('/api/chat/sessions/').data['results']), 1)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get('/meals/')
+        self.user.delete()
+
+        self.assertEqual(self.client.get('/meals/').status_code, status.HTTP_401_UNAUTHORIZED)
+        resp = self.client.post('/api/chat/sessions/', {'title': 'Nova'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_row_deleted_after_the_check_is_a_401_on_the_endpoint(self):
+        self.client.get('/meals/')
+        with patch.object(authentication.active_users, 'discard'):  # like a delete on another worker
+            self.user.delete()
+
+        resp = self.client.get('/api/usuarios/me/')
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', resp)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get('/meals/').status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/meals/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_check_expires(self):
+        self.client.get('/meals/')
+        # update() sends no signal, like a change made by another worker
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/meals/').status_code, status.HTTP_200_OK)
+
+        with patch('core.authentication.time.time', return_value=time.time() + 61):
+            self.assertEqual(self.client.get('/meals/').status_code, status.HTTP_401_UNAUTHORIZED)
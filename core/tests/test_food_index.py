@@ -0,0 +1,103 @@
+import time
+from unittest.mock import patch
+
+from django.db.models import F
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models.fooditem import FoodCatalogVersion, FoodItem
+from core.services import food_index, taco_db
+
+
+class FoodIndexTests(TestCase):
+    def setUp(self):
+        FoodItem.objects.all().delete()
+        food_index.reset()
+        self.addCleanup(food_index.reset)
+        FoodItem.objects.create(name='Açúcar, cristal', calories=387.0)
+        FoodItem.objects.create(name='Arroz, integral, cozido', calories=124.0)
+        FoodItem.objects.create(name='Arroz', calories=128.0)
+        FoodItem.objects.create(name='Feijão, carioca, cozido', calories=76.0)
+
+    def test_accent_and_case_insensitive(self):
+        names = [item['name'] for item in food_index.search('ACUCAR')]
+        self.assertEqual(names, ['Açúcar, cristal'])
+
+        names = [item['name'] for item in food_index.search('feijao')]
+        self.assertEqual(names, ['Feijão, carioca, cozido'])
+
+    def test_token_prefixes_and_ranking(self):
+        names = [item['name'] for item in food_index.search('arroz')]
+        # exact match first, then longer names
+        self.assertEqual(names, ['Arroz', 'Arroz, integral, cozido'])
+
+        names = [item['name'] for item in food_index.search('arr coz')]
+        self.assertEqual(names, ['Arroz, integral, cozido'])
+
+    def test_substring_fallback(self):
+        names = [item['name'] for item in food_index.search('ntegr')]
+        self.assertEqual(names, ['Arroz, integral, cozido'])
+
+    def test_name_lookup_falls_back_to_word_prefixes_without_a_table_scan(self):
+        food_index.get_index()
+        with CaptureQueriesContext(connection) as ctx:
+            fi = taco_db.find_by_name('carioca')
+            resolved = taco_db.resolve_foods(['integr coz', 'inexistente'])
+
+        self.assertEqual(fi.name, 'Feijão, carioca, cozido')
+        self.assertEqual(resolved['integr coz'].name, 'Arroz, integral, cozido')
+        self.assertIsNone(resolved['inexistente'])
+        self.assertFalse([q for q in ctx.captured_queries if "LIKE '%" in q['sql'] or 'INSTR' in q['sql']])
+
+    @override_settings(FOOD_SEARCH_INDEX=False)
+    def test_name_lookup_without_the_index_matches_word_prefixes_in_the_database(self):
+        self.assertEqual(taco_db.find_by_name('feij').name, 'Feijão, carioca, cozido')
+        self.assertEqual(taco_db.find_by_name('carioca').name, 'Feijão, carioca, cozido')
+        self.assertIsNone(taco_db.find_by_name('carioca cru'))
+
+        resolved = taco_db.resolve_foods(['integr coz', 'carioca', 'inexistente'])
+        self.assertEqual(resolved['integr coz'].name, 'Arroz, integral, cozido')
+        self.assertEqual(resolved['carioca'].name, 'Feijão, carioca, cozido')
+        self.assertIsNone(resolved['inexistente'])
+
+    def test_search_does_not_hit_database_once_built(self):
+        food_index.search('arroz')
+        with self.assertNumQueries(0):
+            food_index.search('feijao')
+
+    def test_rebuilds_after_fooditem_changes(self):
+        self.assertEqual(food_index.search('batata'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fi = FoodItem.objects.create(name='Batata, inglesa, cozida', calories=52.0)
+        self.assertEqual([item['name'] for item in food_index.search('batata')], [fi.name])
+
+        fi.name = 'Mandioca, cozida'
+        with self.captureOnCommitCallbacks(execute=True):
+            fi.save()
+        self.assertEqual(food_index.search('batata'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fi.delete()
+        self.assertEqual(food_index.search('mandioca'), [])
+
+    def test_version_is_bumped_only_on_commit(self):
+        before = FoodCatalogVersion.objects.get(pk=1).version
+        with self.captureOnCommitCallbacks() as callbacks:
+            FoodItem.objects.create(name='Batata, inglesa, cozida', calories=52.0)
+            self.assertEqual(FoodCatalogVersion.objects.get(pk=1).version, before)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(FoodCatalogVersion.objects.get(pk=1).version, before + 1)
+
+    def test_change_from_another_process_is_seen_after_the_ttl(self):
+        self.assertEqual(food_index.search('batata'), [])
+        # a write made by another worker (e.g. import_taco): no local signal
+        FoodItem.objects.bulk_create([FoodItem(name='Batata, inglesa, cozida', search_name='batata inglesa cozida')])
+        FoodCatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+
+        self.assertEqual(food_index.search('batata'), [])
+        with patch('core.services.food_index.time.monotonic', return_value=time.monotonic() + 6):
+            self.assertEqual([item['name'] for item in food_index.search('batata')], ['Batata, inglesa, cozida'])
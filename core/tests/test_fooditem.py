@@ -0,0 +1,65 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import User
+from core.models.fooditem import MICRONUTRIENTS, FoodItem
+
+
+class FoodItemAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='fooditem@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        values = [None] * len(MICRONUTRIENTS)
+        values[MICRONUTRIENTS.index('fiber_g')] = 2.7
+        self.food = FoodItem.objects.create(
+            name='Zzarroz, integral', calories=124.0, food_group='Zzgrupo', nutrient_values=values,
+        )
+
+    def test_list_is_lean_by_default(self):
+        resp = self.client.get('/fooditems/?food_group=Zzgrupo')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        item = resp.data['results'][0]
+        self.assertEqual(item['food_group'], 'Zzgrupo')
+        self.assertNotIn('micronutrients', item)
+
+    def test_detail_includes_micronutrients(self):
+        resp = self.client.get(f'/fooditems/{self.food.id}/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(resp.data['micronutrients']['fiber_g'], 2.7)
+        self.assertIsNone(resp.data['micronutrients']['sodium_mg'])
+
+    def test_fields_parameter_selects_fields(self):
+        resp = self.client.get('/fooditems/?food_group=Zzgrupo&fields=id,name,micronutrients')
+        self.assertEqual(set(resp.data['results'][0]), {'id', 'name', 'micronutrients'})
+
+        resp = self.client.get(f'/fooditems/{self.food.id}/?fields=name')
+        self.assertEqual(resp.data, {'name': 'Zzarroz, integral'})
+
+    def test_fields_parameter_is_ignored_on_writes(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        resp = self.client.patch(f'/fooditems/{self.food.id}/?fields=name', {'calories': 130.0}, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.food.refresh_from_db()
+        self.assertEqual(self.food.calories, 130.0)
+        self.assertIn('micronutrients', resp.data)
+
+
+class FoodItemAdminTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='foodadmin@example.com', password='pass1234')
+        self.client.force_login(self.admin)
+        FoodItem.objects.create(name='Zzfeijão, carioca')
+
+    def test_equivalent_name_is_a_form_error(self):
+        resp = self.client.post('/admin/core/fooditem/add/', {
+            'name': 'ZZFEIJAO carioca', 'portion': '100g', 'weight_grams': 100, 'calories': 0, 'protein': 0,
+            'carbs': 0, 'fat': 0, 'food_group': '', 'nutrient_values': '[]', 'country': 'Brasil', 'languages': 'pt',
+        })
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.context['adminform'].form.errors['name'],
+                         ['A food with an equivalent name already exists'])
+        self.assertEqual(FoodItem.objects.filter(search_name='zzfeijao carioca').count(), 1)
@@ -25,6 +25,16 @@ Número,Alimento,Idrato,Umidade,Porcao
 """
 
 
+CSV_TACO_LAYOUT = """,,,,,,,,Carbo-,Fibra
+Número do,,Umidade,Energia,,Proteína,Lipídeos,Colesterol,idrato,Alimentar
+Alimento,Descrição dos alimentos,(%),(kcal),(kJ),(g),(g),(mg),(g),(g)
+Cereais e derivados,,,,,,,,,
+1,"Arroz, integral, cozido","70,1",124,517,"2,6","1,0",NA,"25,8","2,7"
+Frutas e derivados,,,,,,,,,
+2,"Abacate, cru","83,8",96,403,"1,2","8,4",NA,"6,0","6,3"
+"""
+
+
 class ImportTacoCommandTests(TestCase):
 
     def setUp(self):
@@ -83,6 +93,68 @@ class ImportTacoCommandTests(TestCase):
 
         os.remove(path)
 
+    def test_import_is_batched_and_idempotent(self):
+        path = self._make_tmp_csv(CSV_HEADER)
+
+        out = StringIO()
+        with self.assertNumQueries(2 + 2 * 2):  # savepoints + (SELECT, upsert) per batch of 1
+            call_command('import_taco', '--path', path, '--batch-size', '1', stdout=out)
+        self.assertIn('Created=2 Updated=0 Unchanged=0', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+        out = StringIO()
+        call_command('import_taco', '--path', path, stdout=out)
+        self.assertIn('Created=0 Updated=0 Unchanged=2', out.getvalue())
+        self.assertEqual(FoodItem.objects.count(), 2)
+
+        changed_path = self._make_tmp_csv(CSV_HEADER.replace(',130,', ',128,'))
+        out = StringIO()
+        call_command('import_taco', '--path', changed_path, stdout=out)
+        self.assertIn('Updated=0 Unchanged=1 Skipped=1', out.getvalue())
+
+        out = StringIO()
+        call_command('import_taco', '--path', changed_path, '--update', stdout=out)
+        self.assertIn('Updated=1 Unchanged=1', out.getvalue())
+        arroz = FoodItem.objects.get(name='Arroz cozido')
+        self.assertAlmostEqual(arroz.calories, 128.0)
+        self.assertEqual(arroz.content_hash, arroz.compute_content_hash())
+
+        os.remove(path)
+        os.remove(changed_path)
+
+    def test_import_dry_run_prints_diff_without_writing(self):
+        path = self._make_tmp_csv(CSV_HEADER)
+        call_command('import_taco', '--path', path, '--quiet')
+        FoodItem.objects.create(name='Somente no banco')
+
+        contents = CSV_HEADER.replace(',130,', ',128,') + '3,Batata inglesa cozida,Batata,52,100g,1.2,0,100g,11.9\n'
+        changed_path = self._make_tmp_csv(contents)
+        out = StringIO()
+        call_command('import_taco', '--path', changed_path, '--dry-run', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('+ Batata', lines)
+        self.assertIn("~ Arroz cozido (calories: 130.0 -> 128.0)", lines)
+        self.assertIn('- Somente no banco', lines)
+        self.assertIn('New=1 Changed=1 Removed=1', out.getvalue())
+
+        self.assertEqual(FoodItem.objects.count(), 3)
+        self.assertAlmostEqual(FoodItem.objects.get(name='Arroz cozido').calories, 130.0)
+
+        os.remove(path)
+        os.remove(changed_path)
+
+    def test_import_skips_repeated_header_rows(self):
+        contents = CSV_HEADER + 'id,Alimento,Descrição,energia_kcal,um,proteína_g,lipídios_g,um2,carboidratos_g\n'
+        contents += '3,Batata inglesa cozida,Batata,52,100g,1.2,0,100g,11.9\n'
+        path = self._make_tmp_csv(contents)
+
+        call_command('import_taco', '--path', path, '--quiet')
+        self.assertEqual(FoodItem.objects.count(), 3)
+        self.assertFalse(FoodItem.objects.filter(name='Alimento').exists())
+
+        os.remove(path)
+
     def test_import_multiline_header_parses_carbs(self):
         """Validate that multi-line header (e.g. 'Carbo-' + 'idrato') is aggregated and carbohydrate values are read."""
         path = self._make_tmp_csv(CSV_MULTILINE)
@@ -98,3 +170,22 @@ class ImportTacoCommandTests(TestCase):
         self.assertAlmostEqual(float(fi.carbs), 28.1, places=2)
 
         os.remove(path)
+
+    def test_import_taco_layout_reads_food_groups_and_micronutrients(self):
+        path = self._make_tmp_csv(CSV_TACO_LAYOUT)
+
+        call_command('import_taco', '--path', path, '--quiet')
+
+        arroz = FoodItem.objects.get(name='Arroz, integral, cozido')
+        self.assertEqual(arroz.food_group, 'Cereais e derivados')
+        self.assertAlmostEqual(arroz.carbs, 25.8)
+        self.assertAlmostEqual(arroz.micronutrients['fiber_g'], 2.7)
+        self.assertAlmostEqual(arroz.micronutrients['energy_kj'], 517.0)
+        self.assertIsNone(arroz.micronutrients['cholesterol_mg'])
+        self.assertIsNone(arroz.micronutrients['vitamin_c_mg'])
+
+        abacate = FoodItem.objects.get(name='Abacate, cru')
+        self.assertEqual(abacate.food_group, 'Frutas e derivados')
+        self.assertAlmostEqual(abacate.micronutrients['moisture_pct'], 83.8)
+
+        os.remove(path)
@@ -0,0 +1,73 @@
+from datetime import date, time, timedelta
+
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import User, ChatMessage
+from core.models.chat import ChatSession
+from core.models.meal import Meal
+from core.models.workout_log import WorkoutLog
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='keyset@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+
+    def _walk(self, url, num_queries=None):
+        """Segue os cursores `next` até o fim; devolve os ids na ordem recebida."""
+        ids, pages = [], 0
+        while url:
+            if num_queries is None:
+                resp = self.client.get(url)
+            else:
+                with self.assertNumQueries(num_queries):
+                    resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            ids += [row['id'] for row in resp.data['results']]
+            url = resp.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_chat_messages_are_chronological_and_ties_are_stable(self):
+        session = ChatSession.objects.create(user=self.user, title='Longa')
+        for i in range(7):
+            ChatMessage.objects.create(user=self.user, session=session, role='user', content=f'm{i}')
+        # same timestamp on several rows: the id breaks the tie
+        same = timezone.now()
+        ChatMessage.objects.filter(session=session, id__in=list(session.messages.values_list('id', flat=True)[2:5])) \
+            .update(created_at=same)
+        expected = list(session.messages.order_by('created_at', 'id').values_list('id', flat=True))
+
+        ids, pages = self._walk(f'/api/chat/sessions/{session.id}/messages/?page_size=3',
+                                num_queries=2)  # session + page, on every page
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_workout_logs_newest_first(self):
+        finished = timezone.now()
+        for i in range(5):
+            WorkoutLog.objects.create(user=self.user, calories_burned=100, duration_minutes=30,
+                                      finished_at=finished - timedelta(hours=i % 3))
+        expected = [str(pk) for pk in WorkoutLog.objects.filter(user=self.user)
+                    .order_by('-finished_at', '-id').values_list('id', flat=True)]
+
+        ids, pages = self._walk('/workouts/logs/?page_size=2')
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_meals_by_date_time_and_id(self):
+        for i in range(6):
+            Meal.objects.create(user=self.user, title=f'R{i}', date=date(2025, 1, 1 + i % 2), time=time(12, 0))
+        expected = list(Meal.objects.filter(user=self.user).order_by('-date', '-time', '-id')
+                        .values_list('id', flat=True))
+
+        ids, _ = self._walk('/meals/?page_size=4')
+
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor_is_404(self):
+        resp = self.client.get('/workouts/logs/?cursor=not-a-cursor')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
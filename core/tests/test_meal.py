@@ -1,5 +1,6 @@
 from datetime import date, timedelta, time
 
+from django.test import override_settings
 from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
@@ -7,6 +8,7 @@ from rest_framework.test import APITestCase
 
 from core.models import User
 from core.models.meal import Meal, IngredientEntry
+from core.services import food_index
 
 from unittest.mock import patch
 
@@ -16,6 +18,9 @@ class MealTests(APITestCase):
         # create a user
         self.user = User.objects.create_user(email='mealtest@example.com', password='pass1234')
         self.client.force_authenticate(user=self.user)
+        # FoodItem writes only bump the catalog version on commit, which never comes in a TestCase
+        food_index.reset()
+        self.addCleanup(food_index.reset)
 
     def test_search_food_returns_list(self):
         # create FoodItems in DB
@@ -66,6 +71,42 @@ class MealTests(APITestCase):
             self.assertIn('Açúcar BR', names)
             self.assertNotIn('Sugar US', names)
 
+    def test_fooditem_search_name_is_normalized_on_save(self):
+        from core.models.fooditem import FoodItem
+
+        fi = FoodItem.objects.create(name='Zzfeijão, carioca, cozido')
+        self.assertEqual(fi.search_name, 'zzfeijao carioca cozido')
+
+        fi.name = 'Zzpão, trigo, francês'
+        fi.save(update_fields=['name'])
+        fi.refresh_from_db()
+        self.assertEqual(fi.search_name, 'zzpao trigo frances')
+
+    @override_settings(FOOD_SEARCH_INDEX=False)
+    def test_search_food_database_path_ignores_accents(self):
+        from core.models.fooditem import FoodItem
+
+        FoodItem.objects.create(name='Açúcar BR', calories=400.0, country='Brasil', languages='pt')
+
+        resp = self.client.get('/meals/search-food/?q=acucar')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('Açúcar BR', [item.get('name') for item in resp.data])
+
+    def test_create_meal_resolves_unaccented_food_name(self):
+        from core.models.fooditem import FoodItem
+
+        FoodItem.objects.create(name='Zzfeijão, teste', calories=80.0, protein=5.0, carbs=13.0, fat=0.5)
+
+        payload = {
+            'title': 'Almoço',
+            'date': str(timezone.localdate()),
+            'time': '12:00:00',
+            'ingredients': [{'food_name': 'zzfeijao', 'weight_grams': 200}],
+        }
+        resp = self.client.post('/meals/', payload, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, resp.data)
+        self.assertAlmostEqual(resp.data['total_calories'], 160.0)
+
     def test_create_meal_creates_entries_and_links_user(self):
         # Create two food items in DB with predictable nutrients
         from core.models.fooditem import FoodItem
@@ -98,6 +139,102 @@ class MealTests(APITestCase):
         self.assertAlmostEqual(meal.total_calories, 100.0)
         self.assertAlmostEqual(meal.total_protein, 2.0)
 
+    def test_create_meal_query_count_is_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from core.models.fooditem import FoodItem
+
+        foods = [FoodItem.objects.create(name=f'Zzbatch food {i}', calories=10.0 * i) for i in range(15)]
+
+        def post(ingredients, day):
+            payload = {'title': 'Batch', 'date': str(day), 'time': '10:00:00', 'ingredients': ingredients}
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.post('/meals/', payload, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_201_CREATED, resp.data)
+            return resp, len(ctx.captured_queries)
+
+        _, few = post([{'food_name': str(foods[0].id), 'weight_grams': 100}], date(2025, 1, 1))
+        ingredients = [{'food_name': str(fi.id), 'weight_grams': 100} for fi in foods[:10]]
+        ingredients += [{'food_name': f'zzbatch food {i}', 'weight_grams': 50} for i in range(10, 15)]
+        resp, many = post(ingredients, date(2025, 1, 2))
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(resp.data['ingredients']), 15)
+        self.assertAlmostEqual(resp.data['total_calories'], sum(10.0 * i for i in range(10)) + sum(5.0 * i for i in range(10, 15)))
+
+    def test_create_meal_links_food_and_recomputes_from_catalog(self):
+        from core.models.fooditem import FoodItem
+        from core.services import meal_totals
+
+        fi = FoodItem.objects.create(name='Zzaveia, flocos', calories=400.0, protein=14.0, carbs=66.0, fat=8.0)
+        payload = {
+            'title': 'Lanche',
+            'date': str(timezone.localdate()),
+            'time': '16:00:00',
+            'ingredients': [
+                {'food_name': 'zzaveia', 'weight_grams': 50},
+                {'food_name': 'nao existe no catalogo', 'weight_grams': 30},
+            ],
+        }
+        resp = self.client.post('/meals/', payload, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, resp.data)
+        self.assertEqual([i['food_id'] for i in resp.data['ingredients']], [fi.id, None])
+
+        entry = IngredientEntry.objects.get(food=fi)
+        self.assertAlmostEqual(entry.calories_per_gram, 4.0)
+        self.assertAlmostEqual(entry.protein_per_gram, 0.14)
+
+        fi.calories = 380.0
+        fi.save()
+        self.assertEqual(meal_totals.recompute_from_catalog([fi.id]), 1)
+
+        entry.refresh_from_db()
+        self.assertAlmostEqual(entry.calories, 190.0)
+        self.assertAlmostEqual(Meal.objects.get(pk=resp.data['id']).total_calories, 190.0)
+
+    def test_vectorized_recompute_matches_matrix_totals(self):
+        from core.models.fooditem import FoodItem
+        from core.services import meal_totals
+        from core.services.nutrient_matrix import NutrientMatrix, as_dicts
+
+        arroz = FoodItem.objects.create(name='Zzarroz', calories=130.0, protein=2.5, carbs=28.0, fat=0.2)
+        feijao = FoodItem.objects.create(name='Zzfeijao', calories=76.0, protein=4.8, carbs=13.6, fat=0.5)
+        matrix = NutrientMatrix([arroz, feijao])
+        totals = as_dicts([matrix.totals([(arroz.pk, 150), (feijao.pk, 100), (None, 40)])])[0]
+        self.assertEqual(totals, {'calories': 271.0, 'protein': 8.55, 'carbs': 55.6, 'fat': 0.8})
+
+        resp = self.client.post('/meals/', {
+            'title': 'Almoço', 'date': '2025-03-10', 'time': '12:00:00',
+            'ingredients': [{'food_name': 'zzarroz', 'weight_grams': 150}, {'food_name': 'zzfeijao', 'weight_grams': 100}],
+        }, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, resp.data)
+        self.assertAlmostEqual(resp.data['total_calories'], 271.0)
+
+        arroz.calories = 120.0
+        arroz.save()
+        self.assertEqual(meal_totals.recompute_vectorized(), 1)
+        meal = Meal.objects.get(pk=resp.data['id'])
+        self.assertAlmostEqual(meal.total_calories, 256.0)
+        self.assertAlmostEqual(meal.ingredients.get(food=arroz).calories_per_gram, 1.2)
+
+    def test_weightless_food_gets_the_same_result_on_both_paths(self):
+        from core.models.fooditem import FoodItem
+        from core.services import meal_totals
+
+        fi = FoodItem.objects.create(name='Zzsem peso', calories=100.0, weight_grams=0)
+        meal = Meal.objects.create(user=self.user, title='Teste', date=date(2025, 3, 12), time=time(12, 0))
+        entry = IngredientEntry.objects.create(meal=meal, food=fi, food_name=fi.name, weight_grams=50)
+
+        meal_totals.recompute_from_catalog([fi.id])
+        entry.refresh_from_db()
+        via_sql = (entry.calories, entry.calories_per_gram)
+
+        meal_totals.recompute_vectorized([fi.id])
+        entry.refresh_from_db()
+        self.assertEqual((entry.calories, entry.calories_per_gram), via_sql)
+        self.assertEqual(via_sql, (0.0, None))
+
     def test_list_by_date_and_delete(self):
         # create a meal for this user and another user
         today = timezone.localdate()
@@ -140,3 +277,81 @@ class MealTests(APITestCase):
         # Check week_totals sums
         totals = resp.data['week_totals']
         self.assertAlmostEqual(totals['calories'], 350)
+
+    def test_summary_groups_by_bucket_and_zero_fills(self):
+        Meal.objects.create(user=self.user, title='A', date=date(2025, 1, 6), time=time(8, 0), total_calories=100, total_protein=5)
+        Meal.objects.create(user=self.user, title='B', date=date(2025, 1, 6), time=time(12, 0), total_calories=200, total_protein=10)
+        Meal.objects.create(user=self.user, title='C', date=date(2025, 2, 3), time=time(12, 0), total_calories=50, total_protein=1)
+        other = User.objects.create_user(email='summaryother@example.com', password='pass1234')
+        Meal.objects.create(user=other, title='X', date=date(2025, 1, 6), time=time(8, 0), total_calories=999)
+
+        resp = self.client.get('/meals/summary/?start=2025-01-06&end=2025-01-08')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, resp.data)
+        self.assertEqual(list(resp.data['buckets']), ['2025-01-06', '2025-01-07', '2025-01-08'])
+        self.assertAlmostEqual(resp.data['buckets']['2025-01-06']['calories'], 300)
+        self.assertAlmostEqual(resp.data['buckets']['2025-01-07']['calories'], 0)
+
+        resp = self.client.get('/meals/summary/?start=2025-01-01&end=2025-03-31&bucket=month')
+        self.assertEqual(list(resp.data['buckets']), ['2025-01-01', '2025-02-01', '2025-03-01'])
+        self.assertAlmostEqual(resp.data['buckets']['2025-02-01']['calories'], 50)
+        self.assertAlmostEqual(resp.data['totals']['protein'], 16)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/meals/summary/?start=2024-12-30&end=2025-02-09&bucket=week')
+        self.assertEqual(len(resp.data['buckets']), 6)
+        self.assertAlmostEqual(resp.data['buckets']['2025-01-06']['calories'], 300)
+        self.assertAlmostEqual(resp.data['buckets']['2025-02-03']['calories'], 50)
+
+    def test_daily_totals_follow_meal_create_and_delete(self):
+        from core.models.daily_nutrition_totals import DailyNutritionTotals
+        from core.services import daily_totals
+
+        day = date(2025, 3, 10)
+        m1 = Meal.objects.create(user=self.user, title='A', date=day, time=time(8, 0), total_calories=100, total_fat=3)
+        Meal.objects.create(user=self.user, title='B', date=day, time=time(12, 0), total_calories=250, total_fat=7)
+
+        row = DailyNutritionTotals.objects.get(user=self.user, date=day)
+        self.assertEqual(row.meal_count, 2)
+        self.assertAlmostEqual(row.calories, 350)
+
+        resp = self.client.delete(f'/meals/{m1.id}/')
+        self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+        row.refresh_from_db()
+        self.assertEqual(row.meal_count, 1)
+        self.assertAlmostEqual(row.fat, 7)
+
+        DailyNutritionTotals.objects.all().delete()
+        self.assertEqual(daily_totals.rebuild(user_ids=[self.user.id]), 1)
+        self.assertAlmostEqual(DailyNutritionTotals.objects.get(user=self.user, date=day).calories, 250)
+
+    def test_daily_totals_roll_back_with_the_meal(self):
+        from django.db import transaction
+        from core.models.daily_nutrition_totals import DailyNutritionTotals
+
+        day = date(2025, 3, 11)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Meal.objects.create(user=self.user, title='A', date=day, time=time(8, 0), total_calories=100)
+            # written by the signal in the same transaction, no commit needed
+            self.assertEqual(DailyNutritionTotals.objects.get(user=self.user, date=day).calories, 100)
+            raise RuntimeError
+
+        self.assertFalse(DailyNutritionTotals.objects.filter(user=self.user, date=day).exists())
+
+    def test_summary_validates_range(self):
+        resp = self.client.get('/meals/summary/?start=2025-02-01&end=2025-01-01')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = self.client.get('/meals/summary/?start=2020-01-01&end=2025-01-01&bucket=day')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # huge ranges are rejected before any bucket is built
+        resp = self.client.get('/meals/summary/?start=0001-01-01&end=9999-12-31')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_summary_up_to_the_last_representable_day(self):
+        last = {}
+        for bucket, start in (('day', '9999-12-01'), ('week', '9999-11-01'), ('month', '9999-01-01')):
+            resp = self.client.get(f'/meals/summary/?start={start}&end=9999-12-31&bucket={bucket}')
+            self.assertEqual(resp.status_code, status.HTTP_200_OK, bucket)
+            last[bucket] = max(resp.data['buckets'])
+        self.assertEqual(last, {'day': '9999-12-31', 'week': '9999-12-27', 'month': '9999-12-01'})
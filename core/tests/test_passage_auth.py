@@ -0,0 +1,71 @@
+import base64
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, RequestFactory, override_settings
+from core import authentication
+from core.models import User
+
+
+def _token(exp, sub='psg-1'):
+    def part(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+    return f"{part({'alg': 'RS256'})}.{part({'sub': sub, 'exp': exp})}.signature"
+
+
+class PassageTokenCacheTests(TestCase):
+    def setUp(self):
+        authentication.verified_tokens.clear()
+        self.addCleanup(authentication.verified_tokens.clear)
+        self.user = User.objects.create_user(email='passage@example.com', password='pass1234', passage_id='psg-1')
+        self.psg = SimpleNamespace(auth=MagicMock(), user=MagicMock())
+        self.psg.auth.validate_jwt.return_value = 'psg-1'
+        patcher = patch.object(authentication, 'psg', self.psg)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _authenticate(self, token):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return authentication.TokenAuthentication().authenticate(request)
+
+    def test_repeat_requests_skip_signature_validation(self):
+        token = _token(time.time() + 3600)
+
+        first, _ = self._authenticate(token)
+        with self.assertNumQueries(1):  # user lookup only
+            second, _ = self._authenticate(token)
+
+        self.assertEqual(first.pk, self.user.pk)
+        self.assertEqual(second.pk, self.user.pk)
+        self.assertEqual(self.psg.auth.validate_jwt.call_count, 1)
+
+    @override_settings(PASSAGE_TOKEN_CACHE_USER=True)
+    def test_user_can_come_from_the_cache_too(self):
+        token = _token(time.time() + 3600)
+        self._authenticate(token)
+
+        with self.assertNumQueries(0):
+            user, _ = self._authenticate(token)
+
+        self.assertEqual(user.email, 'passage@example.com')
+
+    def test_entries_do_not_outlive_the_token(self):
+        token = _token(time.time() + 60)
+        self._authenticate(token)
+
+        with patch('core.authentication.time.time', return_value=time.time() + 61):
+            self._authenticate(token)
+
+        self.assertEqual(self.psg.auth.validate_jwt.call_count, 2)
+
+    @override_settings(PASSAGE_TOKEN_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        tokens = [_token(time.time() + 3600 + i) for i in range(3)]
+        for token in tokens:
+            self._authenticate(token)
+
+        self._authenticate(tokens[0])  # evicted: validated again
+
+        self.assertEqual(self.psg.auth.validate_jwt.call_count, 4)
@@ -0,0 +1,61 @@
+import re
+import unittest
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from app.pagination import ChatMessagePagination, MealPagination, WorkoutLogPagination
+from core.models import User, IngestaoAgua, RelatorioProgresso
+from core.models.chat import ChatMessage, ChatSession
+from core.models.meal import Meal
+from core.models.workout_log import WorkoutLog
+
+# a full table (or full index) scan, or a sort the index could not provide
+BAD_PLAN = re.compile(r'\bSCAN\b|TEMP B-TREE')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'plans are asserted on the SQLite planner output')
+class HotQueryPlanTests(TestCase):
+    """Cada consulta quente (por usuário, ordenada por tempo) precisa ser resolvida por um índice composto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='plans@example.com', password='pass1234')
+        cls.session = ChatSession.objects.create(user=cls.user, title='Plano')
+
+    def assertIndexedPlan(self, queryset):
+        plan = queryset.explain()
+        self.assertIsNone(BAD_PLAN.search(plan), f'{queryset.model.__name__} query is not index-backed:\n{plan}')
+
+    def _after_cursor(self, pagination_class, queryset, values):
+        pagination = pagination_class()
+        fields = pagination._fields(queryset.model)
+        return queryset.order_by(*pagination.ordering).filter(pagination._after(fields, values))
+
+    def test_meals_by_user_and_day(self):
+        meals = Meal.objects.filter(user=self.user)
+        self.assertIndexedPlan(meals.filter(date=date(2025, 1, 1)).order_by('-date', '-time'))
+        self.assertIndexedPlan(meals.order_by(*MealPagination.ordering))
+        self.assertIndexedPlan(self._after_cursor(MealPagination, meals, [date(2025, 1, 1), timezone.now().time(), 1]))
+
+    def test_workout_logs_newest_first(self):
+        logs = WorkoutLog.objects.filter(user=self.user)
+        self.assertIndexedPlan(logs.order_by('-finished_at'))
+        self.assertIndexedPlan(self._after_cursor(WorkoutLogPagination, logs, [timezone.now(), '0' * 32]))
+
+    def test_chat_sessions_by_activity(self):
+        sessions = ChatSession.objects.filter(user=self.user)
+        self.assertIndexedPlan(sessions.order_by('-updated_at'))
+        self.assertIndexedPlan(sessions.with_last_message().order_by('-updated_at', '-id'))
+
+    def test_chat_messages_of_a_session(self):
+        messages = ChatMessage.objects.filter(session=self.session)
+        self.assertIndexedPlan(messages.order_by('created_at'))
+        self.assertIndexedPlan(self._after_cursor(ChatMessagePagination, messages, [timezone.now(), 1]))
+        self.assertIndexedPlan(messages.filter(id__gt=0).order_by('-id'))  # context window
+
+    def test_water_intake_and_progress_reports_by_day(self):
+        self.assertIndexedPlan(IngestaoAgua.objects.filter(usuario=self.user, data=date(2025, 1, 1)).order_by('horario'))
+        self.assertIndexedPlan(IngestaoAgua.objects.filter(usuario=self.user).order_by('-data', '-horario'))
+        self.assertIndexedPlan(RelatorioProgresso.objects.filter(usuario=self.user).order_by('-data'))
@@ -41,13 +41,13 @@ class WorkoutLogAPITests(TestCase):
         # list logs for user2 (only 1)
         res2 = self.client.get('/workouts/logs/')
         self.assertEqual(res2.status_code, 200)
-        self.assertEqual(len(res2.json()), 1)
+        self.assertEqual(len(res2.json()['results']), 1)
 
         # list logs for user1
         self.client.force_authenticate(self.user)
         res1 = self.client.get('/workouts/logs/')
         self.assertEqual(res1.status_code, 200)
-        self.assertEqual(len(res1.json()), 1)
+        self.assertEqual(len(res1.json()['results']), 1)
 
     def test_validation_errors(self):
         self.client.force_authenticate(self.user)
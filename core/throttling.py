@@ -0,0 +1,129 @@
+"""
+Limites de uso dos endpoints do chat (cada requisição custa uma chamada ao modelo).
+
+Cada cliente tem um balde de fichas: cabem N fichas, cada requisição gasta uma
+e elas voltam continuamente à taxa de N por período (rajadas de até N, média de
+N por período). Visitantes são contados por IP (CHAT_THROTTLE_RATES['chat_anon'])
+e usuários logados pelo id (CHAT_THROTTLE_RATES['chat_user']). Sem ficha a
+resposta é 429 com Retry-After (segundos até a próxima ficha).
+
+O estado fica no cache 'throttle' (settings.CACHES), compartilhado entre os
+workers: o Redis quando REDIS_URL está definido, senão (fora do DEBUG) uma
+tabela do banco. O IP do visitante é o REMOTE_ADDR, ou o X-Forwarded-For
+deixado pelos REST_FRAMEWORK['NUM_PROXIES'] proxies confiáveis.
+"""
+import math
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+CACHE_ALIAS = 'throttle'
+LOCK_ATTEMPTS = 5
+LOCK_SLEEP = 0.01
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def reset():
+    """Esvazia os baldes (e o contador global de chamadas ao modelo)."""
+    _cache().clear()
+
+
+def client_ident(request) -> str:
+    """IP do cliente como os limites o enxergam (respeita REST_FRAMEWORK['NUM_PROXIES'])."""
+    return BaseThrottle().get_ident(request)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle com balde de fichas em vez da janela com histórico de requisições."""
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        self.cache = _cache()
+        self._wait = None
+        super().__init__()
+
+    def get_rate(self):
+        # read at request time so override_settings / env changes apply
+        return getattr(settings, 'CHAT_THROTTLE_RATES', {}).get(self.scope)
+
+    def key_for(self, user, request) -> Optional[str]:
+        """Balde de `user` (pelo id) ou, para visitantes, do IP; None = requisição fora deste limite."""
+        ident = user.pk if user is not None else self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def get_cache_key(self, request, view):
+        user = request.user if request.user and request.user.is_authenticated else None
+        return self.key_for(user, request)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self.take(self.key)
+
+    def take(self, key: str) -> bool:
+        """Gasta uma ficha do balde `key`; False (e wait()) quando está vazio."""
+        lock = f'{key}:lock'
+        locked = False
+        for _ in range(LOCK_ATTEMPTS):
+            # short mutex so concurrent workers don't both spend the last token
+            locked = self.cache.add(lock, 1, timeout=1)
+            if locked:
+                break
+            time.sleep(LOCK_SLEEP)
+        try:
+            now = self.timer()
+            capacity, refill = self.num_requests, self.num_requests / self.duration
+            tokens, stamp = self.cache.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self._wait = (1 - tokens) / refill
+            # a bucket left alone for a whole period is full again, same as a missing key
+            self.cache.set(key, (tokens, now), self.duration)
+            return allowed
+        finally:
+            if locked:
+                self.cache.delete(lock)
+
+    def wait(self):
+        return self._wait
+
+
+class ChatAnonThrottle(TokenBucketThrottle):
+    scope = 'chat_anon'
+
+    def key_for(self, user, request):
+        return super().key_for(user, request) if user is None else None
+
+
+class ChatUserThrottle(TokenBucketThrottle):
+    scope = 'chat_user'
+
+    def key_for(self, user, request):
+        return super().key_for(user, request) if user is not None else None
+
+
+CHAT_THROTTLES = [ChatAnonThrottle, ChatUserThrottle]
+
+
+def chat_throttle_wait(request, user) -> Optional[int]:
+    """Para views fora do DRF: segundos de Retry-After se `user`/IP estourou o limite, senão None."""
+    for throttle_class in CHAT_THROTTLES:
+        throttle = throttle_class()
+        if throttle.rate is None:
+            continue
+        key = throttle.key_for(user, request)
+        if key is not None and not throttle.take(key):
+            return math.ceil(throttle.wait())
+    return None
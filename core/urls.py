@@ -5,6 +5,7 @@ from core.views.meal import (
     MealListCreateView,
     MealDetailView,
     WeeklySummaryView,
+    NutritionSummaryView,
 )
 from core.views.fooditem import FoodItemViewSet
 from core.views.workout_log import LogWorkoutAPIView, ListWorkoutLogsAPIView
@@ -19,6 +20,7 @@ urlpatterns = [
     path('meals/', MealListCreateView.as_view(), name='meals-list-create'),
     path('meals/<int:pk>/', MealDetailView.as_view(), name='meals-detail'),
     path('meals/weekly-summary/', WeeklySummaryView.as_view(), name='meals-weekly-summary'),
+    path('meals/summary/', NutritionSummaryView.as_view(), name='meals-summary'),
     # Workout logs
     path('workouts/log/', LogWorkoutAPIView.as_view(), name='workout-log-create'),
     path('workouts/logs/', ListWorkoutLogsAPIView.as_view(), name='workout-log-list'),
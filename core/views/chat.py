@@ -1,213 +1,300 @@
-from django.conf import settings
-try:
-    from huggingface_hub import InferenceClient
-except ImportError:
-    InferenceClient = None
+import json
+import logging
 
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from core.models.chat import ChatMessage, ChatSession
-from core.serializers.chat import ChatMessageSerializer
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from app.pagination import ChatMessagePagination, CustomPagination
+from core.models.chat import ChatJob, ChatSession
+from core.serializers.chat import ChatJobSerializer, ChatMessageSerializer
 from core.serializers.session import ChatSessionSerializer
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from core.authentication import TokenAuthentication as PassageTokenAuthentication
-import logging
+from core.services import chat as chat_service
+from core.services import chat_backend, chat_cache, chat_context, chat_jobs
+from rest_framework.authentication import SessionAuthentication
+from core.authentication import OptionalAuthentication
+from core.throttling import CHAT_THROTTLES, chat_throttle_wait, client_ident
 
 logger = logging.getLogger(__name__)
 
+# retry hint sent with 503 when the model pool is saturated
+RETRY_AFTER_SECONDS = 1
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Permite negociar `Accept: text/event-stream`; respostas de erro viram um evento `error`."""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data).encode(self.charset)
+
+
+def sse_event(event, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def backend_error(exc):
+    """(payload, status, headers) para as falhas conhecidas do backend de chat; None para as demais."""
+    if isinstance(exc, chat_backend.BackendUnavailable):
+        return {"error": str(exc)}, 501, {}
+    if isinstance(exc, chat_backend.BackendSaturated):
+        return {"error": str(exc)}, 503, {'Retry-After': str(RETRY_AFTER_SECONDS)}
+    if isinstance(exc, chat_backend.BackendTimeout):
+        return {"error": str(exc)}, 504, {}
+    return None
+
+
 class ChatAPIView(APIView):
     """
     Chatbot de personal trainer e nutricionista virtual.
-    Funciona para usuários logados ou visitantes.
+    Funciona para usuários logados ou visitantes (com limites por IP e por usuário).
     """
+    # the Authorization header is checked once, by DRF; no header means guest, a bad token 401
+    authentication_classes = [OptionalAuthentication, SessionAuthentication]
     permission_classes = [AllowAny]
+    throttle_classes = CHAT_THROTTLES
+
+    def _resolve_user(self, request):
+        return request.user if request.user.is_authenticated else None
+
+    def _error_response(self, exc, view_name):
+        known = backend_error(exc)
+        if known:
+            payload, code, headers = known
+            return Response(payload, status=code, headers=headers)
+        logger.error(f"Error in {view_name}: {str(exc)}")
+        return Response({"error": str(exc)}, status=500)
 
     def post(self, request):
         user_message = request.data.get("message", "").strip()
         if not user_message:
             return Response({"error": "Mensagem vazia"}, status=400)
 
-        # Pegando o usuário logado
-        user = request.user if request.user.is_authenticated else None
-        user = request.user if getattr(request, 'user', None) and request.user.is_authenticated else None
-        
-        if user is None:
+        user = self._resolve_user(request)
+
+        try:
+            session = chat_service.find_session(user, request.data.get('session_id'))
+            reply_text = chat_cache.complete(*chat_context.prompt(user_message, user, session))
+
+            # Salva mensagens no banco
+            session = chat_service.save_exchange(user, session, user_message, reply_text)
+
+            data = chat_service.parse_reply(reply_text)
+            if session:
+                data['session_id'] = session.id
+            return Response(data)
+
+        except Exception as e:
+            return self._error_response(e, 'ChatAPIView')
+
+
+class _EventStream:
+    """Conteúdo do StreamingHttpResponse: fecha também o stream do modelo (liberando a vaga do pool)
+    quando a resposta é fechada, mesmo que o cliente desconecte antes do primeiro evento."""
+
+    def __init__(self, events, tokens):
+        self._events = events
+        self._tokens = tokens
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        self._events.close()
+        self._tokens.close()
+
+
+class ChatStreamAPIView(ChatAPIView):
+    """
+    Variante em streaming do chat (Server-Sent Events).
+
+    Envia um evento `token` para cada trecho gerado pelo modelo e, ao final, um
+    evento `done` com o JSON {treino, dieta} interpretado e o `session_id`. As
+    mensagens só são gravadas quando o stream termina; falhas do modelo no meio
+    do stream viram um evento `error` e nada é gravado.
+    """
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def post(self, request):
+        user_message = request.data.get("message", "").strip()
+        if not user_message:
+            return Response({"error": "Mensagem vazia"}, status=400)
+
+        user = self._resolve_user(request)
+        session = chat_service.find_session(user, request.data.get('session_id'))
+
+        try:
+            # reserves a pool slot now, so saturation is a plain 503 instead of a broken stream
+            tokens = chat_cache.stream(*chat_context.prompt(user_message, user, session))
+        except Exception as e:
+            return self._error_response(e, 'ChatStreamAPIView')
+
+        response = StreamingHttpResponse(
+            _EventStream(self._stream(user, session, user_message, tokens), tokens),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx: não bufferizar o stream
+        return response
+
+    def _stream(self, user, session, user_message, tokens):
+        parts = []
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield sse_event('token', {'content': token})
+
+            reply_text = ''.join(parts)
+            session = chat_service.save_exchange(user, session, user_message, reply_text)
+        except Exception as e:
+            logger.error(f"Error in ChatStreamAPIView: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+            return
+        finally:
+            tokens.close()
+
+        data = chat_service.parse_reply(reply_text)
+        if session:
+            data['session_id'] = session.id
+        yield sse_event('done', data)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatView(View):
+    """
+    Mesmo contrato de ChatAPIView, mas assíncrono (servido pelo stack ASGI).
+
+    A chamada ao modelo usa o backend assíncrono e as gravações usam o ORM
+    assíncrono, então um worker ASGI mantém muitas conversas em andamento ao
+    mesmo tempo em vez de bloquear uma thread por requisição.
+    """
+    http_method_names = ['post', 'options']
+
+    async def post(self, request):
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({"error": "JSON inválido"}, status=400)
+
+        user_message = str(payload.get("message", "")).strip()
+        if not user_message:
+            return JsonResponse({"error": "Mensagem vazia"}, status=400)
+
+        user = await request.auser()
+        if user.is_authenticated:
+            # csrf_exempt only lets header-authenticated clients in; a session cookie needs the
+            # same CSRF check DRF's SessionAuthentication makes on /api/chat/
             try:
-                jwt_auth = JWTAuthentication()
-                jwt_result = jwt_auth.authenticate(request)
-                if jwt_result:
-                    user, token = jwt_result
-                    logger.debug('Authenticated user via JWT in ChatAPIView: %s', getattr(user, 'email', None))
-            except Exception:
-                pass
-
-        if user is None:
+                SessionAuthentication().enforce_csrf(request)
+            except PermissionDenied as e:
+                return JsonResponse({"detail": str(e.detail)}, status=403)
+        else:
             try:
-                passage_auth = PassageTokenAuthentication()
-                passage_result = passage_auth.authenticate(request)
-                if passage_result:
-                    user, _ = passage_result
-                    logger.debug('Authenticated user via Passage token in ChatAPIView: %s', getattr(user, 'email', None))
-            except Exception:
-                pass
-
-        # Monta os dados do usuário se logado
-        user_data = {}
-        if user:
-            user_data = {
-                "Nome": getattr(user, "name", "Não informado"),
-                "Peso": getattr(user, "peso_kg", "Não informado"),
-                "Altura": getattr(user, "altura_cm", "Não informado"),
-                "Objetivo": getattr(user, "objetivo", "Não informado"),
-                "Meta_peso": getattr(user, "meta_peso", "Não informado"),
-                "Dias_treino": getattr(user, "dias_treino", "Não informado"),
-                "Grupo_foco": getattr(user, "grupo_foco", "Não informado"),
-            }
-
-        user_data_str = ", ".join(f"{k}: {v}" for k, v in user_data.items() if v and v != "Não informado")
-
-        # Detectar intenção ANTES do prompt
-        message_lower = user_message.lower()
-        
-        treino_keywords = ['treino', 'exercicio', 'exercício', 'musculação', 'academia', 'workout', 'malhar']
-        dieta_keywords = ['dieta', 'alimentação', 'alimentacao', 'comida', 'comer', 'refeição', 'refeicao', 'nutricao', 'nutrição', 'cardápio']
-        
-        solicita_treino = any(keyword in message_lower for keyword in treino_keywords)
-        solicita_dieta = any(keyword in message_lower for keyword in dieta_keywords)
-
-        # Prompt SUPER SIMPLES
-        if solicita_treino and not solicita_dieta:
-            # SÓ TREINO
-            system_prompt = f"""Você é personal trainer. Crie um plano de treino em português brasileiro.
-
-Dados: {user_data_str}
-
-Responda apenas no formato JSON:
-{{"treino": "seu plano de treino aqui", "dieta": ""}}
-
-Plano de treino:
-- Segunda: Liste exercícios com séries e repetições
-- Quarta: Liste exercícios com séries e repetições  
-- Sexta: Liste exercícios com séries e repetições
-
-Seja motivador e use os dados fornecidos."""
-
-        elif solicita_dieta and not solicita_treino:
-            # SÓ DIETA
-            system_prompt = f"""Você é nutricionista. Crie um plano alimentar em português brasileiro.
-
-Dados: {user_data_str}
-
-Responda apenas no formato JSON:
-{{"treino": "", "dieta": "seu plano alimentar aqui"}}
-
-Plano alimentar:
-- Café da manhã: alimentos e calorias
-- Almoço: alimentos e calorias
-- Jantar: alimentos e calorias
-- Lanches: alimentos e calorias
-
-Seja motivador e use os dados fornecidos."""
-
-        elif solicita_treino and solicita_dieta:
-            # AMBOS
-            system_prompt = f"""Você é personal trainer e nutricionista. Crie treino E dieta em português brasileiro.
-
-Dados: {user_data_str}
-
-Responda apenas no formato JSON:
-{{"treino": "plano de treino", "dieta": "plano alimentar"}}
-
-Seja breve, motivador e use os dados fornecidos."""
+                result = await sync_to_async(OptionalAuthentication().authenticate)(request)
+            except AuthenticationFailed as e:
+                return JsonResponse({"detail": str(e.detail)}, status=401, headers={'WWW-Authenticate': 'Bearer'})
+            user = result[0] if result else None
 
-        else:
-            # CONVERSA
-            system_prompt = f"""Você é FitAI, assistente fitness amigável.
+        retry_after = await sync_to_async(chat_throttle_wait)(request, user)
+        if retry_after is not None:
+            return JsonResponse({"error": "Muitas requisições, tente novamente em instantes."}, status=429,
+                                headers={'Retry-After': str(retry_after)})
+
+        try:
+            session = await chat_service.afind_session(user, payload.get('session_id'))
+            reply_text = await chat_cache.acomplete(*await sync_to_async(chat_context.prompt)(user_message, user, session))
 
-Dados do usuário: {user_data_str if user_data_str else "Sem dados"}
+            session = await chat_service.asave_exchange(user, session, user_message, reply_text)
 
-Responda brevemente e com simpatia em português brasileiro.
+            data = chat_service.parse_reply(reply_text)
+            if session:
+                data['session_id'] = session.id
+            return JsonResponse(data)
+
+        except Exception as e:
+            known = backend_error(e)
+            if known:
+                payload, code, headers = known
+                return JsonResponse(payload, status=code, headers=headers)
+            logger.error(f"Error in AsyncChatView: {str(e)}")
+            return JsonResponse({"error": str(e)}, status=500)
 
-Formato JSON:
-{{"treino": "", "dieta": "sua resposta amigável aqui"}}
 
-Seja simpática e pergunte como pode ajudar."""
+class ChatJobListAPIView(ChatAPIView):
+    """
+    Chat em segundo plano: responde 202 com o id do job, sem esperar o modelo.
+
+    Um header `Idempotency-Key` repetido devolve (200) o mesmo job em vez de
+    criar outro, então o retry de um cliente não gera nova chamada ao modelo.
+    """
 
+    def post(self, request):
+        user_message = request.data.get("message", "").strip()
+        if not user_message:
+            return Response({"error": "Mensagem vazia"}, status=400)
+
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if len(key) > chat_jobs.MAX_KEY_LENGTH:
+            return Response({"error": "Idempotency-Key muito longa"}, status=400)
+
+        user = self._resolve_user(request)
         try:
-            if InferenceClient is None:
-                return Response(
-                    {"error": "Hugging Face client não disponível."},
-                    status=501
-                )
-
-            client = InferenceClient(
-                model=settings.HF_MODEL,
-                token=settings.HF_TOKEN
+            job, created = chat_jobs.enqueue(
+                user, user_message, request.data.get('session_id'),
+                idempotency_key=chat_jobs.scoped_key(key, user, client_ident(request)),
             )
+        except chat_jobs.IdempotencyConflict as e:
+            return Response({"error": str(e)}, status=422)
 
-            resposta = client.chat_completion(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=1500,  # Reduzido para evitar bugs
-                temperature=0.4,  # Bem conservador
-                top_p=0.7,
-            )
+        headers = {'Location': reverse('chat-job-detail', args=[job.pk])}
+        if not created:
+            headers['Idempotent-Replayed'] = 'true'
+        return Response(ChatJobSerializer(job).data, status=202 if created else 200, headers=headers)
 
-            reply_text = resposta.choices[0].message["content"]
 
-            # Salva mensagens no banco
-            session = None
-            if user:
-                session_id = request.data.get('session_id')
-                if session_id:
-                    try:
-                        s = ChatSession.objects.get(pk=session_id, user=user)
-                        session = s
-                    except ChatSession.DoesNotExist:
-                        session = None
-                
-                if session is None:
-                    title = (user_message[:60] + '...') if len(user_message) > 60 else user_message
-                    session = ChatSession.objects.create(user=user, title=title)
-
-                ChatMessage.objects.create(user=user, role="user", content=user_message, session=session)
-                ChatMessage.objects.create(user=user, role="assistant", content=reply_text, session=session)
-
-            # Tenta converter em JSON
-            import json
-            try:
-                reply_json = json.loads(reply_text)
-                data = reply_json
-                if session:
-                    data['session_id'] = session.id
-                return Response(data)
-            except json.JSONDecodeError:
-                # Tenta extrair JSON
-                import re
-                json_match = re.search(r'\{.*?\}', reply_text, re.DOTALL)
-                if json_match:
-                    try:
-                        reply_json = json.loads(json_match.group(0))
-                        data = reply_json
-                        if session:
-                            data['session_id'] = session.id
-                        return Response(data)
-                    except:
-                        pass
-                
-                # Fallback
-                data = {"treino": "", "dieta": reply_text}
-                if session:
-                    data['session_id'] = session.id
-                return Response(data)
+class ChatJobDetailAPIView(ChatAPIView):
+    """
+    Estado de um job de chat; `?wait=N` segura a resposta até N segundos
+    (limitado a CHAT_JOB_MAX_WAIT) ou até o job terminar (long-polling).
+    """
 
-        except Exception as e:
-            logger.error(f"Error in ChatAPIView: {str(e)}")
-            return Response({"error": str(e)}, status=500)
+    throttle_classes = []  # polling doesn't reach the model
+
+    def get(self, request, job_id):
+        user = self._resolve_user(request)
+        try:
+            job = ChatJob.objects.get(pk=job_id)
+        except ChatJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        # visitors' jobs are reachable by id only; users' jobs only by their owner
+        if job.user_id is not None and (user is None or user.pk != job.user_id):
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            wait = 0
+        if wait > 0:
+            job = chat_jobs.wait(job, wait)
+        return Response(ChatJobSerializer(job).data)
+
+
+class ChatBackendMetricsAPIView(APIView):
+    """Métricas do pool do modelo neste processo (latência, fila, rejeições) e do cache de respostas."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({**chat_backend.metrics(), 'cache': chat_cache.stats()})
 
 
 class ChatSessionListAPIView(APIView):
@@ -215,9 +302,11 @@ class ChatSessionListAPIView(APIView):
 
     def get(self, request):
         user = request.user
-        sessions = ChatSession.objects.filter(user=user).order_by('-updated_at')
-        serializer = ChatSessionSerializer(sessions, many=True)
-        return Response(serializer.data)
+        sessions = ChatSession.objects.filter(user=user).with_last_message().order_by('-updated_at', '-id')
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(sessions, request, view=self)
+        serializer = ChatSessionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         user = request.user
@@ -271,6 +360,7 @@ class ChatSessionMessagesAPIView(APIView):
             session = ChatSession.objects.get(pk=session_id, user=user)
         except ChatSession.DoesNotExist:
             return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
-        messages = session.messages.order_by('created_at')
-        serializer = ChatMessageSerializer(messages, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        paginator = ChatMessagePagination()
+        page = paginator.paginate_queryset(session.messages.all(), request, view=self)
+        serializer = ChatMessageSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
\ No newline at end of file
@@ -15,3 +15,32 @@ class FoodItemViewSet(viewsets.ModelViewSet):
     queryset = FoodItem.objects.all()
     serializer_class = FoodItemSerializer
     permission_classes = [IsAdminOrReadOnly]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        food_group = self.request.query_params.get('food_group')
+        if food_group:
+            qs = qs.filter(food_group=food_group)
+        if self.action == 'list' and 'micronutrients' not in self._requested_fields():
+            # keep list responses lean: don't even load the nutrient vector
+            qs = qs.defer('nutrient_values')
+        return qs
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self._requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def _requested_fields(self):
+        """?fields=a,b; default: lean set for list, everything for detail.
+
+        Only on reads: a trimmed serializer would silently ignore (or fail to
+        validate) the fields of a POST/PUT/PATCH body.
+        """
+        if self.request is None or self.request.method not in permissions.SAFE_METHODS:
+            return None
+        param = self.request.query_params.get('fields')
+        if param:
+            return [f.strip() for f in param.split(',') if f.strip()]
+        if self.action == 'list':
+            return FoodItemSerializer.LIST_FIELDS
+        return None
@@ -1,12 +1,15 @@
 import logging
 from datetime import timedelta
 
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 
+from app.pagination import MealPagination
 from core.models.meal import Meal, IngredientEntry
-from core.serializers.meal import MealSerializer, MealCreateSerializer, IngredientEntrySerializer
+from core.serializers.meal import MealSerializer, MealCreateSerializer, IngredientEntrySerializer, MealSummaryQuerySerializer
+from core.services import meal_summary
 from core.services import nutritionix as nutritionix
 
 # OpenAPI / schema helpers
@@ -48,13 +51,14 @@ class SearchFoodView(generics.GenericAPIView):
 class MealListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = MealSerializer
+    pagination_class = MealPagination
 
     def get_queryset(self):
         q = Meal.objects.filter(user=self.request.user)
         date = self.request.query_params.get('date')
         if date:
             q = q.filter(date=date)
-        return q.order_by('-date', '-time')
+        return q.order_by('-date', '-time', '-id')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -66,51 +70,46 @@ class MealListCreateView(generics.ListCreateAPIView):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        meal = Meal.objects.create(
-            user=request.user,
-            title=data['title'],
-            date=data['date'],
-            time=data['time'],
-            total_calories=0,
-            total_protein=0,
-            total_carbs=0,
-            total_fat=0,
-        )
-
-        # create ingredient entries and sum totals
-        total_cal = total_prot = total_carbs = total_fat = 0.0
-
-        for ing in data['ingredients']:
-            name = ing['food_name']
-            grams = float(ing['weight_grams'])
-
-            try:
-                nutrients = nutritionix.get_nutrients_for_grams(name, grams)
-            except Exception as exc:
-                logger.warning('Nutritionix failed for %s: %s', name, exc)
-                nutrients = {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0}
-
-            entry = IngredientEntry.objects.create(
-                meal=meal,
+        ingredients = [(ing['food_name'], float(ing['weight_grams'])) for ing in data['ingredients']]
+
+        # resolve every ingredient in one or two queries
+        try:
+            nutrients_list = nutritionix.get_nutrients_for_many(ingredients)
+        except Exception as exc:
+            logger.warning('Nutritionix failed for %s: %s', [name for name, _ in ingredients], exc)
+            nutrients_list = [{'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0}] * len(ingredients)
+
+        entries = [
+            IngredientEntry(
+                food_id=nutrients.get('food_id'),
                 food_name=name,
                 weight_grams=grams,
                 calories=nutrients.get('calories', 0.0),
                 protein=nutrients.get('protein', 0.0),
                 fat=nutrients.get('fat', 0.0),
                 carbs=nutrients.get('carbs', 0.0),
+                calories_per_gram=nutrients.get('calories_per_gram'),
+                protein_per_gram=nutrients.get('protein_per_gram'),
+                carbs_per_gram=nutrients.get('carbs_per_gram'),
+                fat_per_gram=nutrients.get('fat_per_gram'),
             )
-
-            total_cal += entry.calories
-            total_prot += entry.protein
-            total_carbs += entry.carbs
-            total_fat += entry.fat
-
-        # update totals on meal
-        meal.total_calories = total_cal
-        meal.total_protein = total_prot
-        meal.total_carbs = total_carbs
-        meal.total_fat = total_fat
-        meal.save()
+            for (name, grams), nutrients in zip(ingredients, nutrients_list)
+        ]
+
+        with transaction.atomic():
+            meal = Meal.objects.create(
+                user=request.user,
+                title=data['title'],
+                date=data['date'],
+                time=data['time'],
+                total_calories=sum(e.calories for e in entries),
+                total_protein=sum(e.protein for e in entries),
+                total_carbs=sum(e.carbs for e in entries),
+                total_fat=sum(e.fat for e in entries),
+            )
+            for entry in entries:
+                entry.meal = meal
+            IngredientEntry.objects.bulk_create(entries)
 
         out = MealSerializer(meal)
         return Response(out.data, status=status.HTTP_201_CREATED)
@@ -128,6 +127,35 @@ class MealDetailView(generics.RetrieveDestroyAPIView):
         # queryset already filtered by user, so only owner can delete
         return super().destroy(request, *args, **kwargs)
 
+    def perform_destroy(self, instance):
+        # the post_delete signal refreshes the DailyNutritionTotals rollup inside this transaction,
+        # so the meal deletion and the new day total commit together (or neither does)
+        with transaction.atomic():
+            instance.delete()
+
+
+class NutritionSummaryView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = MealSummaryQuerySerializer
+
+    @extend_schema(parameters=[
+        OpenApiParameter('start', OpenApiTypes.DATE, description='Data inicial (inclusive)', required=True),
+        OpenApiParameter('end', OpenApiTypes.DATE, description='Data final (inclusive)', required=True),
+        OpenApiParameter('bucket', OpenApiTypes.STR, description='day / week / month (default day)'),
+    ])
+    def get(self, request, *args, **kwargs):
+        params = MealSummaryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        summary = meal_summary.summarize(request.user, data['start'], data['end'], data['bucket'])
+        return Response({
+            'start': data['start'],
+            'end': data['end'],
+            'bucket': data['bucket'],
+            **summary,
+        }, status=status.HTTP_200_OK)
+
 
 class WeeklySummaryView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -138,29 +166,5 @@ class WeeklySummaryView(generics.GenericAPIView):
         monday = today - timedelta(days=today.weekday())
         sunday = monday + timedelta(days=6)
 
-        meals = Meal.objects.filter(user=request.user, date__range=(monday, sunday))
-
-        # initialize dict from monday to sunday
-        day_totals = {}
-        week_totals = {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0}
-
-        for i in range(7):
-            d = monday + timedelta(days=i)
-            day_totals[d.isoformat()] = {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0}
-
-        for m in meals:
-            ds = m.date.isoformat()
-            entry = day_totals.get(ds)
-            if entry is None:
-                continue
-            entry['calories'] += float(m.total_calories or 0.0)
-            entry['protein'] += float(m.total_protein or 0.0)
-            entry['carbs'] += float(m.total_carbs or 0.0)
-            entry['fat'] += float(m.total_fat or 0.0)
-
-            week_totals['calories'] += float(m.total_calories or 0.0)
-            week_totals['protein'] += float(m.total_protein or 0.0)
-            week_totals['carbs'] += float(m.total_carbs or 0.0)
-            week_totals['fat'] += float(m.total_fat or 0.0)
-
-        return Response({'days': day_totals, 'week_totals': week_totals}, status=status.HTTP_200_OK)
+        summary = meal_summary.summarize(request.user, monday, sunday, 'day')
+        return Response({'days': summary['buckets'], 'week_totals': summary['totals']}, status=status.HTTP_200_OK)
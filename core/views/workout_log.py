@@ -3,6 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
+from app.pagination import WorkoutLogPagination
 from core.serializers.workout_log import WorkoutLogSerializer
 from core.models.workout_log import WorkoutLog
 
@@ -50,6 +51,8 @@ class ListWorkoutLogsAPIView(APIView):
 
     def get(self, request):
         user = request.user
-        qs = WorkoutLog.objects.filter(user=user).order_by('-finished_at')
-        serializer = WorkoutLogSerializer(qs, many=True)
-        return Response(serializer.data)
+        qs = WorkoutLog.objects.filter(user=user)
+        paginator = WorkoutLogPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = WorkoutLogSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)